@@ -6,18 +6,20 @@ from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from auth.user_cache import user_cache
 from auth.utils import ALGORITHM, JWT_SECRET_KEY
-from crud.auth_crud import get_user_by_username_for_login
-from db import get_db
+from crud.async_auth_crud import get_user_by_username_for_login
+from db import get_async_read_db
 from schemas.user_schemas import SystemUser, TokenPayload
 
 reuseable_oauth = OAuth2PasswordBearer(tokenUrl="/login", scheme_name="JWT")
 
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(reuseable_oauth)
+async def get_current_user(
+    db: AsyncSession = Depends(get_async_read_db),
+    token: str = Depends(reuseable_oauth),
 ) -> SystemUser:
     """Get the current user."""
     try:
@@ -37,7 +39,11 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user: Union[dict[str, Any], None] = get_user_by_username_for_login(
+    cached_user = user_cache.get(token_data.sub)
+    if cached_user is not None:
+        return cached_user
+
+    user: Union[dict[str, Any], None] = await get_user_by_username_for_login(
         db=db, username=token_data.sub
     )
 
@@ -46,9 +52,13 @@ def get_current_user(
             status_code=404,
             detail="Could not find user",
         )
+    if user.is_active is False:
+        raise HTTPException(status_code=403, detail="Inactive user")
 
-    return SystemUser(
+    system_user = SystemUser(
         id=user.id,
         username=user.username,
         hashed_password=user.hashed_password,
     )
+    user_cache.set(token_data.sub, system_user)
+    return system_user
@@ -0,0 +1,122 @@
+"""Dedicated worker pool for bcrypt.
+
+Hashing and verifying passwords costs hundreds of milliseconds of CPU. Run
+on the shared request threadpool, a burst of logins takes every thread and
+stalls the rest of the API, so bcrypt gets its own bounded pool instead.
+bcrypt releases the GIL, so threads hash in parallel. Once all workers are
+busy and the queue is full, new logins are refused with 503.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from auth.utils import get_hashed_password, verify_password
+
+AUTH_HASHING_WORKERS = int(
+    os.getenv("AUTH_HASHING_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+AUTH_HASHING_QUEUE_SIZE = int(os.getenv("AUTH_HASHING_QUEUE_SIZE", "64"))
+
+
+class HashingService:
+    """Run password hashing on a bounded thread pool."""
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.hash_time = 0.0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="bcrypt"
+            )
+        return self._executor
+
+    def _call(self, submitted: float, fn, *args):
+        started = time.perf_counter()
+        with self._lock:
+            self.running += 1
+            self.wait_time += started - submitted
+            self.max_wait = max(self.max_wait, started - submitted)
+        failed = True
+        try:
+            result = fn(*args)
+            failed = False
+            return result
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.hash_time += time.perf_counter() - started
+                if failed:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+
+    async def run(self, fn, *args):
+        """Run fn on the pool, or raise 503 if the queue is full."""
+        with self._lock:
+            if self.pending >= self.workers + self.queue_size:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Too many logins at once, try again shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, self._call, time.perf_counter(), fn, *args
+            )
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    async def hash_password(self, password: str) -> str:
+        """Hash a password on the pool."""
+        return await self.run(get_hashed_password, password)
+
+    async def verify_password(self, password: str, hashed_pass: str) -> bool:
+        """Check a password against its hash on the pool."""
+        return await self.run(verify_password, password, hashed_pass)
+
+    def stats(self) -> dict:
+        """Get the pool size, queue depth and timings."""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "running": self.running,
+                "queued": self.pending - self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "wait_time": self.wait_time,
+                "max_wait": self.max_wait,
+                "hash_time": self.hash_time,
+            }
+
+    def shutdown(self):
+        """Stop the worker threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+hashing = HashingService(
+    workers=AUTH_HASHING_WORKERS, queue_size=AUTH_HASHING_QUEUE_SIZE
+)
@@ -0,0 +1,49 @@
+"""In-memory list of revoked refresh tokens.
+
+Refresh tokens carry a ``jti``; /logout adds it here until the token
+would have expired anyway. The list lives in the worker's memory, so a
+token revoked on one worker stays usable on the others and after a
+restart: it narrows the window for a leaked token, it does not close it.
+"""
+import os
+import threading
+import time
+
+AUTH_REVOKED_TOKENS_SIZE = int(os.getenv("AUTH_REVOKED_TOKENS_SIZE", "10000"))
+
+
+class RevocationList:
+    """Token IDs revoked before their expiry."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._expiry = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, jti: str, expires_at: float):
+        """Revoke a token until its expiry (unix time)."""
+        with self._lock:
+            self._expiry[jti] = expires_at
+            if len(self._expiry) > self.maxsize:
+                self._purge()
+
+    def is_revoked(self, jti: str) -> bool:
+        """Check whether a token has been revoked."""
+        with self._lock:
+            return self._expiry.get(jti, 0) > time.time()
+
+    def clear(self):
+        """Forget every revoked token."""
+        with self._lock:
+            self._expiry.clear()
+
+    def _purge(self):
+        now = time.time()
+        for jti in [jti for jti, exp in self._expiry.items() if exp <= now]:
+            del self._expiry[jti]
+        # still full of live tokens, forget the earliest revoked ones
+        while len(self._expiry) > self.maxsize:
+            del self._expiry[next(iter(self._expiry))]
+
+
+revoked_tokens = RevocationList(maxsize=AUTH_REVOKED_TOKENS_SIZE)
@@ -0,0 +1,113 @@
+"""Per-worker cache of the users behind authenticated requests.
+
+get_current_user would otherwise query ``users`` on every request. Entries
+are dropped as soon as this worker commits a change to the user's
+password, username or active flag, or deletes the user; changes made by
+other workers are picked up once the entry expires.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models.user import User
+from schemas.user_schemas import SystemUser
+
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "1024"))
+
+# changing any of these has to invalidate the cached user
+WATCHED_ATTRIBUTES = ("username", "hashed_password", "is_active")
+
+
+class UserCache:
+    """LRU cache of SystemUser by username whose entries expire."""
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, username: str) -> Optional[SystemUser]:
+        """Get a cached user, None if missing or expired."""
+        with self._lock:
+            entry = self._users.get(username)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._users.move_to_end(username)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, username: str, user: SystemUser):
+        """Cache a user, dropping the least recently used if full."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._users[username] = (time.monotonic() + self.ttl, user)
+            self._users.move_to_end(username)
+            while len(self._users) > self.maxsize:
+                self._users.popitem(last=False)
+
+    def evict(self, username: str):
+        """Drop a user from the cache."""
+        with self._lock:
+            self._users.pop(username, None)
+
+    def clear(self):
+        """Drop every user and reset the counters."""
+        with self._lock:
+            self._users.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+user_cache = UserCache(ttl=AUTH_USER_CACHE_TTL, maxsize=AUTH_USER_CACHE_SIZE)
+
+
+def _changed_usernames(user: User) -> set:
+    """Get the usernames to evict if a watched attribute of user changed."""
+    state = inspect(user)
+    usernames = set()
+    for name in WATCHED_ATTRIBUTES:
+        history = state.attrs[name].history
+        if history.has_changes():
+            usernames.add(user.username)
+            usernames.update(state.attrs.username.history.deleted)
+    return usernames
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_users(session, flush_context):
+    usernames = session.info.setdefault("evicted_usernames", set())
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            usernames.update(_changed_usernames(obj))
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            usernames.add(obj.username)
+    for username in usernames:
+        user_cache.evict(username)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_users(session):
+    # evict again, a request may have cached the old row meanwhile
+    for username in session.info.pop("evicted_usernames", ()):
+        user_cache.evict(username)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_users(session):
+    session.info.pop("evicted_usernames", None)
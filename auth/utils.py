@@ -3,9 +3,11 @@ import os
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any, Union
+from uuid import uuid4
 
 import jwt
 from dotenv import load_dotenv
+from fastapi import HTTPException
 from passlib.context import CryptContext
 
 env_path = Path(".") / ".env"
@@ -57,6 +59,37 @@ def create_refresh_token(
             minutes=REFRESH_TOKEN_EXPIRE_MINUTES
         )
 
-    to_encode = {"exp": expires_delta, "sub": str(subject)}
+    to_encode = {
+        "exp": expires_delta,
+        "sub": str(subject),
+        "jti": uuid4().hex,
+    }
     encoded_jwt = jwt.encode(to_encode, JWT_REFRESH_SECRET_KEY, ALGORITHM)
     return encoded_jwt
+
+
+def decode_refresh_token(token: str) -> dict:
+    """Check a refresh token and get its payload."""
+    try:
+        payload = jwt.decode(
+            token, JWT_REFRESH_SECRET_KEY, algorithms=[ALGORITHM]
+        )
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(
+            status_code=401,
+            detail="Token expired",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    except jwt.InvalidTokenError:
+        raise HTTPException(
+            status_code=403,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if "sub" not in payload:
+        raise HTTPException(
+            status_code=403,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
@@ -0,0 +1,95 @@
+"""Count the database round trips saved by the authenticated user cache.
+
+Runs authenticated requests against the database configured in .env, once
+with the user cache disabled and once enabled, and prints the number of
+statements sent to Postgres per request.
+
+    python benchmarks/auth_user_cache.py [--requests 200]
+"""
+import argparse
+import os
+import sys
+import time
+from uuid import uuid4
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import db  # noqa: E402
+from auth.user_cache import user_cache  # noqa: E402
+from main import app  # noqa: E402
+from models.user import User  # noqa: E402
+
+ENDPOINTS = ("/me", "/rooms", "/bookings")
+
+
+class StatementCounter:
+    """Count the statements executed on a set of engines."""
+
+    def __init__(self, engines):
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def run(client: TestClient, headers: dict, counter, requests: int):
+    results = {}
+    for endpoint in ENDPOINTS:
+        client.get(endpoint, headers=headers)
+        counter.count = 0
+        started = time.perf_counter()
+        for _ in range(requests):
+            response = client.get(endpoint, headers=headers)
+            assert response.status_code == 200, response.text
+        elapsed = time.perf_counter() - started
+        results[endpoint] = (counter.count / requests, elapsed / requests)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    engines = [db.engine, db.async_engine.sync_engine]
+    engines += db.replica_engines
+    engines += [engine.sync_engine for engine in db.async_replica_engines]
+    counter = StatementCounter(engines)
+    user = {"username": f"bench-{uuid4().hex[:8]}", "password": "benchmark"}
+    ttl = user_cache.ttl
+    try:
+        with TestClient(app) as client:
+            client.post("/signup", json=user)
+            response = client.post("/login", data=user)
+            token = response.json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+
+            user_cache.ttl = 0
+            user_cache.clear()
+            uncached = run(client, headers, counter, args.requests)
+            user_cache.ttl = ttl or 60
+            cached = run(client, headers, counter, args.requests)
+    finally:
+        user_cache.ttl = ttl
+        with db.SessionLocal() as session:
+            session.query(User).filter_by(username=user["username"]).delete()
+            session.commit()
+
+    print(f"{'endpoint':<12}{'queries/request':>28}{'ms/request':>24}")
+    print(
+        f"{'':<12}{'no cache':>14}{'cache':>14}{'no cache':>12}{'cache':>12}"
+    )
+    for endpoint in ENDPOINTS:
+        (q_off, t_off), (q_on, t_on) = uncached[endpoint], cached[endpoint]
+        print(
+            f"{endpoint:<12}{q_off:>14.2f}{q_on:>14.2f}"
+            f"{t_off * 1000:>12.2f}{t_on * 1000:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Query plans and latency of the booking lookups with and without indexes.
+
+Fills the database configured in .env (migrated to head) with synthetic
+rooms, clients, bookings and invoices inside a transaction, runs the
+lookups behind the room, client, guest and filter endpoints without and
+then with the lookup indexes, and rolls everything back at the end.
+
+    python benchmarks/booking_indexes.py [--rooms 200] [--bookings 1000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import text  # noqa: E402
+
+import db  # noqa: E402
+from models.booking import Booking  # noqa: E402
+from models.invoice import Invoice  # noqa: E402
+
+INDEXES = [
+    "ix_bookings_room_id_start_date",
+    "ix_bookings_client_id_start_date",
+    "ix_bookings_start_date_end_date",
+    "ix_bookings_end_date",
+    "ix_invoices_booking_id",
+    "ix_invoices_client_id",
+]
+
+# the statements the CRUD functions send, with sample parameters
+QUERIES = {
+    "bookings of a room": (
+        "SELECT * FROM bookings WHERE room_id = :room_id LIMIT 100",
+        {"room_id": 150},
+    ),
+    "current guest": (
+        "SELECT * FROM bookings WHERE room_id = :room_id"
+        " AND start_date <= :day AND end_date >= :day LIMIT 1",
+        {"room_id": 150, "day": "2031-06-01"},
+    ),
+    "bookings of a client": (
+        "SELECT * FROM bookings WHERE client_id = :client_id",
+        {"client_id": 4242},
+    ),
+    "arrivals (start_date filter)": (
+        "SELECT * FROM bookings WHERE start_date = :day",
+        {"day": "2031-06-01"},
+    ),
+    "departures (end_date filter)": (
+        "SELECT * FROM bookings WHERE end_date = :day",
+        {"day": "2031-06-03"},
+    ),
+    "invoices of a booking": (
+        "SELECT * FROM invoices WHERE booking_id = :booking_id",
+        # set to a seeded booking, the sequence may not start at 1
+        {"booking_id": None},
+    ),
+    "invoices of a client": (
+        "SELECT * FROM invoices WHERE client_id = :client_id",
+        {"client_id": 4242},
+    ),
+}
+
+SEED = """
+INSERT INTO facilities (id, name) VALUES (1, 'benchmark');
+INSERT INTO room_types (id, name, capacity, price)
+VALUES (1, 'benchmark', '2', 100);
+INSERT INTO rooms (id, room_type_id, facility_id, floor,
+                   booking_status, cleanliness_status)
+SELECT r, 1, 1, r / 100, 'vacant', 'clean' FROM generate_series(1, :rooms) r;
+INSERT INTO clients (id, first_name, last_name, email, phone, address)
+SELECT c, 'first', 'last', 'client' || c || '@example.com', '+380000000000',
+       'address'
+FROM generate_series(1, :clients) c;
+INSERT INTO bookings (room_id, client_id, start_date, end_date, total_price)
+SELECT r, 1 + (r * 7919 + k * 104729) % :clients,
+       DATE '2026-01-01' + k * 3, DATE '2026-01-01' + k * 3 + 2, 200
+FROM generate_series(1, :rooms) r, generate_series(0, :bookings - 1) k;
+INSERT INTO invoices (booking_id, client_id, payment_method, invoice_amount)
+SELECT id, client_id, 'cash', total_price FROM bookings;
+ANALYZE facilities, room_types, rooms, clients, bookings, invoices;
+"""
+
+
+def measure(connection, statement: str, params: dict, repeat: int):
+    plan = connection.execute(
+        text("EXPLAIN (ANALYZE, COSTS OFF, TIMING OFF) " + statement), params
+    ).scalars()
+    plan = [line.strip() for line in plan]
+    scans = [
+        line.lstrip("-> ")
+        for line in plan
+        if "Scan" in line and "Bitmap Heap" not in line
+    ]
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        connection.execute(text(statement), params).fetchall()
+        timings.append(time.perf_counter() - started)
+    return scans[0], statistics.median(timings) * 1000
+
+
+def run(connection, repeat: int) -> dict:
+    return {
+        name: measure(connection, statement, params, repeat)
+        for name, (statement, params) in QUERIES.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--bookings", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    indexes = [
+        index
+        for index in Booking.__table__.indexes | Invoice.__table__.indexes
+        if index.name in INDEXES
+    ]
+    with db.engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            for statement in SEED.split(";"):
+                if statement.strip():
+                    connection.execute(
+                        text(statement),
+                        {
+                            "rooms": args.rooms,
+                            "bookings": args.bookings,
+                            "clients": args.clients,
+                        },
+                    )
+            QUERIES["invoices of a booking"][1][
+                "booking_id"
+            ] = connection.execute(
+                text("SELECT max(id) FROM bookings")
+            ).scalar()
+            for name in INDEXES:
+                connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            before = run(connection, args.repeat)
+            for index in indexes:
+                index.create(connection)
+            connection.execute(text("ANALYZE bookings, invoices"))
+            after = run(connection, args.repeat)
+        finally:
+            transaction.rollback()
+
+    rows = args.rooms * args.bookings
+    print(f"{rows} bookings and invoices, median of {args.repeat} runs\n")
+    for name in QUERIES:
+        (plan_before, ms_before), (plan_after, ms_after) = (
+            before[name],
+            after[name],
+        )
+        print(f"{name}: {ms_before:.2f} ms -> {ms_after:.2f} ms")
+        print(f"    before: {plan_before}")
+        print(f"    after:  {plan_after}")
+
+
+if __name__ == "__main__":
+    main()
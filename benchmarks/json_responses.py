@@ -0,0 +1,151 @@
+"""CPU spent building list pages through the ORM and the fast JSON path.
+
+Fills the database configured in .env (migrated to head) with synthetic
+rooms and bookings inside a transaction, then builds pages of /rooms and
+/bookings the way each JSON_RESPONSE_MODE does: "orm" loads objects and
+runs FastAPI's response validation and encoding, "fast" selects the
+schema's columns and encodes the rows with orjson. Everything is rolled
+back at the end.
+
+    python benchmarks/json_responses.py [--repeat 50]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from starlette.responses import Response  # noqa: E402
+
+import db  # noqa: E402
+from crud import booking_utils, pagination_utils, room_utils  # noqa: E402
+from crud import response_utils  # noqa: E402
+from main import app  # noqa: E402
+from schemas.booking_schemas import BookingList  # noqa: E402
+from schemas.room_schemas import RoomFull  # noqa: E402
+
+# ids of the seeded rows start after this, pages start from its cursor
+BASE_ID = 10_000_000
+
+SEED = """
+INSERT INTO facilities (id, name) VALUES (:base, 'benchmark');
+INSERT INTO room_types (id, name, capacity, price)
+VALUES (:base, 'benchmark', '2', 100);
+INSERT INTO rooms (id, room_type_id, facility_id, floor,
+                   booking_status, cleanliness_status)
+SELECT :base + r, :base, :base, 1 + r / 100, 'vacant', 'clean'
+FROM generate_series(1, :rows) r;
+INSERT INTO clients (id, first_name, last_name, email, phone, address)
+VALUES (:base, 'first', 'last', 'benchmark@example.com', '+380000000000',
+        'address');
+INSERT INTO bookings (id, room_id, client_id, start_date, end_date,
+                      total_price, ts_created, ts_updated)
+SELECT :base + r, :base + r, :base, DATE '2031-01-01',
+       DATE '2031-01-03', 200, now(), now()
+FROM generate_series(1, :rows) r
+"""
+
+ENDPOINTS = {
+    "/rooms": (room_utils.get_rooms, RoomFull),
+    "/bookings": (booking_utils.get_bookings, BookingList),
+}
+
+
+def response_field(path: str):
+    for route in app.routes:
+        if getattr(route, "path", None) == path:
+            return route.secure_cloned_response_field
+    raise LookupError(path)
+
+
+loop = asyncio.new_event_loop()
+
+
+def orm_page(session: Session, get_page, field, limit: int, after: str):
+    # every request starts with an empty session
+    session.expunge_all()
+    items = get_page(session, limit=limit, after=after)
+    content = loop.run_until_complete(
+        serialize_response(field=field, response_content=items)
+    )
+    return JSONResponse(content).body
+
+
+def fast_page(session: Session, get_page, schema, limit: int, after: str):
+    session.expunge_all()
+    rows = get_page(session, limit=limit, after=after, schema=schema)
+    return response_utils.rows_response(rows, Response()).body
+
+
+def measure(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument(
+        "--limits", type=int, nargs="+", default=[100, 500, 1000]
+    )
+    args = parser.parse_args()
+
+    after = pagination_utils.encode_cursor(BASE_ID)
+    results = []
+    with db.engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            for statement in SEED.split(";"):
+                connection.execute(
+                    text(statement), {"base": BASE_ID, "rows": args.rows}
+                )
+            session = Session(bind=connection)
+            for path, (get_page, schema) in ENDPOINTS.items():
+                field = response_field(path)
+                for limit in args.limits:
+                    orm = orm_page(session, get_page, field, limit, after)
+                    fast = fast_page(session, get_page, schema, limit, after)
+                    assert orm == fast, f"{path} bodies differ"
+                    orm_ms = measure(
+                        lambda: orm_page(
+                            session, get_page, field, limit, after
+                        ),
+                        args.repeat,
+                    )
+                    fast_ms = measure(
+                        lambda: fast_page(
+                            session, get_page, schema, limit, after
+                        ),
+                        args.repeat,
+                    )
+                    results.append((path, limit, orm_ms, fast_ms, len(orm)))
+            session.close()
+        finally:
+            transaction.rollback()
+
+    orjson = "orjson" if response_utils.orjson else "json (orjson missing)"
+    print(f"median of {args.repeat} pages, fast path encoder: {orjson}\n")
+    print(
+        f"{'endpoint':<12}{'limit':>6}{'orm ms':>10}{'fast ms':>10}"
+        f"{'speedup':>9}{'bytes':>9}"
+    )
+    for path, limit, orm_ms, fast_ms, size in results:
+        print(
+            f"{path:<12}{limit:>6}{orm_ms:>10.2f}{fast_ms:>10.2f}"
+            f"{orm_ms / fast_ms:>8.1f}x{size:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Compare the throughput of password logins and token refreshes.
+
+Creates a throwaway user in the database configured in .env, then sends
+logins and refreshes from several client threads and prints requests per
+second for each.
+
+    python benchmarks/login_vs_refresh.py [--requests 200] [--threads 8]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fastapi.testclient import TestClient  # noqa: E402
+
+import db  # noqa: E402
+from main import app  # noqa: E402
+from models.user import User  # noqa: E402
+
+
+def measure(send, requests: int, threads: int) -> float:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for response in executor.map(lambda _: send(), range(requests)):
+            assert response.status_code == 200, response.text
+    return requests / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    user = {"username": f"bench-{uuid4().hex[:8]}", "password": "benchmark"}
+    try:
+        with TestClient(app) as client:
+            client.post("/signup", json=user)
+            response = client.post("/login", data=user)
+            token = {"refresh_token": response.json()["refresh_token"]}
+
+            login = measure(
+                lambda: client.post("/login", data=user),
+                args.requests,
+                args.threads,
+            )
+            refresh = measure(
+                lambda: client.post("/refresh", json=token),
+                args.requests,
+                args.threads,
+            )
+    finally:
+        with db.SessionLocal() as session:
+            session.query(User).filter_by(username=user["username"]).delete()
+            session.commit()
+
+    print(f"{'endpoint':<10}{'requests/s':>12}")
+    print(f"{'/login':<10}{login:>12.1f}")
+    print(f"{'/refresh':<10}{refresh:>12.1f}")
+    print(f"refresh is {refresh / login:.0f}x the login throughput")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Async CRUD functions to manage users.
+
+They run the sync CRUD functions on the async session's connection, so
+both paths share one implementation while routers migrate.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crud import auth_crud
+from schemas.user_schemas import UserAuth
+
+
+async def get_user_by_username_for_login(db: AsyncSession, username: str):
+    """Get user by username."""
+    return await db.run_sync(
+        auth_crud.get_user_by_username_for_login, username=username
+    )
+
+
+async def get_user_by_username_for_signup(db: AsyncSession, username: str):
+    """Get user by username."""
+    return await db.run_sync(
+        auth_crud.get_user_by_username_for_signup, username=username
+    )
+
+
+async def create_user(
+    db: AsyncSession, user: UserAuth, hashed_password: str = None
+):
+    """Create new user."""
+    return await db.run_sync(
+        auth_crud.create_user, user=user, hashed_password=hashed_password
+    )
@@ -0,0 +1,83 @@
+"""Async CRUD functions for Booking.
+
+They run the sync CRUD functions on the async session's connection, so
+both paths share one implementation while routers migrate. Writes go
+through occupancy_utils.run_sync, which changes the occupancy snapshot
+on the threadpool rather than on the event loop.
+"""
+from typing import List, Type
+
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crud import booking_utils, occupancy_utils
+from schemas.booking_schemas import BookingCreate, BookingUpdate
+
+
+async def get_bookings(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    after: str = None,
+    schema: Type[BaseModel] = None,
+    options: List = (),
+):
+    """Get all bookings, as rows of the schema's columns if given."""
+    return await db.run_sync(
+        booking_utils.get_bookings,
+        skip=skip,
+        limit=limit,
+        after=after,
+        schema=schema,
+        options=options,
+    )
+
+
+async def get_bookings_json(
+    db: AsyncSession,
+    schema: Type[BaseModel],
+    skip: int = 0,
+    limit: int = 100,
+    after: str = None,
+):
+    """Get all bookings as a JSON list of the schema's fields."""
+    return await db.run_sync(
+        booking_utils.get_bookings_json,
+        schema=schema,
+        skip=skip,
+        limit=limit,
+        after=after,
+    )
+
+
+async def get_booking(db: AsyncSession, booking_id: int, options: List = ()):
+    """Get booking by ID, with the loader options applied."""
+    return await db.run_sync(
+        booking_utils.get_booking, booking_id=booking_id, options=options
+    )
+
+
+async def create_booking(db: AsyncSession, booking: BookingCreate):
+    """Create new booking."""
+    return await occupancy_utils.run_sync(
+        db, booking_utils.create_booking, booking=booking
+    )
+
+
+async def update_booking(
+    db: AsyncSession, booking_id: int, booking: BookingUpdate
+):
+    """Update existing booking."""
+    return await occupancy_utils.run_sync(
+        db,
+        booking_utils.update_booking,
+        booking_id=booking_id,
+        booking=booking,
+    )
+
+
+async def delete_booking(db: AsyncSession, booking_id: int):
+    """Remove existing booking."""
+    return await occupancy_utils.run_sync(
+        db, booking_utils.delete_booking, booking_id=booking_id
+    )
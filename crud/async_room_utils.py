@@ -0,0 +1,125 @@
+"""Async CRUD functions for Room and room availability.
+
+They run the sync CRUD functions on the async session's connection, so
+both paths share one implementation while routers migrate. That runs on
+the event loop, so the occupancy snapshot is asked and changed on the
+threadpool instead (see crud/occupancy_utils.py).
+"""
+
+import datetime
+from typing import List, Optional, Type
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crud import (
+    availability_utils,
+    conditional_utils,
+    occupancy_utils,
+    room_utils,
+)
+from schemas.room_schemas import RoomCreate, RoomUpdate
+
+
+async def get_rooms(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    after: str = None,
+    schema: Type[BaseModel] = None,
+    options: List = (),
+):
+    """Get all rooms, as rows of the schema's columns if given."""
+    return await db.run_sync(
+        room_utils.get_rooms,
+        skip=skip,
+        limit=limit,
+        after=after,
+        schema=schema,
+        options=options,
+    )
+
+
+async def check_not_modified(
+    db: AsyncSession, table: str, request: Request, response: Response
+):
+    """Set a table's validators, get a 304 if the client's copy is current."""
+    return await db.run_sync(conditional_utils.check, table, request, response)
+
+
+async def get_room(db: AsyncSession, room_id: int):
+    """Get room by id."""
+    return await db.run_sync(room_utils.get_room, room_id=room_id)
+
+
+async def create_room(db: AsyncSession, room: RoomCreate):
+    """Create new room."""
+    return await occupancy_utils.run_sync(
+        db, room_utils.create_room, room=room
+    )
+
+
+async def update_room(db: AsyncSession, room_id: int, room: RoomUpdate):
+    """Update existing room."""
+    return await db.run_sync(
+        room_utils.update_room, room_id=room_id, room=room
+    )
+
+
+async def delete_room(db: AsyncSession, room_id: int):
+    """Remove existing room."""
+    return await db.run_sync(room_utils.delete_room, room_id=room_id)
+
+
+async def check_room_availability_by_date(
+    start_date: datetime.date,
+    end_date: datetime.date,
+    room_id: int,
+    db: AsyncSession,
+):
+    """Check if room is free on a given date."""
+    availability_utils.check_stay(start_date=start_date, end_date=end_date)
+    vacant = await occupancy_utils.ask_in_thread(
+        "is_vacant", room_id, start_date, end_date
+    )
+    # the sync version takes ``db`` last, run_sync passes it first
+    return await db.run_sync(
+        lambda session: room_utils.check_room_availability_by_date(
+            start_date=start_date,
+            end_date=end_date,
+            room_id=room_id,
+            db=session,
+            vacant=vacant,
+        )
+    )
+
+
+async def get_vacant_rooms(
+    db: AsyncSession,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    room_type_id: Optional[int] = None,
+    facility_id: Optional[int] = None,
+    floor: Optional[int] = None,
+    capacity: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+):
+    """Get rooms with no booking overlapping the given stay."""
+    availability_utils.check_stay(start_date=start_date, end_date=end_date)
+    room_ids = await occupancy_utils.ask_in_thread(
+        "room_ids_by_vacancy", start_date, end_date
+    )
+    return await db.run_sync(
+        availability_utils.get_vacant_rooms,
+        start_date=start_date,
+        end_date=end_date,
+        room_type_id=room_type_id,
+        facility_id=facility_id,
+        floor=floor,
+        capacity=capacity,
+        skip=skip,
+        limit=limit,
+        room_ids=room_ids,
+    )
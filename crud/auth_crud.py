@@ -40,7 +40,7 @@ def get_user_by_username_for_signup(db: Session, username: str):
     return _user
 
 
-def create_user(db: Session, user: UserAuth):
+def create_user(db: Session, user: UserAuth, hashed_password: str = None):
     """Create new user."""
     user_exists = get_user_by_username_for_signup(
         db=db, username=user.username
@@ -53,7 +53,7 @@ def create_user(db: Session, user: UserAuth):
     _user = User(
         id=str(uuid4()),
         username=user.username,
-        hashed_password=get_hashed_password(user.password),
+        hashed_password=hashed_password or get_hashed_password(user.password),
     )
     db.add(_user)
     db.commit()
@@ -0,0 +1,108 @@
+"""Availability checks backed by the bookings stay range index."""
+
+import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import Integer, and_, cast, exists, func, or_
+from sqlalchemy.orm import Session
+
+from crud import occupancy_utils
+from models.booking import Booking
+from models.room import Room, RoomType
+
+
+def check_stay(start_date: datetime.date, end_date: datetime.date):
+    """Reject a stay that ends before it starts."""
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="Incorrect date")
+
+
+def stay_range(start_date: datetime.date, end_date: datetime.date):
+    """Build a half-open [start_date, end_date) daterange expression."""
+    check_stay(start_date=start_date, end_date=end_date)
+    return func.daterange(start_date, end_date, "[)")
+
+
+def overlapping_bookings(
+    db: Session,
+    start_date: datetime.date,
+    end_date: datetime.date,
+):
+    """Query bookings whose stay overlaps [start_date, end_date)."""
+    return db.query(Booking).filter(
+        Booking.stay.overlaps(stay_range(start_date, end_date))
+    )
+
+
+def is_room_vacant(
+    db: Session,
+    room_id: int,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    vacant: Optional[bool] = occupancy_utils.ASK,
+) -> bool:
+    """
+    Check whether no booking of the room overlaps the given stay. vacant
+    is the snapshot's answer if the caller already asked it.
+    """
+    check_stay(start_date=start_date, end_date=end_date)
+    if vacant is occupancy_utils.ASK:
+        vacant = occupancy_utils.ask(
+            db, "is_vacant", room_id, start_date, end_date
+        )
+    if vacant is not None:
+        return vacant
+    overlapping = overlapping_bookings(
+        db=db, start_date=start_date, end_date=end_date
+    ).filter(Booking.room_id == room_id)
+    return not db.query(overlapping.exists()).scalar()
+
+
+def get_vacant_rooms(
+    db: Session,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    room_type_id: Optional[int] = None,
+    facility_id: Optional[int] = None,
+    floor: Optional[int] = None,
+    capacity: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    room_ids: Optional[tuple] = occupancy_utils.ASK,
+):
+    """
+    Get rooms with no booking overlapping the given stay. room_ids is the
+    snapshot's answer if the caller already asked it.
+    """
+    check_stay(start_date=start_date, end_date=end_date)
+    if room_ids is occupancy_utils.ASK:
+        room_ids = occupancy_utils.ask(
+            db, "room_ids_by_vacancy", start_date, end_date
+        )
+    overlapping = exists().where(
+        Booking.room_id == Room.id,
+        Booking.stay.overlaps(stay_range(start_date, end_date)),
+    )
+    if room_ids is not None:
+        vacant_room_ids, known_room_ids = room_ids
+        # rooms created since the snapshot was built are checked in SQL
+        query = db.query(Room).filter(
+            or_(
+                Room.id.in_(vacant_room_ids),
+                and_(Room.id.notin_(known_room_ids), ~overlapping),
+            )
+        )
+    else:
+        query = db.query(Room).filter(~overlapping)
+    if room_type_id:
+        query = query.filter(Room.room_type_id == room_type_id)
+    if facility_id:
+        query = query.filter(Room.facility_id == facility_id)
+    if floor:
+        query = query.filter(Room.floor == floor)
+    if capacity:
+        query = query.join(RoomType, RoomType.id == Room.room_type_id).filter(
+            cast(RoomType.capacity, Integer) >= capacity
+        )
+    return query.order_by(Room.id).offset(skip).limit(limit).all()
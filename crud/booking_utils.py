@@ -1,59 +1,93 @@
 """CRUD functions for Booking."""
 
-from typing import Optional
+from typing import List, Optional, Type
 import datetime
 
 from fastapi import HTTPException
+from pydantic import BaseModel
+from psycopg2 import errorcodes
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from crud import client_utils, room_utils
+from crud import (
+    client_utils,
+    inventory_utils,
+    loader_utils,
+    occupancy_utils,
+    pagination_utils,
+    response_utils,
+    room_utils,
+)
 from models.booking import Booking
 from schemas.booking_schemas import BookingCreate, BookingFilter
 
 
-def get_bookings(db: Session, skip: int = 0, limit: int = 100):
-    """Get all bookings."""
-    return db.query(Booking).offset(skip).limit(limit).all()
+def get_bookings(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: str = None,
+    schema: Type[BaseModel] = None,
+    options: List = (),
+):
+    """
+    Get all bookings, as rows of the schema's columns if given, with the
+    loader options applied otherwise.
+    """
+    return pagination_utils.paginate(
+        response_utils.project(db.query(Booking).options(*options), schema),
+        Booking.id,
+        skip=skip,
+        limit=limit,
+        after=after,
+    )
 
 
-def get_booking(db: Session, booking_id: int):
-    """Get booking by ID."""
-    _booking = db.query(Booking).filter(Booking.id == booking_id).first()
-    if not _booking:
-        raise HTTPException(
-            status_code=404, detail=f"No booking found with id {booking_id}"
-        )
-    return _booking
+def get_bookings_json(
+    db: Session,
+    schema: Type[BaseModel],
+    skip: int = 0,
+    limit: int = 100,
+    after: str = None,
+) -> response_utils.JSONArray:
+    """Get all bookings as a JSON list of the schema's fields."""
+    return response_utils.json_array(
+        pagination_utils.paginate_query(
+            db.query(Booking), Booking.id, skip=skip, limit=limit, after=after
+        ),
+        schema,
+    )
+
+
+def get_booking(db: Session, booking_id: int, options: List = ()):
+    """Get booking by ID, with the loader options applied."""
+    return loader_utils.load(
+        db, Booking, booking_id, "booking", options=options
+    )
+
+
+def commit_booking(db: Session):
+    """Commit booking changes, rejecting stays that overlap another one."""
+    try:
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        if getattr(exc.orig, "pgcode", None) == errorcodes.EXCLUSION_VIOLATION:
+            raise HTTPException(status_code=400, detail="Room is booked")
+        raise
 
 
 def create_booking(db: Session, booking: BookingCreate):
     """Create new booking."""
-    if not client_utils.get_client(db=db, client_id=booking.client_id):
-        raise HTTPException(
-            status_code=404,
-            detail=f"No client found with id {booking.client_id}",
-        )
-    if not room_utils.get_room(db=db, room_id=booking.room_id):
-        raise HTTPException(
-            status_code=404,
-            detail=f"No room found with id {booking.room_id}",
-        )
+    client_utils.get_client(db=db, client_id=booking.client_id)
+    _room = room_utils.get_room(db=db, room_id=booking.room_id)
     if (
         booking.start_date < datetime.date.today()
         or booking.end_date <= datetime.date.today()
-        or booking.end_date < booking.start_date
+        or booking.end_date <= booking.start_date
     ):
         raise HTTPException(status_code=400, detail="Incorrect date")
-    response = room_utils.check_room_availability_by_date(
-        start_date=booking.start_date,
-        end_date=booking.end_date,
-        room_id=booking.room_id,
-        db=db,
-    )
-    if response["result"] == "booked":
-        raise HTTPException(status_code=400, detail="Room is booked")
     length_of_stay = (booking.end_date - booking.start_date).days
-    _room = room_utils.get_room(db=db, room_id=booking.room_id)
     _room_type = room_utils.get_room_type(
         db=db, room_type_id=_room.room_type_id
     )
@@ -68,7 +102,21 @@ def create_booking(db: Session, booking: BookingCreate):
         ts_updated=datetime.datetime.now(),
     )
     db.add(_booking)
-    db.commit()
+    inventory_utils.apply_stay(
+        db=db,
+        room_id=booking.room_id,
+        start_date=booking.start_date,
+        end_date=booking.end_date,
+        delta=1,
+    )
+    commit_booking(db=db)
+    occupancy_utils.set_stay(
+        db,
+        booking.room_id,
+        booking.start_date,
+        booking.end_date,
+        booked=True,
+    )
     db.refresh(_booking)
     return _booking
 
@@ -76,34 +124,29 @@ def create_booking(db: Session, booking: BookingCreate):
 def update_booking(db: Session, booking_id: int, booking: BookingCreate):
     """Update existing booking."""
     _booking = get_booking(db=db, booking_id=booking_id)
-    if not _booking:
-        raise HTTPException(
-            status_code=404, detail=f"No booking found with id {booking_id}"
-        )
-    if not client_utils.get_client(db=db, client_id=booking.client_id):
-        raise HTTPException(
-            status_code=404,
-            detail=f"No client with id {booking.client_id} found",
-        )
-    if not room_utils.get_room(db=db, room_id=booking.room_id):
-        raise HTTPException(
-            status_code=404,
-            detail=f"No room with id {booking.room_id} found",
-        )
+    client_utils.get_client(db=db, client_id=booking.client_id)
+    room_utils.get_room(db=db, room_id=booking.room_id)
+    _old_stay = (_booking.room_id, _booking.start_date, _booking.end_date)
     if booking.client_id:
         _booking.client_id = booking.client_id
     if booking.start_date and booking.start_date > datetime.date.today():
         _booking.start_date = booking.start_date
     else:
         raise HTTPException(status_code=400, detail="Incorrect date")
-    if booking.end_date:
+    # a stay is at least one night, an empty range would book nothing
+    if booking.end_date and booking.end_date > _booking.start_date:
         _booking.end_date = booking.end_date
     else:
         raise HTTPException(status_code=400, detail="Incorrect date")
     if booking.total_price:
         _booking.total_price = booking.total_price
     _booking.ts_updated = datetime.datetime.now()
-    db.commit()
+    _new_stay = (_booking.room_id, _booking.start_date, _booking.end_date)
+    inventory_utils.apply_stay(db, *_old_stay, delta=-1)
+    inventory_utils.apply_stay(db, *_new_stay, delta=1)
+    commit_booking(db=db)
+    occupancy_utils.set_stay(db, *_old_stay, booked=False)
+    occupancy_utils.set_stay(db, *_new_stay, booked=True)
     db.refresh(_booking)
     return _booking
 
@@ -115,13 +158,22 @@ def delete_booking(db: Session, booking_id: int):
         raise HTTPException(
             status_code=404, detail=f"No booking found with id {booking_id}"
         )
+    inventory_utils.apply_stay(
+        db=db,
+        room_id=_booking.room_id,
+        start_date=_booking.start_date,
+        end_date=_booking.end_date,
+        delta=-1,
+    )
+    _stay = (_booking.room_id, _booking.start_date, _booking.end_date)
     db.delete(_booking)
     db.commit()
+    occupancy_utils.set_stay(db, *_stay, booked=False)
     return {"result": f"Successfully deleted booking with id {booking_id}"}
 
 
-def filter_bookings(db: Session, booking: Optional[BookingFilter]):
-    """Filter bookings."""
+def filter_bookings_query(db: Session, booking: Optional[BookingFilter]):
+    """Build the query filtering bookings, in ID order."""
     query = db.query(Booking)
     if booking.client_id:
         query = query.filter(Booking.client_id == booking.client_id)
@@ -133,12 +185,17 @@ def filter_bookings(db: Session, booking: Optional[BookingFilter]):
         query = query.filter(Booking.end_date == booking.end_date)
     if booking.total_price:
         query = query.filter(Booking.total_price == booking.total_price)
-    filtered_bookings = query.all()
+    return query.order_by(Booking.id)
+
+
+def filter_bookings(db: Session, booking: Optional[BookingFilter]):
+    """Filter bookings."""
+    filtered_bookings = filter_bookings_query(db=db, booking=booking).all()
     return filtered_bookings
 
 
-def sort_bookings(db: Session, order: str, order_by: str):
-    """Sort room types by its properties."""
+def sort_bookings_query(db: Session, order: str, order_by: str):
+    """Build the query sorting bookings by its properties."""
     dct = {
         "id": Booking.id,
         "start_date": Booking.start_date,
@@ -161,5 +218,12 @@ def sort_bookings(db: Session, order: str, order_by: str):
         raise HTTPException(
             status_code=400, detail="Such order is not supported"
         )
-    sorted_bookings = sorted_query.all()
-    return sorted_bookings
+    return sorted_query
+
+
+def sort_bookings(db: Session, order: str, order_by: str):
+    """Sort bookings by its properties."""
+    sorted_bookings = sort_bookings_query(
+        db=db, order=order, order_by=order_by
+    )
+    return sorted_bookings.all()
@@ -0,0 +1,147 @@
+"""CRUD functions for the denormalized room catalog.
+
+A catalog row holds a room with the name, capacity and price of its
+type, the name of its facility and the list of its type's features, so
+a listing is read from one table. Every write to these tables refreshes
+only the catalog rows it affects, in the same transaction.
+
+Refreshes take turns on a transaction level advisory lock. The upsert
+reads the rooms, types and features as committed when it starts, and a
+write that committed while it waited for a catalog row would otherwise
+be overwritten with what was read before it.
+"""
+
+from typing import List, Type
+
+from pydantic import BaseModel
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from crud import pagination_utils, response_utils
+from models.room_catalog import RoomCatalog
+
+_COLUMNS = [
+    "room_id",
+    "description",
+    "floor",
+    "booking_status",
+    "cleanliness_status",
+    "room_type_id",
+    "room_type_name",
+    "capacity",
+    "price",
+    "facility_id",
+    "facility_name",
+    "features",
+]
+
+_SELECT = """
+    SELECT r.id, r.description, r.floor, r.booking_status,
+           r.cleanliness_status, r.room_type_id, rt.name, rt.capacity,
+           rt.price, r.facility_id, f.name,
+           coalesce((
+               SELECT jsonb_agg(
+                   jsonb_build_object('id', ft.id, 'name', ft.name)
+                   ORDER BY ft.id
+               )
+               FROM features_to_room_types l
+               JOIN features ft ON ft.id = l.feature_id
+               WHERE l.room_type_id = r.room_type_id
+           ), '[]')
+    FROM rooms r
+    LEFT JOIN room_types rt ON rt.id = r.room_type_id
+    LEFT JOIN facilities f ON f.id = r.facility_id
+"""
+
+# key of the advisory lock serializing catalog refreshes
+CATALOG_LOCK_KEY = 0x726F6F6D
+
+_UPDATES = ", ".join(f"{column} = EXCLUDED.{column}" for column in _COLUMNS)
+
+_UPSERT = f"""
+    INSERT INTO room_catalog ({", ".join(_COLUMNS)})
+    {_SELECT}
+    WHERE ({{rooms}})
+    ON CONFLICT (room_id) DO UPDATE SET {_UPDATES}
+"""
+
+# Rooms are matched on their current row and on their catalog row, which
+# still points at a room type or facility the write has just moved the
+# room away from (or deleted, leaving a NULL behind).
+_ROOMS = "r.id = ANY(:ids)"
+_ROOM_TYPES = (
+    "r.room_type_id = ANY(:ids) OR r.id IN "
+    "(SELECT room_id FROM room_catalog WHERE room_type_id = ANY(:ids))"
+)
+_FACILITIES = (
+    "r.facility_id = ANY(:ids) OR r.id IN "
+    "(SELECT room_id FROM room_catalog WHERE facility_id = ANY(:ids))"
+)
+_FEATURES = (
+    "r.room_type_id IN (SELECT room_type_id FROM features_to_room_types "
+    "WHERE feature_id = ANY(:ids)) OR r.id IN "
+    "(SELECT room_id FROM room_catalog c, jsonb_array_elements(c.features) e "
+    "WHERE CAST(e ->> 'id' AS integer) = ANY(:ids))"
+)
+
+
+def lock(db: Session):
+    """
+    Wait until no other transaction can change the catalog. Writes take
+    it after they are flushed, always in that order, or two of them
+    could wait on each other.
+    """
+    db.execute(select(func.pg_advisory_xact_lock(CATALOG_LOCK_KEY)))
+
+
+def _refresh(db: Session, rooms: str, ids: List[int]):
+    ids = [_id for _id in ids if _id is not None]
+    if ids:
+        # the pending changes have to be visible to the SELECT
+        db.flush()
+        lock(db)
+        db.execute(text(_UPSERT.format(rooms=rooms)), {"ids": ids})
+
+
+def refresh_rooms(db: Session, room_ids: List[int]):
+    """Refresh the catalog rows of rooms, deleted rooms cascade."""
+    _refresh(db, _ROOMS, room_ids)
+
+
+def refresh_room_types(db: Session, room_type_ids: List[int]):
+    """Refresh the rooms of room types after a type or its features changed."""
+    _refresh(db, _ROOM_TYPES, room_type_ids)
+
+
+def refresh_facilities(db: Session, facility_ids: List[int]):
+    """Refresh the rooms of facilities after a facility changed."""
+    _refresh(db, _FACILITIES, facility_ids)
+
+
+def refresh_features(db: Session, feature_ids: List[int]):
+    """Refresh the rooms listing features after a feature changed."""
+    _refresh(db, _FEATURES, feature_ids)
+
+
+def rebuild_catalog(db: Session):
+    """Recompute the whole catalog from the rooms."""
+    lock(db)
+    db.query(RoomCatalog).delete(synchronize_session=False)
+    db.execute(text(_UPSERT.format(rooms="TRUE")))
+
+
+def get_catalog(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: str = None,
+    schema: Type[BaseModel] = None,
+):
+    """Get the catalog by room ID, as rows of the schema's columns if given."""
+    return pagination_utils.paginate(
+        response_utils.project(db.query(RoomCatalog), schema),
+        RoomCatalog.room_id,
+        skip=skip,
+        limit=limit,
+        after=after,
+    )
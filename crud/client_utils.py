@@ -1,25 +1,37 @@
 """CRUD functions for Client."""
 
+from typing import Type
+
 from fastapi import HTTPException
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
+from crud import loader_utils, pagination_utils, response_utils
 from models.client import Client
 from schemas.client_schemas import ClientCreate
 
 
-def get_clients(db: Session, skip: int = 0, limit: int = 100):
-    """Get all clients."""
-    return db.query(Client).offset(skip).limit(limit).all()
+def get_clients(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: str = None,
+    schema: Type[BaseModel] = None,
+):
+    """Get all clients, as rows of the schema's columns if given."""
+    return pagination_utils.paginate(
+        # ClientFull has no id, the cursor needs it
+        response_utils.project(db.query(Client), schema, key="id"),
+        Client.id,
+        skip=skip,
+        limit=limit,
+        after=after,
+    )
 
 
 def get_client(db: Session, client_id: int):
     """Get client by id."""
-    _client = db.query(Client).filter(Client.id == client_id).first()
-    if not _client:
-        raise HTTPException(
-            status_code=404, detail=f"No client found with id {client_id}"
-        )
-    return _client
+    return loader_utils.load(db, Client, client_id, "client")
 
 
 def create_client(db: Session, client: ClientCreate):
@@ -0,0 +1,82 @@
+"""Conditional GET for endpoints serving the reference tables.
+
+Every write to a tracked table bumps its row in ``resource_versions``
+(see models/resource_version.py). The version makes the ETag and the
+time of the write the Last-Modified of every listing and item read from
+that table, so a client polling a listing with If-None-Match or
+If-Modified-Since gets an empty 304 from one primary key lookup, before
+any row is read or serialized. Item endpoints look their row up first,
+a missing id is a 404 even when the table's validators match.
+"""
+import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+
+from models.resource_version import ResourceVersion
+
+# clients may keep a copy but have to revalidate it before every use
+CACHE_CONTROL = "private, no-cache"
+
+
+def get_validators(db: Session, table: str) -> Optional[dict]:
+    """Get the ETag, Last-Modified and Cache-Control headers of a table."""
+    row = (
+        db.query(ResourceVersion.version, ResourceVersion.updated_at)
+        .filter(ResourceVersion.table_name == table)
+        .first()
+    )
+    if row is None:
+        return None
+    version, updated_at = row
+    return {
+        "ETag": f'"{table}-{version}"',
+        "Last-Modified": format_datetime(
+            updated_at.astimezone(datetime.timezone.utc), usegmt=True
+        ),
+        "Cache-Control": CACHE_CONTROL,
+    }
+
+
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # weak comparison, as RFC 9110 asks for If-None-Match
+    return "*" in tags or etag in [tag.replace("W/", "", 1) for tag in tags]
+
+
+def _not_modified_since(last_modified: str, if_modified_since: str) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    return parsedate_to_datetime(last_modified) <= since
+
+
+def check(
+    db: Session, table: str, request: Request, response: Response
+) -> Optional[Response]:
+    """
+    Set the validators of a table on response.
+
+    Returns a 304 response if the client's copy is still current, the
+    endpoint should then return it as is, otherwise None.
+    """
+    headers = get_validators(db=db, table=table)
+    if headers is None:
+        return None
+    response.headers.update(headers)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(headers["ETag"], if_none_match)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = if_modified_since is not None and _not_modified_since(
+            headers["Last-Modified"], if_modified_since
+        )
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return None
@@ -0,0 +1,138 @@
+"""CRUD functions for the per-room-type daily inventory."""
+
+import datetime
+from typing import List, Optional
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from crud import room_utils
+from models.inventory import RoomTypeInventory
+from models.room import Room
+
+# Every night of a half-open [start_date, end_date) stay.
+_NIGHTS = (
+    "generate_series(CAST({start} AS timestamp), "
+    "CAST({end} AS timestamp) - interval '1 day', interval '1 day')"
+)
+
+_APPLY_STAY = text(
+    f"""
+    INSERT INTO room_type_inventory (room_type_id, date, total, sold)
+    SELECT r.room_type_id, CAST(night AS date),
+           (SELECT count(*) FROM rooms WHERE room_type_id = r.room_type_id),
+           :delta
+    FROM rooms r
+    CROSS JOIN {_NIGHTS.format(start=":start_date", end=":end_date")} AS night
+    WHERE r.id = :room_id AND r.room_type_id IS NOT NULL
+    ON CONFLICT (room_type_id, date)
+    DO UPDATE SET sold = room_type_inventory.sold + EXCLUDED.sold
+    """
+)
+
+_REBUILD = f"""
+    INSERT INTO room_type_inventory (room_type_id, date, total, sold)
+    SELECT r.room_type_id, CAST(night AS date), totals.total, count(*)
+    FROM bookings b
+    JOIN rooms r ON r.id = b.room_id
+    JOIN (
+        SELECT room_type_id, count(*) AS total
+        FROM rooms
+        GROUP BY room_type_id
+    ) totals ON totals.room_type_id = r.room_type_id
+    CROSS JOIN LATERAL {_NIGHTS.format(start="b.start_date", end="b.end_date")}
+        AS night
+    WHERE night >= CAST(:from_date AS timestamp) {{room_types}}
+    GROUP BY r.room_type_id, night, totals.total
+"""
+
+
+def apply_stay(
+    db: Session,
+    room_id: Optional[int],
+    start_date: datetime.date,
+    end_date: datetime.date,
+    delta: int,
+):
+    """Add delta to the sold count of every night of a room's stay."""
+    if room_id is None:
+        return
+    db.execute(
+        _APPLY_STAY,
+        {
+            "room_id": room_id,
+            "start_date": start_date,
+            "end_date": end_date,
+            "delta": delta,
+        },
+    )
+
+
+def rebuild_inventory(
+    db: Session,
+    room_type_ids: Optional[List[int]] = None,
+    from_date: datetime.date = datetime.date.min,
+):
+    """Recompute inventory rows from bookings in bulk."""
+    delete = db.query(RoomTypeInventory).filter(
+        RoomTypeInventory.date >= from_date
+    )
+    params = {"from_date": from_date}
+    room_types = ""
+    if room_type_ids is not None:
+        delete = delete.filter(
+            RoomTypeInventory.room_type_id.in_(room_type_ids)
+        )
+        params["room_type_ids"] = list(room_type_ids)
+        room_types = "AND r.room_type_id = ANY(:room_type_ids)"
+    delete.delete(synchronize_session=False)
+    db.execute(text(_REBUILD.format(room_types=room_types)), params)
+
+
+def refresh_room_types(db: Session, room_type_ids: List[int]):
+    """Recompute upcoming inventory after the rooms of a type changed."""
+    room_type_ids = [_id for _id in room_type_ids if _id is not None]
+    if room_type_ids:
+        db.flush()
+        rebuild_inventory(
+            db=db,
+            room_type_ids=room_type_ids,
+            from_date=datetime.date.today(),
+        )
+
+
+def get_inventory(
+    db: Session, room_type_id: int, start_date: datetime.date, days: int
+):
+    """Get the daily inventory grid of a room type."""
+    room_utils.get_room_type(db=db, room_type_id=room_type_id)
+    end_date = start_date + datetime.timedelta(days=days)
+    _rows = (
+        db.query(RoomTypeInventory)
+        .filter(
+            RoomTypeInventory.room_type_id == room_type_id,
+            RoomTypeInventory.date >= start_date,
+            RoomTypeInventory.date < end_date,
+        )
+        .all()
+    )
+    by_date = {_row.date: _row for _row in _rows}
+    total = None
+    grid = []
+    for offset in range(days):
+        date = start_date + datetime.timedelta(days=offset)
+        _row = by_date.get(date)
+        if _row is not None:
+            grid.append({"date": date, "total": _row.total, "sold": _row.sold})
+            continue
+        # Nights nobody booked have no row yet
+        if total is None:
+            total = (
+                db.query(func.count(Room.id))
+                .filter(Room.room_type_id == room_type_id)
+                .scalar()
+            )
+        grid.append({"date": date, "total": total, "sold": 0})
+    for day in grid:
+        day["available"] = max(day["total"] - day["sold"], 0)
+    return grid
@@ -0,0 +1,34 @@
+"""Load rows by primary key at most once per request.
+
+Every request gets its own Session and ``Session.get`` looks in the
+session's identity map before going to the database, so a row that was
+already loaded while handling the request costs no second query. Loading
+by primary key through here instead of ``query().filter().first()`` makes
+the checks and lookups in the write paths share one SELECT per row.
+"""
+from typing import List
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+
+def load(db: Session, model, key, name: str, cache=None, options: List = ()):
+    """
+    Get a row by primary key, or raise 404 if there is none.
+
+    With a cache (see crud/reference_utils.py) a row not loaded yet in
+    this request is looked up there before going to the database. With
+    loader options the row is always read again, so a copy already in
+    the session gets its relations loaded too.
+    """
+    if options:
+        _row = db.get(model, key, options=options, populate_existing=True)
+    elif cache is None:
+        _row = db.get(model, key)
+    else:
+        _row = cache.load(db, model, key)
+    if _row is None:
+        raise HTTPException(
+            status_code=404, detail=f"No {name} found with id {key}"
+        )
+    return _row
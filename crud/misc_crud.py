@@ -1,10 +1,14 @@
 """CRUD functions which include using different tables."""
+from typing import List
+
 from fastapi import HTTPException
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
 
-from crud import room_utils, client_utils
+from crud import catalog_utils, pagination_utils, room_utils, client_utils
 from models.booking import Booking
-from models.room import Room
+from models.misc_tables import FeaturesToRoomTypes
+from models.room import Feature, Room, RoomType
 
 
 def get_bookings_for_room(
@@ -28,20 +32,11 @@ def get_bookings_for_room(
 
 def add_feature_to_room_type(db: Session, feature_id: int, room_type_id: int):
     """Add a new feature to a specified room type."""
-    if not room_utils.get_feature(db=db, feature_id=feature_id):
-        raise HTTPException(
-            status_code=404, detail=f"No feature found with id {feature_id}"
-        )
-    if not room_utils.get_room_type(db=db, room_type_id=room_type_id):
-        raise HTTPException(
-            status_code=404,
-            detail=f"No room type found with id {room_type_id}",
-        )
-    _room_type = room_utils.get_room_type(db=db, room_type_id=room_type_id)
     _feature = room_utils.get_feature(db=db, feature_id=feature_id)
+    _room_type = room_utils.get_room_type(db=db, room_type_id=room_type_id)
     _room_type.features.append(_feature)
+    catalog_utils.refresh_room_types(db=db, room_type_ids=[room_type_id])
     db.commit()
-    db.refresh(_room_type)
     response = {
         "result": f"Successfully added feature (id={feature_id}) \
 to room_type (id={room_type_id})"
@@ -53,17 +48,8 @@ def delete_feature_from_room_type(
     db: Session, feature_id: int, room_type_id: int
 ):
     """Add a new feature to a specified room type."""
-    if not room_utils.get_feature(db=db, feature_id=feature_id):
-        raise HTTPException(
-            status_code=404, detail=f"No feature found with id {feature_id}"
-        )
-    if not room_utils.get_room_type(db=db, room_type_id=room_type_id):
-        raise HTTPException(
-            status_code=404,
-            detail=f"No room type found with id {room_type_id}",
-        )
-    _room_type = room_utils.get_room_type(db=db, room_type_id=room_type_id)
     _feature = room_utils.get_feature(db=db, feature_id=feature_id)
+    _room_type = room_utils.get_room_type(db=db, room_type_id=room_type_id)
     if _feature not in _room_type.features:
         raise HTTPException(
             status_code=404,
@@ -71,8 +57,8 @@ def delete_feature_from_room_type(
 does not have a feature with id {feature_id}",
         )
     _room_type.features.remove(_feature)
+    catalog_utils.refresh_room_types(db=db, room_type_ids=[room_type_id])
     db.commit()
-    db.refresh(_room_type)
     response = {
         "result": f"Successfully deleted feature \
 (id={feature_id}) from room_type (id={room_type_id})"
@@ -80,17 +66,44 @@ does not have a feature with id {feature_id}",
     return response
 
 
+def _loaded_relationship(db: Session, model, key, attribute: str):
+    """
+    Get a relationship of a row if the session already holds both,
+    None when getting it would take a query.
+    """
+    identity = inspect(model).identity_key_from_primary_key((key,))
+    _row = db.identity_map.get(identity)
+    if _row is None or attribute in inspect(_row).unloaded:
+        return None
+    return getattr(_row, attribute)
+
+
+def _page(items: List, skip: int, limit: int) -> List:
+    """Get a page of loaded rows, ordered by ID as the queries are."""
+    return sorted(items, key=lambda item: item.id)[skip : skip + limit]
+
+
 def get_features_for_roomtype(
     db: Session, room_type_id: int, skip: int = 0, limit: int = 100
 ):
     """Get all features of the specified room type."""
-    _room_type = room_utils.get_room_type(db=db, room_type_id=room_type_id)
-    if not _room_type:
-        raise HTTPException(
-            status_code=404,
-            detail=f"No room type found with id {room_type_id}",
+    _features = _loaded_relationship(db, RoomType, room_type_id, "features")
+    if _features is not None:
+        return _page(_features, skip, limit)
+    _features = pagination_utils.paginate(
+        db.query(Feature)
+        .join(
+            FeaturesToRoomTypes,
+            FeaturesToRoomTypes.c.feature_id == Feature.id,
         )
-    _features = _room_type.features
+        .filter(FeaturesToRoomTypes.c.room_type_id == room_type_id),
+        Feature.id,
+        skip=skip,
+        limit=limit,
+    )
+    if not _features:
+        # tell a room type without features from a missing one
+        room_utils.get_room_type(db=db, room_type_id=room_type_id)
     return _features
 
 
@@ -98,24 +111,50 @@ def get_features_for_room(
     db: Session, room_id: int, skip: int = 0, limit: int = 100
 ):
     """Get all features of the specified room."""
-    _room = room_utils.get_room(db=db, room_id=room_id)
-    if not _room:
-        raise HTTPException(
-            status_code=404, detail=f"No room found with id {room_id}"
+    identity = inspect(Room).identity_key_from_primary_key((room_id,))
+    _room = db.identity_map.get(identity)
+    if _room is not None:
+        return get_features_for_roomtype(
+            db=db, room_type_id=_room.room_type_id, skip=skip, limit=limit
         )
-    _room_type_id = _room.room_type_id
-    return get_features_for_roomtype(
-        db=db, room_type_id=_room_type_id, skip=skip, limit=limit
+    _features = pagination_utils.paginate(
+        db.query(Feature)
+        .join(
+            FeaturesToRoomTypes,
+            FeaturesToRoomTypes.c.feature_id == Feature.id,
+        )
+        .join(Room, Room.room_type_id == FeaturesToRoomTypes.c.room_type_id)
+        .filter(Room.id == room_id),
+        Feature.id,
+        skip=skip,
+        limit=limit,
     )
+    if not _features:
+        room_utils.get_room(db=db, room_id=room_id)
+    return _features
 
 
-def get_room_types_with_feature(db: Session, feature_id: int):
+def get_room_types_with_feature(
+    db: Session, feature_id: int, skip: int = 0, limit: int = 100
+):
     """Get all room types with specified feature."""
-    _feature = room_utils.get_feature(db=db, feature_id=feature_id)
-    room_types = _feature.room_types
-    room_types_ids = [room_type.id for room_type in room_types]
-    rooms = db.query(Room).filter(Room.room_type_id.in_(room_types_ids)).all()
-    return rooms
+    _room_types = _loaded_relationship(db, Feature, feature_id, "room_types")
+    if _room_types is not None:
+        return _page(_room_types, skip, limit)
+    _room_types = pagination_utils.paginate(
+        db.query(RoomType)
+        .join(
+            FeaturesToRoomTypes,
+            FeaturesToRoomTypes.c.room_type_id == RoomType.id,
+        )
+        .filter(FeaturesToRoomTypes.c.feature_id == feature_id),
+        RoomType.id,
+        skip=skip,
+        limit=limit,
+    )
+    if not _room_types:
+        room_utils.get_feature(db=db, feature_id=feature_id)
+    return _room_types
 
 
 def get_bookings_of_client(db: Session, client_id: int):
@@ -127,3 +166,9 @@ def get_bookings_of_client(db: Session, client_id: int):
         )
     client_bookings = _client.bookings
     return client_bookings
+
+
+def get_bookings_of_client_query(db: Session, client_id: int):
+    """Build the query of all bookings made by a client."""
+    client_utils.get_client(db=db, client_id=client_id)
+    return db.query(Booking).filter(Booking.client_id == client_id)
@@ -0,0 +1,558 @@
+"""Rooms x days occupancy snapshot for availability searches.
+
+Reading and changing the snapshot costs CPU and, when it is shared, can
+wait on a file lock, so async CRUD functions keep it off the event loop:
+they ask it with ``ask_in_thread`` before running their queries, and run
+write functions through ``run_sync``, which applies the changes they
+queued with ``set_stay`` and ``add_room`` on the threadpool.
+"""
+
+import contextlib
+import datetime
+import fcntl
+import os
+import tempfile
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from db import SessionLocal
+from models.booking import Booking
+from models.room import Room
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency
+    np = None
+
+# default of the snapshot answers CRUD functions take: ask it in place
+ASK = object()
+
+# db.info key of the snapshot changes an async caller applies itself
+DEFERRED_CHANGES = "occupancy_changes"
+# seconds a read of the shared snapshot waits for a change to finish
+# before falling back to the database
+READ_TIMEOUT = 0.05
+
+# "off" always queries the database. "local" keeps a snapshot in the
+# worker process, only correct when it is the only process writing
+# bookings. "shared" keeps one memory-mapped snapshot for all workers of
+# a host, only correct when it is the only host writing bookings.
+OCCUPANCY_SNAPSHOT = os.getenv("OCCUPANCY_SNAPSHOT", "off")
+OCCUPANCY_HORIZON_DAYS = int(os.getenv("OCCUPANCY_HORIZON_DAYS", "730"))
+OCCUPANCY_SNAPSHOT_PATH = os.getenv(
+    "OCCUPANCY_SNAPSHOT_PATH",
+    os.path.join(tempfile.gettempdir(), "hotelscape-occupancy.bin"),
+)
+
+
+class OccupancySnapshot:
+    """Boolean matrix of booked nights, one row per room.
+
+    Column 0 is today and the matrix covers `horizon_days` nights. Each
+    cell is True when the room is booked for that night. Bookings of a
+    room never overlap, so a stay can be unmarked without checking
+    other bookings.
+    """
+
+    def __init__(self, horizon_days: int = OCCUPANCY_HORIZON_DAYS):
+        self.horizon_days = horizon_days
+        self.origin = None
+        self.room_ids = None
+        self.rows = {}
+        self.matrix = None
+        self._lock = threading.RLock()
+
+    @property
+    def ready(self) -> bool:
+        """Whether the snapshot has been built."""
+        return self.matrix is not None
+
+    def reset(self):
+        """Drop the snapshot so every check goes to the database."""
+        with self._lock:
+            self.origin = None
+            self.room_ids = None
+            self.rows = {}
+            self.matrix = None
+
+    def _load(self, db: Session, origin: datetime.date):
+        """Read rooms and bookings into a fresh matrix starting at origin."""
+        room_ids = np.array(
+            [_id for (_id,) in db.query(Room.id).order_by(Room.id)],
+            dtype=np.int64,
+        )
+        rows = {int(room_id): row for row, room_id in enumerate(room_ids)}
+        matrix = np.zeros((len(room_ids), self.horizon_days), dtype=bool)
+        self._fill(db, matrix, rows, origin, 0, self.horizon_days)
+        return room_ids, rows, matrix
+
+    def _fill(self, db: Session, matrix, rows, origin, first, last):
+        """Mark bookings overlapping columns [first, last) of a matrix."""
+        window_start = origin + datetime.timedelta(days=first)
+        window_end = origin + datetime.timedelta(days=last)
+        _bookings = db.query(
+            Booking.room_id, Booking.start_date, Booking.end_date
+        ).filter(
+            Booking.room_id.isnot(None),
+            Booking.start_date < window_end,
+            Booking.end_date > window_start,
+        )
+        for room_id, start_date, end_date in _bookings:
+            row = rows.get(room_id)
+            if row is None:
+                continue
+            start, end = self._columns(origin, start_date, end_date)
+            matrix[row, max(start, first) : min(end, last)] = True
+
+    def _columns(self, origin, start_date, end_date):
+        """Clip a stay to matrix columns."""
+        start = max((start_date - origin).days, 0)
+        end = min((end_date - origin).days, self.horizon_days)
+        return start, max(start, end)
+
+    def start(self, db: Session):
+        """Prepare the snapshot when a worker starts."""
+        self.build(db=db)
+
+    def build(self, db: Session):
+        """Build the snapshot from the bookings table."""
+        origin = datetime.date.today()
+        room_ids, rows, matrix = self._load(db=db, origin=origin)
+        with self._lock:
+            self.origin = origin
+            self.room_ids = room_ids
+            self.rows = rows
+            self.matrix = matrix
+
+    def roll(self, db: Session):
+        """Move the horizon forward to start today."""
+        today = datetime.date.today()
+        with self._lock:
+            if not self.ready or self.origin >= today:
+                return
+            shift = (today - self.origin).days
+            if shift >= self.horizon_days:
+                self.build(db=db)
+                return
+            self.matrix[:, :-shift] = self.matrix[:, shift:]
+            self.matrix[:, -shift:] = False
+            self.origin = today
+            self._fill(
+                db,
+                self.matrix,
+                self.rows,
+                self.origin,
+                self.horizon_days - shift,
+                self.horizon_days,
+            )
+
+    def _window(self, start_date, end_date):
+        """Columns of a stay, or None if it is outside the horizon."""
+        if not self.ready or start_date < self.origin:
+            return None
+        start = (start_date - self.origin).days
+        end = (end_date - self.origin).days
+        if end > self.horizon_days:
+            return None
+        return start, end
+
+    def is_vacant(self, room_id: int, start_date, end_date) -> Optional[bool]:
+        """Check a room, or return None if the snapshot cannot tell."""
+        with self._lock:
+            window = self._window(start_date, end_date)
+            row = self.rows.get(room_id)
+            if window is None or row is None:
+                return None
+            start, end = window
+            return not self.matrix[row, start:end].any()
+
+    def room_ids_by_vacancy(
+        self, start_date, end_date
+    ) -> Optional[Tuple[List[int], List[int]]]:
+        """
+        IDs of the vacant rooms and of all rooms in the snapshot, or None
+        if the snapshot cannot tell. Rooms missing from the snapshot have
+        to be checked against the database.
+        """
+        with self._lock:
+            window = self._window(start_date, end_date)
+            if window is None:
+                return None
+            start, end = window
+            booked = self.matrix[:, start:end].any(axis=1)
+            return self.room_ids[~booked].tolist(), self.room_ids.tolist()
+
+    def vacant_room_ids(self, start_date, end_date) -> Optional[List[int]]:
+        """IDs of vacant rooms in the snapshot, None if it cannot tell."""
+        room_ids = self.room_ids_by_vacancy(start_date, end_date)
+        return None if room_ids is None else room_ids[0]
+
+    def set_stay(self, room_id, start_date, end_date, booked: bool):
+        """Mark or unmark the nights of a committed stay."""
+        with self._lock:
+            row = self.rows.get(room_id)
+            if not self.ready or row is None:
+                return
+            start, end = self._columns(self.origin, start_date, end_date)
+            self.matrix[row, start:end] = booked
+
+    def add_room(self, room_id: int):
+        """Start tracking a newly created room with no bookings."""
+        with self._lock:
+            if not self.ready:
+                return
+            row = self.rows.get(room_id)
+            if row is not None:
+                self.matrix[row] = False
+                return
+            self.rows[room_id] = len(self.room_ids)
+            self.room_ids = np.append(self.room_ids, room_id)
+            self.matrix = np.vstack(
+                [self.matrix, np.zeros((1, self.horizon_days), dtype=bool)]
+            )
+
+    def verify(self, db: Session) -> List[int]:
+        """IDs of rooms whose snapshot row differs from the database."""
+        with self._lock:
+            if not self.ready:
+                return []
+            room_ids, rows, matrix = self._load(db=db, origin=self.origin)
+            mismatched = set(room_ids.tolist()) ^ set(self.rows)
+            for room_id, row in rows.items():
+                own_row = self.rows.get(room_id)
+                if own_row is not None and not np.array_equal(
+                    matrix[row], self.matrix[own_row]
+                ):
+                    mismatched.add(room_id)
+            return sorted(mismatched)
+
+
+_MAGIC = b"HSOCC001"
+if np is not None:
+    _HEADER = np.dtype(
+        [
+            ("magic", "S8"),
+            ("generation", "<u8"),
+            ("origin", "<i8"),
+            ("rooms", "<i8"),
+            ("days", "<i8"),
+            ("retired", "<u8"),
+            ("reserved", "<u8", (2,)),
+        ]
+    )
+
+
+class SharedOccupancySnapshot(OccupancySnapshot):
+    """Occupancy snapshot kept in one memory-mapped file per host.
+
+    The file holds a 64-byte header, the room IDs and the matrix, and
+    every worker maps it read-write and reads it without copying. Only
+    one process writes at a time, holding an exclusive flock on a
+    sidecar lock file. In-place changes make the header generation odd
+    while they run, and readers retry until they see the same even
+    generation before and after a read. Changes of the file layout
+    (a new room, a rebuild, a new day) write a new file, rename it over
+    the old one and flag the old one as retired so readers remap.
+    """
+
+    def __init__(
+        self,
+        path: str = OCCUPANCY_SNAPSHOT_PATH,
+        horizon_days: int = OCCUPANCY_HORIZON_DAYS,
+    ):
+        super().__init__(horizon_days=horizon_days)
+        self.path = path
+        self._buffer = None
+        self._header = None
+
+    def reset(self):
+        """Unmap the snapshot file so every check goes to the database."""
+        with self._lock:
+            super().reset()
+            self._buffer = None
+            self._header = None
+
+    @contextlib.contextmanager
+    def _writer(self):
+        """Hold the host-wide writer lock."""
+        with open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _map(self):
+        """Map the current snapshot file."""
+        buffer = np.memmap(self.path, dtype=np.uint8, mode="r+")
+        header = buffer[: _HEADER.itemsize].view(_HEADER)
+        if header["magic"][0] != _MAGIC:
+            raise ValueError(f"{self.path} is not an occupancy snapshot")
+        rooms = int(header["rooms"][0])
+        days = int(header["days"][0])
+        offset = _HEADER.itemsize
+        room_ids = buffer[offset : offset + rooms * 8].view("<i8")
+        offset += rooms * 8
+        matrix = buffer[offset : offset + rooms * days].view(np.bool_)
+        with self._lock:
+            self._buffer = buffer
+            self._header = header
+            self.origin = datetime.date.fromordinal(int(header["origin"][0]))
+            self.room_ids = room_ids
+            self.rows = {
+                int(room_id): row for row, room_id in enumerate(room_ids)
+            }
+            self.matrix = matrix.reshape(rooms, days)
+
+    def _sync(self):
+        """Remap the file if another process replaced it."""
+        if self._header is not None and not self._header["retired"][0]:
+            return
+        try:
+            self._map()
+        except (OSError, ValueError):
+            self.reset()
+
+    def _write(self, origin: datetime.date, room_ids, matrix):
+        """Replace the snapshot file with new contents."""
+        header = np.zeros(1, dtype=_HEADER)
+        header["magic"] = _MAGIC
+        header["origin"] = origin.toordinal()
+        header["rooms"] = len(room_ids)
+        header["days"] = matrix.shape[1]
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as tmp_file:
+            tmp_file.write(header.tobytes())
+            tmp_file.write(np.asarray(room_ids, dtype="<i8").tobytes())
+            tmp_file.write(
+                np.ascontiguousarray(matrix, dtype=np.bool_).tobytes()
+            )
+        os.replace(tmp_path, self.path)
+        if self._header is not None:
+            self._header["retired"] = 1
+        self._map()
+
+    def _build_locked(self, db: Session):
+        """Rebuild the file from the database under the writer lock."""
+        origin = datetime.date.today()
+        room_ids, _, matrix = self._load(db=db, origin=origin)
+        self._write(origin, room_ids, matrix)
+
+    def _stale(self) -> bool:
+        """Whether the mapped file is missing or starts before today."""
+        return (
+            not self.ready
+            or self.origin < datetime.date.today()
+            or self.matrix.shape[1] != self.horizon_days
+        )
+
+    def _torn(self) -> bool:
+        """Whether a change is running or a writer died during one."""
+        return self.ready and int(self._header["generation"][0]) % 2 == 1
+
+    def _read(self, method, *args):
+        """
+        Run a read against a consistent generation of the file, None if
+        none was seen before the deadline.
+        """
+        deadline = time.monotonic() + READ_TIMEOUT
+        while time.monotonic() < deadline:
+            self._sync()
+            if not self.ready:
+                return None
+            header = self._header
+            generation = int(header["generation"][0])
+            if generation % 2 == 0:
+                result = method(*args)
+                if (
+                    int(header["generation"][0]) == generation
+                    and not header["retired"][0]
+                ):
+                    return result
+            time.sleep(0)
+        return None
+
+    def start(self, db: Session):
+        """Attach to the host's snapshot, building it if it is stale."""
+        with self._writer():
+            self._sync()
+            if self._stale() or self._torn():
+                self._build_locked(db=db)
+
+    def build(self, db: Session):
+        """Rebuild the host's snapshot from the bookings table."""
+        with self._writer():
+            self._build_locked(db=db)
+
+    def roll(self, db: Session):
+        """
+        Rebuild the snapshot once the date has moved on, or once a writer
+        died halfway through a change.
+        """
+        self._sync()
+        if not self.ready or not (self._stale() or self._torn()):
+            return
+        with self._writer():
+            self._sync()
+            # with the lock held an odd generation is never a live change
+            if self.ready and (self._stale() or self._torn()):
+                self._build_locked(db=db)
+
+    def is_vacant(self, room_id: int, start_date, end_date) -> Optional[bool]:
+        """Check a room, or return None if the snapshot cannot tell."""
+        return self._read(super().is_vacant, room_id, start_date, end_date)
+
+    def room_ids_by_vacancy(
+        self, start_date, end_date
+    ) -> Optional[Tuple[List[int], List[int]]]:
+        """
+        IDs of the vacant rooms and of all rooms in the snapshot, or None
+        if the snapshot cannot tell.
+        """
+        return self._read(super().room_ids_by_vacancy, start_date, end_date)
+
+    def verify(self, db: Session) -> List[int]:
+        """IDs of rooms whose snapshot row differs from the database."""
+        return self._read(super().verify, db) or []
+
+    def set_stay(self, room_id, start_date, end_date, booked: bool):
+        """Mark or unmark the nights of a committed stay."""
+        if not self.ready:
+            return
+        with self._writer():
+            self._sync()
+            # a torn file is rebuilt from the database by the next roll
+            if not self.ready or self._torn():
+                return
+            self._header["generation"] += 1
+            try:
+                super().set_stay(room_id, start_date, end_date, booked)
+            finally:
+                self._header["generation"] += 1
+
+    def add_room(self, room_id: int):
+        """Start tracking a newly created room with no bookings."""
+        if not self.ready:
+            return
+        with self._writer():
+            self._sync()
+            if not self.ready or self._torn():
+                return
+            if room_id in self.rows:
+                self._header["generation"] += 1
+                try:
+                    self.matrix[self.rows[room_id]] = False
+                finally:
+                    self._header["generation"] += 1
+                return
+            self._write(
+                self.origin,
+                np.append(self.room_ids, room_id),
+                np.vstack(
+                    [self.matrix, np.zeros((1, self.horizon_days), dtype=bool)]
+                ),
+            )
+
+
+if OCCUPANCY_SNAPSHOT == "shared":
+    snapshot = SharedOccupancySnapshot()
+else:
+    snapshot = OccupancySnapshot()
+
+
+def is_enabled() -> bool:
+    """Whether the occupancy snapshot is configured and usable."""
+    return np is not None and OCCUPANCY_SNAPSHOT != "off"
+
+
+def build_snapshot(db: Session):
+    """Build or attach the occupancy snapshot if it is enabled."""
+    if is_enabled():
+        snapshot.start(db=db)
+
+
+def get_snapshot(db: Session) -> Optional[OccupancySnapshot]:
+    """Get the snapshot rolled forward to today, if it is built."""
+    if not snapshot.ready:
+        return None
+    snapshot.roll(db=db)
+    return snapshot
+
+
+def ask(db: Session, method: str, *args):
+    """Ask the snapshot rolled to today, None if it cannot tell."""
+    _snapshot = get_snapshot(db=db)
+    if _snapshot is None:
+        return None
+    return getattr(_snapshot, method)(*args)
+
+
+async def ask_in_thread(method: str, *args):
+    """
+    Ask the snapshot on the threadpool, rolling it with a session of its
+    own, None if it cannot tell.
+    """
+    if not snapshot.ready:
+        return None
+
+    def _ask():
+        with SessionLocal() as db:
+            return ask(db, method, *args)
+
+    return await run_in_threadpool(_ask)
+
+
+def _change(db: Session, method: str, *args):
+    changes = db.info.get(DEFERRED_CHANGES)
+    if changes is None:
+        getattr(snapshot, method)(*args)
+    else:
+        changes.append((method, args))
+
+
+def set_stay(db: Session, room_id, start_date, end_date, booked: bool):
+    """Mark or unmark the nights of a stay db has committed."""
+    _change(db, "set_stay", room_id, start_date, end_date, booked)
+
+
+def add_room(db: Session, room_id: int):
+    """Start tracking a room db has committed."""
+    _change(db, "add_room", room_id)
+
+
+def _apply(changes: list):
+    for method, args in changes:
+        getattr(snapshot, method)(*args)
+
+
+async def run_sync(db: AsyncSession, fn, *args, **kwargs):
+    """
+    Run a sync CRUD function on an async session, then apply the
+    snapshot changes it made on the threadpool.
+    """
+    changes = db.sync_session.info[DEFERRED_CHANGES] = []
+    try:
+        return await db.run_sync(fn, *args, **kwargs)
+    finally:
+        del db.sync_session.info[DEFERRED_CHANGES]
+        if changes and snapshot.ready:
+            await run_in_threadpool(_apply, changes)
+
+
+def check_snapshot(db: Session, repair: bool = False):
+    """Compare the snapshot with the database and optionally rebuild it."""
+    if not snapshot.ready:
+        return {"enabled": is_enabled(), "consistent": None, "room_ids": []}
+    mismatched = snapshot.verify(db=db)
+    if mismatched and repair:
+        snapshot.build(db=db)
+    return {
+        "enabled": True,
+        "consistent": not mismatched,
+        "room_ids": mismatched,
+    }
@@ -0,0 +1,86 @@
+"""Keyset pagination for list endpoints.
+
+``offset`` makes Postgres read and throw away every skipped row, so deep
+pages get slower and slower. A cursor instead holds the sort key of the
+last row of a page and the next page starts right after it through the
+key's index. Cursors are opaque to clients: base64 encoded JSON.
+"""
+import base64
+import binascii
+import json
+from typing import List, Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(key: int) -> str:
+    """Make a cursor pointing after the row with the given key."""
+    payload = json.dumps({"after": key}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Get the key a cursor points after."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded))["after"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        key = None
+    if not isinstance(key, int) or isinstance(key, bool):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+def paginate_query(
+    query: Query,
+    key,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+) -> Query:
+    """
+    Limit a query ordered by key to one page.
+
+    With a cursor the page starts after the cursor's key and skip is
+    ignored, otherwise the first skip rows are left out.
+    """
+    query = query.order_by(key)
+    if after is not None:
+        query = query.filter(key > decode_cursor(after))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def paginate(
+    query: Query,
+    key,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+) -> List:
+    """Get one page of a query ordered by key, see paginate_query."""
+    return paginate_query(
+        query, key, skip=skip, limit=limit, after=after
+    ).all()
+
+
+def set_next_cursor(
+    response: Response, items: List, limit: int, key: str = "id"
+):
+    """Send the cursor of the next page in the X-Next-Cursor header."""
+    if limit and len(items) >= limit:
+        set_next_cursor_after(
+            response, len(items), getattr(items[-1], key), limit
+        )
+
+
+def set_next_cursor_after(
+    response: Response, count: int, last_key: int, limit: int
+):
+    """Send the cursor after last_key if the page of count rows is full."""
+    if limit and count >= limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last_key)
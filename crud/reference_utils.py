@@ -0,0 +1,234 @@
+"""Per-worker cache of room types, facilities and features.
+
+These tables change a few times a year but are looked up on nearly every
+room and booking write. Their rows are kept in memory per table, each
+table with a version number. Writes through ``crud/room_utils.py`` bump
+the version in this worker and send ``NOTIFY reference_cache`` with the
+table name, which Postgres delivers on commit to the listener thread of
+every worker on every node. Rows read from an older version are never
+stored, so a lookup racing an invalidation cannot bring back stale data.
+The TTL bounds staleness for changes made outside the API. Rows read
+from a replica are never stored, a lagging replica could still return
+the row an invalidation has just dropped.
+"""
+import os
+import select
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from db import is_replica
+from models.room import Facility, Feature, RoomType
+
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "300"))
+REFERENCE_CACHE_CHANNEL = "reference_cache"
+
+CACHED_MODELS = {
+    model.__tablename__: model for model in (RoomType, Facility, Feature)
+}
+
+
+class ReferenceCache:
+    """Column values of reference rows by table and primary key."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._rows = {table: {} for table in CACHED_MODELS}
+        self.versions = {table: 0 for table in CACHED_MODELS}
+        self._lock = threading.Lock()
+        self.listening = False
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def version(self, table: str) -> int:
+        """Get the current version of a table."""
+        with self._lock:
+            return self.versions[table]
+
+    def get(self, table: str, key) -> Optional[dict]:
+        """Get the cached values of a row, None if missing or expired."""
+        with self._lock:
+            entry = self._rows[table].get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def set(self, table: str, key, values: dict, version: int):
+        """Cache a row read while the table was at the given version."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self.versions[table] == version:
+                self._rows[table][key] = (time.monotonic() + self.ttl, values)
+
+    def invalidate(self, table: str):
+        """Drop every row of a table and move it to a new version."""
+        with self._lock:
+            if table in self.versions:
+                self.versions[table] += 1
+                self._rows[table].clear()
+
+    def clear(self):
+        """Drop every row of every table and reset the counters."""
+        for table in CACHED_MODELS:
+            self.invalidate(table)
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def load(self, db: Session, model, key):
+        """
+        Get a row attached to db, from the cache if possible.
+
+        A row already in the session's identity map is returned as is, so
+        changes made earlier in the request are never overwritten.
+        """
+        identity = inspect(model).identity_key_from_primary_key((key,))
+        _row = db.identity_map.get(identity)
+        if _row is not None:
+            return _row
+        if not self.enabled:
+            return db.get(model, key)
+        table = model.__tablename__
+        values = self.get(table, key)
+        if values is not None:
+            _row = model(**values)
+            make_transient_to_detached(_row)
+            # a copy is attached, the cached values are never shared
+            return db.merge(_row, load=False)
+        version = self.version(table)
+        _row = db.get(model, key)
+        if _row is not None and not is_replica(db):
+            self.set(table, key, column_values(_row), version)
+        return _row
+
+    def stats(self) -> dict:
+        """Get the counters, versions and number of rows per table."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "listening": self.listening,
+                "hits": self.hits,
+                "misses": self.misses,
+                "versions": dict(self.versions),
+                "rows": {
+                    table: len(rows) for table, rows in self._rows.items()
+                },
+            }
+
+
+reference_cache = ReferenceCache(ttl=REFERENCE_CACHE_TTL)
+
+
+def column_values(_row) -> dict:
+    """Get the column attributes of a row."""
+    return {
+        attr.key: getattr(_row, attr.key)
+        for attr in inspect(_row).mapper.column_attrs
+    }
+
+
+def warm_up(db: Session):
+    """Read all reference tables into the cache."""
+    if not reference_cache.enabled:
+        return
+    for table, model in CACHED_MODELS.items():
+        version = reference_cache.version(table)
+        for _row in db.query(model):
+            reference_cache.set(table, _row.id, column_values(_row), version)
+
+
+def invalidate(db: Session, model):
+    """
+    Drop the cached rows of a model's table in this worker now and, once
+    db commits, in every worker.
+    """
+    table = model.__tablename__
+    reference_cache.invalidate(table)
+    db.execute(func.pg_notify(REFERENCE_CACHE_CHANNEL, table).select())
+    db.info.setdefault("invalidated_tables", set()).add(table)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_tables(session):
+    # invalidate again, a request may have cached the old row meanwhile
+    for table in session.info.pop("invalidated_tables", ()):
+        reference_cache.invalidate(table)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_tables(session):
+    session.info.pop("invalidated_tables", None)
+
+
+class ReferenceListener:
+    """Thread invalidating the cache on NOTIFY from any worker."""
+
+    def __init__(self, engine, poll_interval: float = 1.0):
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="reference-cache", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _connect(self):
+        # a connection of its own, it is never returned to the pool
+        dialect = self.engine.dialect
+        cargs, cparams = dialect.create_connect_args(self.engine.url)
+        connection = dialect.connect(*cargs, **cparams)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {REFERENCE_CACHE_CHANNEL}")
+        return connection
+
+    def _run(self):
+        reconnect = False
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = self._connect()
+                if reconnect:
+                    # notifications were missed while not listening
+                    for table in CACHED_MODELS:
+                        reference_cache.invalidate(table)
+                reconnect = True
+                reference_cache.listening = True
+                while not self._stop.is_set():
+                    ready, _, _ = select.select(
+                        [connection], [], [], self.poll_interval
+                    )
+                    if not ready:
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        notify = connection.notifies.pop(0)
+                        reference_cache.invalidate(notify.payload)
+            except Exception:
+                reconnect = True
+                self._stop.wait(self.poll_interval)
+            finally:
+                reference_cache.listening = False
+                if connection is not None:
+                    connection.close()
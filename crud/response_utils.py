@@ -0,0 +1,280 @@
+"""Streaming and fast JSON responses for list endpoints.
+
+A JSON list needs every row in memory as an ORM object, a pydantic model
+and finally one big body. Streamed responses instead read the rows in
+batches through a server side cursor and write one line per row, so
+memory stays flat however many rows match.
+
+Pages of a paginated list are small enough to keep in memory, but for
+each row FastAPI builds an ORM object, validates a pydantic model from
+it and encodes that with the stdlib json module. With JSON_RESPONSE_MODE
+set to "fast" these endpoints select only the columns of their response
+schema and encode the rows with orjson. With "database" Postgres builds
+the whole body with json_agg over the same columns and the bytes are
+sent as they come, no row ever reaches Python. The response schema in
+the OpenAPI document stays the same.
+
+A ``fields`` parameter narrows a list to some of its schema's fields,
+in any mode: only their columns are selected and encoded, the same as
+the "fast" path does for the whole schema.
+"""
+import csv
+import datetime
+import functools
+import io
+import json
+import os
+from enum import Enum
+from typing import Any, Iterator, List, NamedTuple, Optional, Type
+
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, create_model
+from sqlalchemy import Text, cast, func, literal
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Query
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional dependency
+    orjson = None
+
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "1000"))
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# "fast" encodes list pages straight from the selected columns,
+# "database" has Postgres encode them, "orm" validates every row with the
+# endpoint's response model first.
+JSON_RESPONSE_MODE = os.getenv("JSON_RESPONSE_MODE", "orm")
+
+
+class ResponseFormat(str, Enum):
+    json = "json"
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+MEDIA_TYPES = {
+    ResponseFormat.ndjson: "application/x-ndjson",
+    ResponseFormat.csv: "text/csv",
+}
+
+
+def iter_rows(query: Query, schema: Type[BaseModel]) -> Iterator[BaseModel]:
+    """Read the rows of a query in batches from a server side cursor."""
+    for row in query.yield_per(STREAM_BATCH_SIZE):
+        yield schema.from_orm(row)
+
+
+def iter_ndjson(query: Query, schema: Type[BaseModel]) -> Iterator[str]:
+    """Write every row as one line of JSON."""
+    for item in iter_rows(query, schema):
+        yield item.json() + "\n"
+
+
+def iter_csv(query: Query, schema: Type[BaseModel]) -> Iterator[str]:
+    """Write a header with the schema's fields and one line per row."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    fields = list(schema.__fields__)
+    writer.writerow(fields)
+    yield buffer.getvalue()
+    for item in iter_rows(query, schema):
+        buffer.seek(0)
+        buffer.truncate()
+        values = jsonable_encoder(item)
+        writer.writerow([values[field] for field in fields])
+        yield buffer.getvalue()
+
+
+def iter_chunks(lines: Iterator[str]) -> Iterator[str]:
+    """Join lines into chunks of about STREAM_CHUNK_SIZE characters."""
+    chunk, size = [], 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= STREAM_CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield "".join(chunk)
+
+
+def stream_query(
+    query: Query, schema: Type[BaseModel], response_format: ResponseFormat
+) -> StreamingResponse:
+    """Stream the rows of a query as NDJSON or CSV."""
+    if response_format == ResponseFormat.csv:
+        rows = iter_csv(query, schema)
+    else:
+        rows = iter_ndjson(query, schema)
+    # each chunk is sent from the threadpool, one row per chunk is too slow
+    return StreamingResponse(
+        iter_chunks(rows), media_type=MEDIA_TYPES[response_format]
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _sparse_model(schema: Type[BaseModel], names: tuple) -> Type[BaseModel]:
+    return create_model(
+        f"{schema.__name__}Fields",
+        **{
+            name: (schema.__fields__[name].outer_type_, None) for name in names
+        },
+    )
+
+
+def sparse_schema(
+    schema: Type[BaseModel], fields: Optional[str], key: str = "id"
+) -> Type[BaseModel]:
+    """
+    Narrow a schema to the comma separated fields, raise 400 for a field
+    it does not have. The key is kept if the schema has it, pages are
+    cut after it.
+    """
+    if fields is None:
+        return schema
+    requested = {field.strip() for field in fields.split(",")}
+    requested.discard("")
+    unknown = sorted(requested - schema.__fields__.keys())
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields {', '.join(unknown)}, "
+            f"allowed: {', '.join(schema.__fields__)}",
+        )
+    if key in schema.__fields__:
+        requested.add(key)
+    names = tuple(name for name in schema.__fields__ if name in requested)
+    return _sparse_model(schema, names)
+
+
+def fast_json_schema(
+    schema: Type[BaseModel], fields: Optional[str] = None, key: str = "id"
+) -> Optional[Type[BaseModel]]:
+    """
+    Get the schema to select a list page with: the requested fields if
+    any, otherwise the whole schema in "fast" mode and None in "orm" mode.
+    """
+    if fields is not None:
+        return sparse_schema(schema, fields, key=key)
+    return schema if JSON_RESPONSE_MODE == "fast" else None
+
+
+def database_json_schema(
+    schema: Type[BaseModel], fields: Optional[str] = None, key: str = "id"
+) -> Optional[Type[BaseModel]]:
+    """
+    Get the schema, narrowed to the requested fields if any, to encode a
+    list with, None unless in "database" mode.
+    """
+    if JSON_RESPONSE_MODE != "database":
+        return None
+    return sparse_schema(schema, fields, key=key)
+
+
+def project(
+    query: Query, schema: Optional[Type[BaseModel]], key: str = None
+) -> Query:
+    """
+    Select only the columns behind a schema's fields, as rows, and the
+    key the page's cursor is read from if the schema does not have it.
+
+    Without a schema the query is left as it is.
+    """
+    if schema is None:
+        return query
+    entity = query.column_descriptions[0]["entity"]
+    fields = list(schema.__fields__)
+    if key is not None and key not in fields:
+        fields.append(key)
+    return query.with_entities(*(getattr(entity, field) for field in fields))
+
+
+def _default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    """Encode content as compact JSON, the same as JSONResponse would."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=_default,
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson when it is installed."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def rows_response(
+    rows: List, response: Response, schema: Type[BaseModel] = None
+) -> FastJSONResponse:
+    """
+    Encode rows selected by project as a JSON list, keeping the headers
+    already set on the endpoint's response. With a schema only its fields
+    are sent.
+    """
+    if schema is None:
+        content = [row._asdict() for row in rows]
+    else:
+        content = [
+            {field: getattr(row, field) for field in schema.__fields__}
+            for row in rows
+        ]
+    fast_response = FastJSONResponse(content)
+    fast_response.raw_headers.extend(response.raw_headers)
+    return fast_response
+
+
+class JSONArray(NamedTuple):
+    """A JSON list encoded by Postgres, with its length and last key."""
+
+    body: str
+    count: int
+    last: Any
+
+
+def json_array(
+    query: Query, schema: Type[BaseModel], key: Optional[str] = "id"
+) -> JSONArray:
+    """
+    Have Postgres encode the rows of a query as a JSON list of objects
+    with the schema's fields, ordered by the key field if given.
+    """
+    rows = project(query, schema).subquery("rows")
+    row = func.row_to_json(rows.table_valued())
+    if key is not None:
+        items = func.json_agg(aggregate_order_by(row, rows.c[key]))
+        last = func.max(rows.c[key])
+    else:
+        items = func.json_agg(row)
+        last = literal(None)
+    # cast to text, the driver would otherwise decode the JSON
+    body = func.coalesce(cast(items, Text), "[]")
+    statement = query.session.query(body, func.count(), last).select_from(rows)
+    return JSONArray(*statement.one())
+
+
+def json_array_response(
+    array: JSONArray, response: Optional[Response] = None
+) -> Response:
+    """
+    Send a list encoded by json_array as it is, keeping the headers
+    already set on the endpoint's response.
+    """
+    json_response = Response(array.body, media_type="application/json")
+    if response is not None:
+        json_response.raw_headers.extend(response.raw_headers)
+    return json_response
@@ -1,13 +1,27 @@
 """CRUD functions for Room, Facility, Feature and RoomType."""
 
 import datetime
-from typing import Optional
+from typing import List, Optional, Type
 from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from models.booking import Booking
+from models.misc_tables import FeaturesToRoomTypes
 
 from models.room import Facility, Feature, Room, RoomType
+from crud import (
+    availability_utils,
+    catalog_utils,
+    inventory_utils,
+    loader_utils,
+    occupancy_utils,
+    pagination_utils,
+    reference_utils,
+    response_utils,
+)
 from crud.client_utils import get_client
+from crud.reference_utils import reference_cache
 from schemas.room_schemas import (
     FacilityCreate,
     FeatureCreate,
@@ -22,19 +36,30 @@ from schemas.room_schemas import (
 # Room CRUD
 
 
-def get_rooms(db: Session, skip: int = 0, limit: int = 100):
-    """Get all rooms."""
-    return db.query(Room).offset(skip).limit(limit).all()
+def get_rooms(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: str = None,
+    schema: Type[BaseModel] = None,
+    options: List = (),
+):
+    """
+    Get all rooms, as rows of the schema's columns if given, with the
+    loader options applied otherwise.
+    """
+    return pagination_utils.paginate(
+        response_utils.project(db.query(Room).options(*options), schema),
+        Room.id,
+        skip=skip,
+        limit=limit,
+        after=after,
+    )
 
 
 def get_room(db: Session, room_id: int):
     """Get room by id."""
-    _room = db.query(Room).filter(Room.id == room_id).first()
-    if not _room:
-        raise HTTPException(
-            status_code=404, detail=f"No room found with id {room_id}"
-        )
-    return _room
+    return loader_utils.load(db, Room, room_id, "room")
 
 
 def create_room(db: Session, room: RoomCreate):
@@ -49,8 +74,7 @@ def create_room(db: Session, room: RoomCreate):
             status_code=404,
             detail=f"No facility with id {room.facility_id} found",
         )
-    _room = db.query(Room).filter(Room.id == room.id).first()
-    if _room:
+    if db.get(Room, room.id):
         raise HTTPException(
             status_code=400, detail=f"Room with id {room.id} already exists"
         )
@@ -64,7 +88,12 @@ def create_room(db: Session, room: RoomCreate):
         cleanliness_status=room.cleanliness_status,
     )
     db.add(_room)
+    inventory_utils.refresh_room_types(
+        db=db, room_type_ids=[room.room_type_id]
+    )
+    catalog_utils.refresh_rooms(db=db, room_ids=[room.id])
     db.commit()
+    occupancy_utils.add_room(db, room.id)
     db.refresh(_room)
     return _room
 
@@ -84,7 +113,12 @@ def update_room(db: Session, room_id: int, room: RoomUpdate):
                 status_code=404,
                 detail=f"No room type found with id {room.room_type_id}",
             )
+        _old_room_type_id = _room.room_type_id
         _room.room_type_id = room.room_type_id
+        if room.room_type_id != _old_room_type_id:
+            inventory_utils.refresh_room_types(
+                db=db, room_type_ids=[_old_room_type_id, room.room_type_id]
+            )
     if room.floor:
         _room.floor = room.floor
     if room.facility_id:
@@ -98,6 +132,7 @@ def update_room(db: Session, room_id: int, room: RoomUpdate):
         _room.booking_status = room.booking_status
     if room.cleanliness_status:
         _room.cleanliness_status = room.cleanliness_status
+    catalog_utils.refresh_rooms(db=db, room_ids=[room_id])
     db.commit()
     db.refresh(_room)
     return _room
@@ -111,6 +146,9 @@ def delete_room(db: Session, room_id: int):
             status_code=404, detail=f"No room found with id {room_id}"
         )
     db.delete(_room)
+    inventory_utils.refresh_room_types(
+        db=db, room_type_ids=[_room.room_type_id]
+    )
     db.commit()
     return {"result": f"Successfully deleted room with id {room_id}"}
 
@@ -135,8 +173,8 @@ def get_room_cleanliness_status(db: Session, room_id: int):
     return {"result": f"{_room.cleanliness_status}"}
 
 
-def filter_rooms(db: Session, room: Optional[RoomFilter]):
-    """Filter rooms by its parameters."""
+def filter_rooms_query(db: Session, room: Optional[RoomFilter]):
+    """Build the query filtering rooms by its parameters, in ID order."""
     query = db.query(Room)
     if room.description:
         query = query.filter(Room.description == room.description)
@@ -152,12 +190,41 @@ def filter_rooms(db: Session, room: Optional[RoomFilter]):
         query = query.filter(
             Room.cleanliness_status == room.cleanliness_status
         )
-    filtered_rooms = query.all()
+    if room.feature_ids:
+        query = query.filter(
+            Room.room_type_id.in_(
+                room_types_with_all_features(set(room.feature_ids))
+            )
+        )
+    return query.order_by(Room.id)
+
+
+def room_types_with_all_features(feature_ids: set):
+    """
+    Select the IDs of the room types having every one of the features.
+
+    One pass over features_to_room_types: the links to these features
+    grouped by room type, keeping the groups that found all of them.
+    """
+    return (
+        select(FeaturesToRoomTypes.c.room_type_id)
+        .where(FeaturesToRoomTypes.c.feature_id.in_(feature_ids))
+        .group_by(FeaturesToRoomTypes.c.room_type_id)
+        .having(
+            func.count(FeaturesToRoomTypes.c.feature_id.distinct())
+            == len(feature_ids)
+        )
+    )
+
+
+def filter_rooms(db: Session, room: Optional[RoomFilter]):
+    """Filter rooms by its parameters."""
+    filtered_rooms = filter_rooms_query(db=db, room=room).all()
     return filtered_rooms
 
 
-def sort_rooms(db: Session, order: str, order_by: str):
-    """Sort rooms by its properties."""
+def sort_rooms_query(db: Session, order: str, order_by: str):
+    """Build the query sorting rooms by its properties."""
     dct = {
         "id": Room.id,
         "room_type_id": Room.room_type_id,
@@ -178,8 +245,13 @@ def sort_rooms(db: Session, order: str, order_by: str):
         raise HTTPException(
             status_code=400, detail="Such order is not supported"
         )
-    sorted_rooms = sorted_query.all()
-    return sorted_rooms
+    return sorted_query
+
+
+def sort_rooms(db: Session, order: str, order_by: str):
+    """Sort rooms by its properties."""
+    sorted_rooms = sort_rooms_query(db=db, order=order, order_by=order_by)
+    return sorted_rooms.all()
 
 
 def get_room_guest_now(db: Session, room_id: int):
@@ -209,20 +281,28 @@ def get_room_guest_now(db: Session, room_id: int):
 # Room types CRUD
 
 
-def get_room_types(db: Session, skip: int = 0, limit: int = 100):
-    """Get all room types."""
-    return db.query(RoomType).offset(skip).limit(limit).all()
+def get_room_types(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: str = None,
+    schema: Type[BaseModel] = None,
+):
+    """Get all room types, as rows of the schema's columns if given."""
+    return pagination_utils.paginate(
+        response_utils.project(db.query(RoomType), schema),
+        RoomType.id,
+        skip=skip,
+        limit=limit,
+        after=after,
+    )
 
 
 def get_room_type(db: Session, room_type_id: int):
     """Get room type by id."""
-    _room_type = db.query(RoomType).filter(RoomType.id == room_type_id).first()
-    if not _room_type:
-        raise HTTPException(
-            status_code=404,
-            detail=f"No room type found with id {room_type_id}",
-        )
-    return _room_type
+    return loader_utils.load(
+        db, RoomType, room_type_id, "room type", cache=reference_cache
+    )
 
 
 def create_room_type(db: Session, room_type: RoomTypeCreate):
@@ -231,6 +311,7 @@ def create_room_type(db: Session, room_type: RoomTypeCreate):
         name=room_type.name, capacity=room_type.capacity, price=room_type.price
     )
     db.add(_room_type)
+    reference_utils.invalidate(db, RoomType)
     db.commit()
     db.refresh(_room_type)
     return _room_type
@@ -252,6 +333,8 @@ def update_room_type(
         _room_type.capacity = room_type.capacity
     if room_type.price:
         _room_type.price = room_type.price
+    reference_utils.invalidate(db, RoomType)
+    catalog_utils.refresh_room_types(db=db, room_type_ids=[room_type_id])
     db.commit()
     db.refresh(_room_type)
     return _room_type
@@ -266,6 +349,8 @@ def delete_room_type(db: Session, room_type_id: int):
             detail=f"No room type found with id {room_type_id}",
         )
     db.delete(_room_type)
+    reference_utils.invalidate(db, RoomType)
+    catalog_utils.refresh_room_types(db=db, room_type_ids=[room_type_id])
     db.commit()
     return {"result": f"Successfully deleted room type with id {room_type_id}"}
 
@@ -288,8 +373,8 @@ def filter_room_types_by_price(db: Session, operator: str, value: float):
     return filtered_room_types
 
 
-def sort_room_types(db: Session, order: str, order_by: str):
-    """Sort room types by its properties."""
+def sort_room_types_query(db: Session, order: str, order_by: str):
+    """Build the query sorting room types by its properties."""
     dct = {
         "id": RoomType.id,
         "name": RoomType.name,
@@ -301,40 +386,57 @@ def sort_room_types(db: Session, order: str, order_by: str):
             status_code=400, detail="Such order_by is not supported"
         )
     if order == "desc":
-        sorted_query = db.query(Room).order_by(dct[order_by].desc())
+        sorted_query = db.query(RoomType).order_by(dct[order_by].desc())
     elif order == "asc":
-        sorted_query = db.query(Room).order_by(dct[order_by].asc())
+        sorted_query = db.query(RoomType).order_by(dct[order_by].asc())
     else:
         raise HTTPException(
             status_code=400, detail="Such order is not supported"
         )
-    sorted_room_types = sorted_query.all()
-    return sorted_room_types
+    return sorted_query
+
+
+def sort_room_types(db: Session, order: str, order_by: str):
+    """Sort room types by its properties."""
+    sorted_room_types = sort_room_types_query(
+        db=db, order=order, order_by=order_by
+    )
+    return sorted_room_types.all()
 
 
 # Room features CRUD
 
 
-def get_features(db: Session, skip: int = 0, limit: int = 100):
-    """Get all features."""
-    _features = db.query(Feature).offset(skip).limit(limit).all()
+def get_features(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: str = None,
+    schema: Type[BaseModel] = None,
+):
+    """Get all features, as rows of the schema's columns if given."""
+    _features = pagination_utils.paginate(
+        response_utils.project(db.query(Feature), schema),
+        Feature.id,
+        skip=skip,
+        limit=limit,
+        after=after,
+    )
     return _features
 
 
 def get_feature(db: Session, feature_id: int):
     """Get feature by id."""
-    _feature = db.query(Feature).filter(Feature.id == feature_id).first()
-    if not _feature:
-        raise HTTPException(
-            status_code=404, detail=f"No feature found with id {feature_id}"
-        )
-    return _feature
+    return loader_utils.load(
+        db, Feature, feature_id, "feature", cache=reference_cache
+    )
 
 
 def create_feature(db: Session, feature: FeatureCreate):
     """Create new feature."""
     _feature = Feature(name=feature.name)
     db.add(_feature)
+    reference_utils.invalidate(db, Feature)
     db.commit()
     db.refresh(_feature)
     return _feature
@@ -349,6 +451,8 @@ def update_feature(db: Session, feature_id: int, feature: FeatureCreate):
         )
     if feature.name:
         _feature.name = feature.name
+    reference_utils.invalidate(db, Feature)
+    catalog_utils.refresh_features(db=db, feature_ids=[feature_id])
     db.commit()
     db.refresh(_feature)
     return _feature
@@ -362,6 +466,8 @@ def delete_feature(db: Session, feature_id: int):
             status_code=404, detail=f"No feature found with id {feature_id}"
         )
     db.delete(_feature)
+    reference_utils.invalidate(db, Feature)
+    catalog_utils.refresh_features(db=db, feature_ids=[feature_id])
     db.commit()
     return {"result": f"Successfully deleted feature with id {feature_id}"}
 
@@ -369,25 +475,35 @@ def delete_feature(db: Session, feature_id: int):
 # Facility CRUD
 
 
-def get_facilities(db: Session, skip: int = 0, limit: int = 100):
-    """Get all facilities."""
-    return db.query(Facility).offset(skip).limit(limit).all()
+def get_facilities(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: str = None,
+    schema: Type[BaseModel] = None,
+):
+    """Get all facilities, as rows of the schema's columns if given."""
+    return pagination_utils.paginate(
+        response_utils.project(db.query(Facility), schema),
+        Facility.id,
+        skip=skip,
+        limit=limit,
+        after=after,
+    )
 
 
 def get_facility(db: Session, facility_id: int):
     """Get facility by id."""
-    _facility = db.query(Facility).filter(Facility.id == facility_id).first()
-    if not _facility:
-        raise HTTPException(
-            status_code=404, detail=f"No facility found with id {facility_id}"
-        )
-    return _facility
+    return loader_utils.load(
+        db, Facility, facility_id, "facility", cache=reference_cache
+    )
 
 
 def create_facility(db: Session, facility: FacilityCreate):
     """Create new facility."""
     _facility = Facility(name=facility.name)
     db.add(_facility)
+    reference_utils.invalidate(db, Facility)
     db.commit()
     db.refresh(_facility)
     return _facility
@@ -402,6 +518,8 @@ def update_facility(db: Session, facility_id: int, facility: FeatureCreate):
         )
     if facility.name:
         _facility.name = facility.name
+    reference_utils.invalidate(db, Facility)
+    catalog_utils.refresh_facilities(db=db, facility_ids=[facility_id])
     db.commit()
     db.refresh(_facility)
     return _facility
@@ -415,6 +533,8 @@ def delete_facility(db: Session, facility_id: int):
             status_code=404, detail=f"No facility found with id {facility_id}"
         )
     db.delete(_facility)
+    reference_utils.invalidate(db, Facility)
+    catalog_utils.refresh_facilities(db=db, facility_ids=[facility_id])
     db.commit()
     return {"result": f"Successfully deleted facility with id {facility_id}"}
 
@@ -424,29 +544,15 @@ def check_room_availability_by_date(
     end_date: datetime.date,
     room_id: int,
     db: Session,
+    vacant: Optional[bool] = occupancy_utils.ASK,
 ):
     """Check if room is free on a given date."""
-    _bookings = db.query(Booking).filter(Booking.room_id == room_id).all()
-    if not _bookings:
+    if availability_utils.is_room_vacant(
+        db=db,
+        room_id=room_id,
+        start_date=start_date,
+        end_date=end_date,
+        vacant=vacant,
+    ):
         return {"result": "vacant"}
-    for _booking in _bookings:
-        if (
-            (
-                _booking.start_date <= start_date
-                and _booking.end_date >= end_date
-            )
-            or (
-                _booking.start_date >= start_date
-                and _booking.end_date <= end_date
-            )
-            or (
-                _booking.start_date >= start_date
-                and _booking.start_date <= end_date
-            )
-            or (
-                _booking.end_date >= start_date
-                and _booking.end_date <= end_date
-            )
-        ):
-            return {"result": "booked"}
-    return {"result": "vacant"}
+    return {"result": "booked"}
@@ -1,9 +1,17 @@
 """Database creation and usage."""
 
+import itertools
+import math
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+
+from fastapi import Request, Response
+from sqlalchemy import create_engine, exc
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 
 POSTGRES_USER = os.environ["POSTGRES_USER"]
 POSTGRES_PASSWORD = os.environ["POSTGRES_PASSWORD"]
@@ -16,16 +24,257 @@ SQLALCHEMY_DATABASE_URL = (
     "{POSTGRES_PASSWORD}"
     f"@{POSTGRES_SERVER}/{POSTGRES_DATABASE}"
 )
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+SQLALCHEMY_ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace(
+    "postgresql://", "postgresql+asyncpg://", 1
+)
+
+# streaming replicas of the primary, as comma separated host[:port]
+POSTGRES_REPLICA_SERVERS = [
+    server.strip()
+    for server in os.getenv("POSTGRES_REPLICA_SERVERS", "").split(",")
+    if server.strip()
+]
+SQLALCHEMY_REPLICA_URLS = [
+    SQLALCHEMY_DATABASE_URL.replace(f"@{POSTGRES_SERVER}/", f"@{server}/", 1)
+    for server in POSTGRES_REPLICA_SERVERS
+]
+SQLALCHEMY_ASYNC_REPLICA_URLS = [
+    url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    for url in SQLALCHEMY_REPLICA_URLS
+]
+DB_READ_YOUR_WRITES_SECONDS = float(
+    os.getenv("DB_READ_YOUR_WRITES_SECONDS", "0")
+)
+READ_YOUR_WRITES_COOKIE = "hotelscape_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+DB_PGBOUNCER_TRANSACTION_MODE = (
+    os.getenv("DB_PGBOUNCER_TRANSACTION_MODE", "false").lower() == "true"
+)
+
+
+class TimedPoolMixin:
+    """Count checkouts and the time spent waiting for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Zero the checkout counters."""
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.timeouts += timed_out
+                self.wait_time += waited
+                self.max_wait = max(self.max_wait, waited)
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    """QueuePool which records checkout wait times."""
+
+
+class TimedAsyncQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool which records checkout wait times."""
+
+
+def engine_options(is_async: bool = False) -> dict:
+    """Build the pool arguments for create_engine from the settings."""
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if DB_PGBOUNCER_TRANSACTION_MODE:
+        # PgBouncer does the pooling and hands each transaction to any
+        # server connection, so keep nothing open and do not rely on
+        # server side prepared statements
+        options["poolclass"] = NullPool
+        if is_async:
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+            }
+        return options
+    options.update(
+        poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def pool_status(name: str, pool) -> dict:
+    """Get the live statistics of a connection pool."""
+    status = {
+        "name": name,
+        "pool": type(pool).__name__,
+        "size": None,
+        "checked_in": None,
+        "checked_out": None,
+        "overflow": None,
+        "checkouts": 0,
+        "timeouts": 0,
+        "wait_time": 0.0,
+        "max_wait": 0.0,
+    }
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+        )
+    if isinstance(pool, TimedPoolMixin):
+        status.update(
+            checkouts=pool.checkouts,
+            timeouts=pool.timeouts,
+            wait_time=pool.wait_time,
+            max_wait=pool.max_wait,
+        )
+    return status
+
+
+def get_pool_status() -> list:
+    """Get the statistics of every pool of this worker."""
+    status = [
+        pool_status("primary", engine.pool),
+        pool_status("primary_async", async_engine.sync_engine.pool),
+    ]
+    for number, (replica, async_replica) in enumerate(
+        zip(replica_engines, async_replica_engines)
+    ):
+        status.append(pool_status(f"replica_{number}", replica.pool))
+        status.append(
+            pool_status(
+                f"replica_{number}_async", async_replica.sync_engine.pool
+            )
+        )
+    return status
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(
+    SQLALCHEMY_ASYNC_DATABASE_URL, **engine_options(is_async=True)
+)
+AsyncSessionLocal = sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+)
+replica_engines = [
+    create_engine(url, **engine_options()) for url in SQLALCHEMY_REPLICA_URLS
+]
+async_replica_engines = [
+    create_async_engine(url, **engine_options(is_async=True))
+    for url in SQLALCHEMY_ASYNC_REPLICA_URLS
+]
+_replica_counter = itertools.count()
 
 Base = declarative_base()
 
 
-def get_db():
+def mark_write(request: Request, response: Response):
+    """
+    Send reads of a client that just wrote to the primary for a while.
+
+    Replicas lag behind the primary, so with DB_READ_YOUR_WRITES_SECONDS
+    set, write requests get a cookie holding the time until which the
+    client's reads skip the replicas.
+    """
+    if (
+        replica_engines
+        and DB_READ_YOUR_WRITES_SECONDS > 0
+        and request.method not in SAFE_METHODS
+    ):
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE,
+            str(time.time() + DB_READ_YOUR_WRITES_SECONDS),
+            max_age=math.ceil(DB_READ_YOUR_WRITES_SECONDS),
+            httponly=True,
+        )
+
+
+def read_from_primary(request: Request) -> bool:
+    """Check whether a read has to go to the primary."""
+    if not replica_engines:
+        return True
+    try:
+        primary_until = float(request.cookies[READ_YOUR_WRITES_COOKIE])
+    except (KeyError, ValueError):
+        return False
+    return primary_until > time.time()
+
+
+def is_replica(session) -> bool:
+    """Check whether a session reads from a replica."""
+    bind = session.get_bind()
+    engine = getattr(bind, "engine", bind)
+    return any(engine is replica for replica in replica_engines) or any(
+        engine is replica.sync_engine for replica in async_replica_engines
+    )
+
+
+def next_replica() -> int:
+    """Pick the index of the replica for the next read (round-robin)."""
+    return next(_replica_counter) % len(replica_engines)
+
+
+def get_db(request: Request, response: Response):
     """Get the working database."""
+    mark_write(request, response)
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def get_read_db(request: Request):
+    """Get a database for read-only endpoints, a replica if there is one."""
+    if read_from_primary(request):
+        db = SessionLocal()
+    else:
+        db = SessionLocal(bind=replica_engines[next_replica()])
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db(request: Request, response: Response):
+    """Get the working database for async endpoints."""
+    mark_write(request, response)
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db(request: Request):
+    """Get a database for read-only async endpoints."""
+    if read_from_primary(request):
+        session = AsyncSessionLocal()
+    else:
+        session = AsyncSessionLocal(bind=async_replica_engines[next_replica()])
+    async with session as db:
+        yield db
@@ -1,9 +1,13 @@
 from fastapi import FastAPI
 
+from auth.hashing import hashing
+from crud import occupancy_utils, reference_utils
+from db import SessionLocal, engine
 from routers import (
     auth_routers,
     booking_routers,
     client_routers,
+    internal_routers,
     invoice_routers,
     room_routers,
 )
@@ -19,3 +23,38 @@ app.include_router(room_routers.router)
 app.include_router(client_routers.router)
 app.include_router(booking_routers.router)
 app.include_router(invoice_routers.router)
+app.include_router(internal_routers.router)
+
+
+@app.on_event("startup")
+def build_occupancy_snapshot():
+    db = SessionLocal()
+    try:
+        occupancy_utils.build_snapshot(db=db)
+    finally:
+        db.close()
+
+
+reference_listener = reference_utils.ReferenceListener(engine)
+
+
+@app.on_event("startup")
+def warm_reference_cache():
+    if not reference_utils.reference_cache.enabled:
+        return
+    reference_listener.start()
+    db = SessionLocal()
+    try:
+        reference_utils.warm_up(db=db)
+    finally:
+        db.close()
+
+
+@app.on_event("shutdown")
+def stop_hashing_workers():
+    hashing.shutdown()
+
+
+@app.on_event("shutdown")
+def stop_reference_listener():
+    reference_listener.stop()
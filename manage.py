@@ -0,0 +1,50 @@
+"""Maintenance commands.
+
+Usage:
+    python manage.py rebuild-inventory
+    python manage.py rebuild-catalog
+"""
+
+import argparse
+
+from crud import catalog_utils, inventory_utils
+from db import SessionLocal
+
+
+def rebuild_inventory():
+    """Recompute room_type_inventory from bookings."""
+    db = SessionLocal()
+    try:
+        inventory_utils.rebuild_inventory(db=db)
+        db.commit()
+    finally:
+        db.close()
+    print("Rebuilt room_type_inventory")
+
+
+def rebuild_catalog():
+    """Recompute room_catalog from rooms and their reference tables."""
+    db = SessionLocal()
+    try:
+        catalog_utils.rebuild_catalog(db=db)
+        db.commit()
+    finally:
+        db.close()
+    print("Rebuilt room_catalog")
+
+
+COMMANDS = {
+    "rebuild-inventory": rebuild_inventory,
+    "rebuild-catalog": rebuild_catalog,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HotelScape maintenance")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    COMMANDS[args.command]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""denormalized room catalog
+
+Revision ID: 3e9a7c5d1b48
+Revises: 7d2f9c4b8a16
+Create Date: 2026-10-16 23:21:07.614952
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '3e9a7c5d1b48'
+down_revision = '7d2f9c4b8a16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('room_catalog',
+    sa.Column('room_id', sa.Integer(), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('floor', sa.Integer(), nullable=False),
+    sa.Column('booking_status', postgresql.ENUM('vacant', 'occupied', name='roomavailabilitystatus', create_type=False), nullable=True),
+    sa.Column('cleanliness_status', postgresql.ENUM('clean', 'dirty', name='roomcleanlinessstatus', create_type=False), nullable=True),
+    sa.Column('room_type_id', sa.Integer(), nullable=True),
+    sa.Column('room_type_name', sa.String(), nullable=True),
+    sa.Column('capacity', sa.String(), nullable=True),
+    sa.Column('price', sa.Float(), nullable=True),
+    sa.Column('facility_id', sa.Integer(), nullable=True),
+    sa.Column('facility_name', sa.String(), nullable=True),
+    sa.Column('features', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.ForeignKeyConstraint(['room_id'], ['rooms.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('room_id')
+    )
+    op.create_index(op.f('ix_room_catalog_facility_id'), 'room_catalog', ['facility_id'], unique=False)
+    op.create_index(op.f('ix_room_catalog_room_type_id'), 'room_catalog', ['room_type_id'], unique=False)
+    # Backfill from existing rooms, same as `python manage.py rebuild-catalog`
+    op.execute("""
+    INSERT INTO room_catalog (room_id, description, floor, booking_status,
+                              cleanliness_status, room_type_id,
+                              room_type_name, capacity, price, facility_id,
+                              facility_name, features)
+    SELECT r.id, r.description, r.floor, r.booking_status,
+           r.cleanliness_status, r.room_type_id, rt.name, rt.capacity,
+           rt.price, r.facility_id, f.name,
+           coalesce((
+               SELECT jsonb_agg(
+                   jsonb_build_object('id', ft.id, 'name', ft.name)
+                   ORDER BY ft.id
+               )
+               FROM features_to_room_types l
+               JOIN features ft ON ft.id = l.feature_id
+               WHERE l.room_type_id = r.room_type_id
+           ), '[]')
+    FROM rooms r
+    LEFT JOIN room_types rt ON rt.id = r.room_type_id
+    LEFT JOIN facilities f ON f.id = r.facility_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_room_catalog_room_type_id'), table_name='room_catalog')
+    op.drop_index(op.f('ix_room_catalog_facility_id'), table_name='room_catalog')
+    op.drop_table('room_catalog')
@@ -0,0 +1,27 @@
+"""booking stay range with gist index
+
+Revision ID: 4f1c2a7d9e30
+Revises: b3382d9d7ab5
+Create Date: 2026-10-16 09:12:41.208113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '4f1c2a7d9e30'
+down_revision = 'b3382d9d7ab5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.add_column('bookings', sa.Column('stay', postgresql.DATERANGE(), sa.Computed("daterange(start_date, end_date, '[)')", persisted=True), nullable=True))
+    op.create_index('ix_bookings_room_id_stay', 'bookings', ['room_id', 'stay'], unique=False, postgresql_using='gist')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_bookings_room_id_stay', table_name='bookings')
+    op.drop_column('bookings', 'stay')
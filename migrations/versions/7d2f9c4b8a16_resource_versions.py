@@ -0,0 +1,54 @@
+"""resource versions for conditional GET
+
+Revision ID: 7d2f9c4b8a16
+Revises: e5b8a1c3d702
+Create Date: 2026-10-16 22:54:31.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2f9c4b8a16'
+down_revision = 'e5b8a1c3d702'
+branch_labels = None
+depends_on = None
+
+TRACKED_TABLES = ['rooms', 'room_types', 'features', 'facilities']
+
+
+def upgrade() -> None:
+    op.create_table('resource_versions',
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    op.execute("""
+    CREATE OR REPLACE FUNCTION bump_resource_version() RETURNS trigger AS $$
+    BEGIN
+        UPDATE resource_versions
+        SET version = version + 1, updated_at = now()
+        WHERE table_name = TG_TABLE_NAME;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """)
+    for table in TRACKED_TABLES:
+        op.execute(f"""
+        INSERT INTO resource_versions (table_name, version, updated_at)
+        VALUES ('{table}', 0, now())
+        """)
+        op.execute(f"""
+        CREATE TRIGGER {table}_resource_version
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_resource_version()
+        """)
+
+
+def downgrade() -> None:
+    for table in TRACKED_TABLES:
+        op.execute(f'DROP TRIGGER {table}_resource_version ON {table}')
+    op.execute('DROP FUNCTION bump_resource_version()')
+    op.drop_table('resource_versions')
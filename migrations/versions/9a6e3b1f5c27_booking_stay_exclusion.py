@@ -0,0 +1,28 @@
+"""non-overlapping bookings exclusion constraint
+
+Revision ID: 9a6e3b1f5c27
+Revises: 4f1c2a7d9e30
+Create Date: 2026-10-16 10:03:18.774520
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a6e3b1f5c27'
+down_revision = '4f1c2a7d9e30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The constraint is backed by its own GiST index on (room_id, stay),
+    # which makes the plain index redundant.
+    op.drop_index('ix_bookings_room_id_stay', table_name='bookings')
+    op.create_exclude_constraint('bookings_room_id_stay_excl', 'bookings', ('room_id', '='), ('stay', '&&'), using='gist')
+
+
+def downgrade() -> None:
+    op.drop_constraint('bookings_room_id_stay_excl', 'bookings')
+    op.create_index('ix_bookings_room_id_stay', 'bookings', ['room_id', 'stay'], unique=False, postgresql_using='gist')
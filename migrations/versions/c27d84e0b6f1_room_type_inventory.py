@@ -0,0 +1,49 @@
+"""room type daily inventory
+
+Revision ID: c27d84e0b6f1
+Revises: 9a6e3b1f5c27
+Create Date: 2026-10-16 11:26:52.340871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c27d84e0b6f1'
+down_revision = '9a6e3b1f5c27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('room_type_inventory',
+    sa.Column('room_type_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('sold', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['room_type_id'], ['room_types.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('room_type_id', 'date')
+    )
+    # Backfill from existing bookings, same as `python manage.py rebuild-inventory`
+    op.execute("""
+    INSERT INTO room_type_inventory (room_type_id, date, total, sold)
+    SELECT r.room_type_id, CAST(night AS date), totals.total, count(*)
+    FROM bookings b
+    JOIN rooms r ON r.id = b.room_id
+    JOIN (
+        SELECT room_type_id, count(*) AS total
+        FROM rooms
+        GROUP BY room_type_id
+    ) totals ON totals.room_type_id = r.room_type_id
+    CROSS JOIN LATERAL generate_series(
+        CAST(b.start_date AS timestamp),
+        CAST(b.end_date AS timestamp) - interval '1 day',
+        interval '1 day'
+    ) AS night
+    GROUP BY r.room_type_id, night, totals.total
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('room_type_inventory')
@@ -0,0 +1,40 @@
+"""booking and invoice lookup indexes
+
+Revision ID: e5b8a1c3d702
+Revises: c27d84e0b6f1
+Create Date: 2026-10-16 23:05:14.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8a1c3d702'
+down_revision = 'c27d84e0b6f1'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_bookings_room_id_start_date', 'bookings', ['room_id', 'start_date']),
+    ('ix_bookings_client_id_start_date', 'bookings', ['client_id', 'start_date']),
+    ('ix_bookings_start_date_end_date', 'bookings', ['start_date', 'end_date']),
+    ('ix_bookings_end_date', 'bookings', ['end_date']),
+    ('ix_invoices_booking_id', 'invoices', ['booking_id']),
+    ('ix_invoices_client_id', 'invoices', ['client_id']),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY does not lock out writes while the index is built, but
+    # can't run inside a transaction.
+    # If it fails, drop the INVALID index it leaves behind before retrying.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -2,19 +2,60 @@
 
 import datetime
 
-from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Integer
+from sqlalchemy import (
+    DDL,
+    Column,
+    Computed,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    event,
+)
+from sqlalchemy.dialects.postgresql import DATERANGE, ExcludeConstraint
 
 from db import Base
 
 
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # No two bookings of the same room may have overlapping stays.
+        ExcludeConstraint(
+            ("room_id", "="),
+            ("stay", "&&"),
+            name="bookings_room_id_stay_excl",
+            using="gist",
+        ),
+        # a room's bookings, its current guest and free/busy lookups
+        Index("ix_bookings_room_id_start_date", "room_id", "start_date"),
+        # a client's bookings
+        Index("ix_bookings_client_id_start_date", "client_id", "start_date"),
+        # arrivals and filters on the dates
+        Index("ix_bookings_start_date_end_date", "start_date", "end_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     room_id = Column(Integer, ForeignKey("rooms.id", ondelete="SET NULL"))
     client_id = Column(Integer, ForeignKey("clients.id", ondelete="SET NULL"))
     start_date = Column(Date)
-    end_date = Column(Date)
+    end_date = Column(Date, index=True)
+    # Half-open [start_date, end_date) range, so the check-out day
+    # is free for the next guest.
+    stay = Column(
+        DATERANGE,
+        Computed("daterange(start_date, end_date, '[)')", persisted=True),
+    )
     total_price = Column(Float, nullable=False)
     ts_created = Column(DateTime, default=datetime.datetime.now())
     ts_updated = Column(DateTime, default=datetime.datetime.now())
+
+
+# GiST on (integer, daterange) needs the btree_gist operator classes.
+event.listen(
+    Booking.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist"),
+)
@@ -0,0 +1,20 @@
+"""RoomTypeInventory model."""
+
+from sqlalchemy import Column, Date, ForeignKey, Integer
+
+from db import Base
+
+
+class RoomTypeInventory(Base):
+    """RoomTypeInventory class -> creating 'room_type_inventory' table."""
+
+    __tablename__ = "room_type_inventory"
+
+    room_type_id = Column(
+        Integer,
+        ForeignKey("room_types.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    date = Column(Date, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    sold = Column(Integer, nullable=False, default=0)
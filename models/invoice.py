@@ -4,6 +4,7 @@ import datetime
 import enum
 
 from sqlalchemy import Column, DateTime, Enum, Float, ForeignKey, Integer
+from sqlalchemy.orm import relationship
 
 from db import Base
 
@@ -19,9 +20,14 @@ class Invoice(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     booking_id = Column(
-        Integer, ForeignKey("bookings.id", ondelete="SET NULL")
+        Integer, ForeignKey("bookings.id", ondelete="SET NULL"), index=True
+    )
+    client_id = Column(
+        Integer, ForeignKey("clients.id", ondelete="SET NULL"), index=True
     )
-    client_id = Column(Integer, ForeignKey("clients.id", ondelete="SET NULL"))
     payment_method = Column(Enum(PaymentMethod))
     invoice_amount = Column(Float, nullable=False)
     ts_issued = Column(DateTime, default=datetime.datetime.now())
+    # read only, the CRUD functions write the foreign keys
+    booking = relationship("Booking", viewonly=True)
+    client = relationship("Client", viewonly=True)
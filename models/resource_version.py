@@ -0,0 +1,58 @@
+"""ResourceVersion model."""
+
+from sqlalchemy import DDL, BigInteger, Column, DateTime, String, event, func
+
+from db import Base
+
+# tables whose listings are served with ETag and Last-Modified
+TRACKED_TABLES = ("rooms", "room_types", "features", "facilities")
+
+
+class ResourceVersion(Base):
+    """ResourceVersion class -> creating 'resource_versions' table.
+
+    One row per tracked table, bumped by a statement level trigger on
+    every write to it, so a listing's validators are known from one
+    primary key lookup instead of a scan of the table.
+    """
+
+    __tablename__ = "resource_versions"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+
+
+# Same function and triggers as the migration creating the table, for
+# databases made with metadata.create_all (the tests).
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(
+        """
+CREATE OR REPLACE FUNCTION bump_resource_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE resource_versions
+    SET version = version + 1, updated_at = now()
+    WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql"""
+    ),
+)
+for _table in TRACKED_TABLES:
+    event.listen(
+        Base.metadata,
+        "after_create",
+        DDL(
+            f"""
+INSERT INTO resource_versions (table_name, version, updated_at)
+VALUES ('{_table}', 0, now()) ON CONFLICT DO NOTHING;
+DROP TRIGGER IF EXISTS {_table}_resource_version ON {_table};
+CREATE TRIGGER {_table}_resource_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {_table}
+FOR EACH STATEMENT EXECUTE FUNCTION bump_resource_version()"""
+        ),
+    )
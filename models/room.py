@@ -48,6 +48,9 @@ class Room(Base):
     booking_status = Column(Enum(RoomAvailabilityStatus))
     cleanliness_status = Column(Enum(RoomCleanlinessStatus))
     bookings = relationship("Booking", backref="rooms")
+    # read only, the CRUD functions write the foreign keys
+    room_type = relationship("RoomType", viewonly=True)
+    facility = relationship("Facility", viewonly=True)
 
 
 class Facility(Base):
@@ -0,0 +1,34 @@
+"""RoomCatalog model."""
+
+from sqlalchemy import Column, Enum, Float, ForeignKey, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
+
+from db import Base
+from models.room import RoomAvailabilityStatus, RoomCleanlinessStatus
+
+
+class RoomCatalog(Base):
+    """RoomCatalog class -> creating 'room_catalog' table.
+
+    One row per room with its type, facility and features joined in,
+    kept up to date by the writes in crud/ through crud/catalog_utils.py.
+    """
+
+    __tablename__ = "room_catalog"
+
+    room_id = Column(
+        Integer,
+        ForeignKey("rooms.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    description = Column(String)
+    floor = Column(Integer, nullable=False)
+    booking_status = Column(Enum(RoomAvailabilityStatus))
+    cleanliness_status = Column(Enum(RoomCleanlinessStatus))
+    room_type_id = Column(Integer, index=True)
+    room_type_name = Column(String)
+    capacity = Column(String)
+    price = Column(Float)
+    facility_id = Column(Integer, index=True)
+    facility_name = Column(String)
+    features = Column(JSONB, nullable=False, default=list)
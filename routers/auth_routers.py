@@ -2,16 +2,26 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from auth.deps import get_current_user
+from auth.hashing import hashing
+from auth.revocation import revoked_tokens
 from auth.utils import (
     create_access_token,
     create_refresh_token,
-    verify_password,
+    decode_refresh_token,
+)
+from crud import async_auth_crud
+from db import get_async_db
+from schemas.user_schemas import (
+    RefreshTokenSchema,
+    ResultSchema,
+    SystemUser,
+    TokenSchema,
+    UserAuth,
+    UserOut,
 )
-from crud import auth_crud
-from db import get_db
-from schemas.user_schemas import SystemUser, TokenSchema, UserAuth, UserOut
 
 router = APIRouter()
 
@@ -19,12 +29,14 @@ router = APIRouter()
 @router.post(
     "/signup", summary="Create new user", response_model=UserOut, tags=["auth"]
 )
-def create_user(user: UserAuth, db: Session = Depends(get_db)):
+async def create_user(
+    user: UserAuth, db: AsyncSession = Depends(get_async_db)
+):
     """
     Create a new user --> signup.
 
         Args:
-            db : Session
+            db : AsyncSession
                 Current database
             user : UserAuth
                 UserAuth object with username and password
@@ -33,7 +45,7 @@ def create_user(user: UserAuth, db: Session = Depends(get_db)):
             user : UserOut
                 UserOut object with username and UUID of the signed up user
     """
-    user_exists = auth_crud.get_user_by_username_for_signup(
+    user_exists = await async_auth_crud.get_user_by_username_for_signup(
         db=db, username=user.username
     )
     if user_exists:
@@ -41,7 +53,10 @@ def create_user(user: UserAuth, db: Session = Depends(get_db)):
             status_code=400,
             detail="User with username {username} already exists",
         )
-    user = auth_crud.create_user(db=db, user=user)
+    hashed_password = await hashing.hash_password(user.password)
+    user = await async_auth_crud.create_user(
+        db=db, user=user, hashed_password=hashed_password
+    )
     return user
 
 
@@ -51,15 +66,15 @@ def create_user(user: UserAuth, db: Session = Depends(get_db)):
     response_model=TokenSchema,
     tags=["auth"],
 )
-def login(
-    db: Session = Depends(get_db),
+async def login(
+    db: AsyncSession = Depends(get_async_db),
     form_data: OAuth2PasswordRequestForm = Depends(),
 ):
     """
     Create access and refresh tokens for user --> login.
 
         Args:
-            db : Session
+            db : AsyncSession
                 Current database
             form_data: OAuth2PasswordRequestForm
                 data with username and hashed
@@ -70,13 +85,13 @@ def login(
                 dict with access token and refresh
                 token of the user who logged in
     """
-    _user = auth_crud.get_user_by_username_for_login(
+    _user = await async_auth_crud.get_user_by_username_for_login(
         db=db, username=form_data.username
     )
     if not _user:
         raise HTTPException(status_code=400, detail="Incorrect username")
     _hashed_password = _user.hashed_password
-    if not verify_password(form_data.password, _hashed_password):
+    if not await hashing.verify_password(form_data.password, _hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect password",
@@ -88,6 +103,61 @@ def login(
     }
 
 
+@router.post(
+    "/refresh",
+    summary="Create a new access token from a refresh token",
+    response_model=TokenSchema,
+    tags=["auth"],
+)
+def refresh(token: RefreshTokenSchema):
+    """
+    Create a new access token for user without logging in again.
+
+        Args:
+            token : RefreshTokenSchema
+                refresh token issued on login
+
+        Returns:
+            tokens : TokenSchema
+                dict with a new access token and the same refresh token
+    """
+    payload = decode_refresh_token(token.refresh_token)
+    if "jti" in payload and revoked_tokens.is_revoked(payload["jti"]):
+        raise HTTPException(
+            status_code=401,
+            detail="Token revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return {
+        "access_token": create_access_token(payload["sub"]),
+        "refresh_token": token.refresh_token,
+    }
+
+
+@router.post(
+    "/logout",
+    summary="Revoke a refresh token",
+    response_model=ResultSchema,
+    tags=["auth"],
+)
+def logout(token: RefreshTokenSchema):
+    """
+    Revoke a refresh token so it can not create access tokens anymore.
+
+        Args:
+            token : RefreshTokenSchema
+                refresh token issued on login
+
+        Returns:
+            result : dict
+                result with info about successful logout
+    """
+    payload = decode_refresh_token(token.refresh_token)
+    if "jti" in payload:
+        revoked_tokens.revoke(payload["jti"], payload["exp"])
+    return {"result": "Successfully revoked refresh token"}
+
+
 @router.get(
     "/me",
     summary="Get details of currently logged in user",
@@ -1,12 +1,20 @@
 """Endpoints for Booking."""
 
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from crud import booking_utils
-from db import get_db
+from crud import (
+    async_booking_utils,
+    booking_utils,
+    include_utils,
+    pagination_utils,
+    response_utils,
+)
+from crud.response_utils import ResponseFormat
+from db import get_async_db, get_async_read_db, get_read_db
 from schemas.booking_schemas import (
     BookingCreate,
     BookingFilter,
@@ -27,10 +35,14 @@ router = APIRouter()
     response_model=List[BookingList],
     tags=["booking"],
 )
-def get_bookings(
+async def get_bookings(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -41,42 +53,141 @@ def get_bookings(
                 Specifies the number of qualifying rows to exclude.
             limit : int
                 If given, no more than that many rows will be returned.
-            db : Session
+            after : str, optional
+                Cursor from the X-Next-Cursor header of the previous page,
+                the page then starts after it and skip is ignored
+            fields : str, optional
+                Comma separated fields to select and send instead of all
+                of them, id is always sent
+            include : str, optional
+                Comma separated relations to embed in every booking, any
+                of: room, room.room_type,
+                room.room_type.features, room.facility, client
+            db : AsyncSession
                 Current database
 
         Returns:
             List[BookingList]
                 a list of all bookings issued that are present in the db
+                ordered by ID, with the cursor of the next page in the
+                X-Next-Cursor header
     """
-    bookings = booking_utils.get_bookings(db=db, skip=skip, limit=limit)
+    paths = include_utils.BOOKING_INCLUDES.parse(include, fields)
+    if paths:
+        bookings = await async_booking_utils.get_bookings(
+            db=db,
+            skip=skip,
+            limit=limit,
+            after=after,
+            options=include_utils.BOOKING_INCLUDES.options(paths),
+        )
+        pagination_utils.set_next_cursor(response, bookings, limit)
+        return include_utils.BOOKING_INCLUDES.response(
+            bookings, BookingList, paths, response
+        )
+    schema = response_utils.database_json_schema(BookingList, fields)
+    if schema:
+        page = await async_booking_utils.get_bookings_json(
+            db=db, schema=schema, skip=skip, limit=limit, after=after
+        )
+        pagination_utils.set_next_cursor_after(
+            response, page.count, page.last, limit
+        )
+        return response_utils.json_array_response(page, response)
+    schema = response_utils.fast_json_schema(BookingList, fields)
+    bookings = await async_booking_utils.get_bookings(
+        db=db, skip=skip, limit=limit, after=after, schema=schema
+    )
+    pagination_utils.set_next_cursor(response, bookings, limit)
+    if schema:
+        return response_utils.rows_response(bookings, response)
     return bookings
 
 
+@router.get(
+    "/bookings/sort",
+    response_model=List[BookingFull],
+    tags=["booking"],
+    summary="Sort bookings",
+)
+def sort_bookings(
+    order: str,
+    order_by: str,
+    response_format: ResponseFormat = Query(
+        ResponseFormat.json, alias="format"
+    ),
+    db: Session = Depends(get_read_db),
+    user: UserAuth = Depends(get_current_user),
+):
+    """
+    Sort bookings.
+
+        Args:
+            order : str
+                Specified order -> asc or desc.
+            order_by : str
+                Value to order by.
+            format : ResponseFormat
+                json (default) returns a list, ndjson and csv stream
+                the rows one per line without loading them all at once
+            db: Session
+                Current database
+
+        Returns:
+            List[BookingFull]
+                list of sorted bookings
+    """
+    if response_format != ResponseFormat.json:
+        return response_utils.stream_query(
+            booking_utils.sort_bookings_query(
+                db=db, order=order, order_by=order_by
+            ),
+            BookingFull,
+            response_format,
+        )
+    return booking_utils.sort_bookings(db=db, order=order, order_by=order_by)
+
+
 @router.get(
     "/bookings/{booking_id}",
     summary="Get booking by ID",
     response_model=BookingFull,
     tags=["booking"],
 )
-def get_booking(
+async def get_booking(
     booking_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    include: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
     Get a booking by ID.
 
         Args:
-            db : Session
+            db : AsyncSession
                 Current database
             booking_id : int
                 ID of the booking to retrieve
+            include : str, optional
+                Comma separated relations to embed in the booking, any
+                of: room, room.room_type,
+                room.room_type.features, room.facility, client
 
         Returns:
             BookingFull
                 BookingFull object with all info about the booking
     """
-    booking = booking_utils.get_booking(db=db, booking_id=booking_id)
+    paths = include_utils.BOOKING_INCLUDES.parse(include)
+    booking = await async_booking_utils.get_booking(
+        db=db,
+        booking_id=booking_id,
+        options=include_utils.BOOKING_INCLUDES.options(paths),
+    )
+    if paths:
+        return include_utils.BOOKING_INCLUDES.response(
+            booking, BookingFull, paths, response
+        )
     return booking
 
 
@@ -86,16 +197,16 @@ def get_booking(
     response_model=BookingFull,
     tags=["booking"],
 )
-def create_booking(
+async def create_booking(
     booking: BookingCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
     Create a new booking.
 
         Args:
-            db : Session
+            db : AsyncSession
                 Current database
             booking : BookingCreate
                 BookingCreate with all the necessary info
@@ -106,7 +217,7 @@ def create_booking(
                 BookingFull object with
                 all info about the newly created booking
     """
-    return booking_utils.create_booking(db=db, booking=booking)
+    return await async_booking_utils.create_booking(db=db, booking=booking)
 
 
 @router.put(
@@ -115,17 +226,17 @@ def create_booking(
     response_model=BookingUpdate,
     tags=["booking"],
 )
-def update_booking(
+async def update_booking(
     booking_id: int,
     booking: BookingUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
     Update an existing booking.
 
         Args:
-            db : Session
+            db : AsyncSession
                 Current database
             booking : BookingUpdate
                 Booking object with all
@@ -137,7 +248,7 @@ def update_booking(
             BookingFull
                 BookingFull object with all info of the newly updated booking
     """
-    return booking_utils.update_booking(
+    return await async_booking_utils.update_booking(
         db=db, booking_id=booking_id, booking=booking
     )
 
@@ -148,16 +259,16 @@ def update_booking(
     response_model=ResultSchema,
     tags=["booking"],
 )
-def delete_booking(
+async def delete_booking(
     booking_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
     Delete an existing booking.
 
         Args:
-            db: Session
+            db: AsyncSession
                 Current database
             booking_id: int
                 ID of the booking to delete
@@ -166,7 +277,9 @@ def delete_booking(
             result : dict
                 result with info about successful deletion
     """
-    return booking_utils.delete_booking(booking_id=booking_id, db=db)
+    return await async_booking_utils.delete_booking(
+        booking_id=booking_id, db=db
+    )
 
 
 @router.post(
@@ -177,7 +290,10 @@ def delete_booking(
 )
 def filter_bookings(
     booking: BookingFilter,
-    db: Session = Depends(get_db),
+    response_format: ResponseFormat = Query(
+        ResponseFormat.json, alias="format"
+    ),
+    db: Session = Depends(get_read_db),
     token: str = Depends(reuseable_oauth),
 ):
     """
@@ -186,6 +302,9 @@ def filter_bookings(
         Args:
             room: RoomFilter
                 BookingFilter with optional parameters of filtering
+            format : ResponseFormat
+                json (default) returns a list, ndjson and csv stream
+                the rows one per line without loading them all at once
             db: Session
                 Current database
 
@@ -193,34 +312,10 @@ def filter_bookings(
             List[BookingList]
                 list of sorted bookings
     """
+    if response_format != ResponseFormat.json:
+        return response_utils.stream_query(
+            booking_utils.filter_bookings_query(db=db, booking=booking),
+            BookingList,
+            response_format,
+        )
     return booking_utils.filter_bookings(db=db, booking=booking)
-
-
-@router.get(
-    "/bookings/sort",
-    response_model=List[BookingFull],
-    tags=["booking"],
-    summary="Sort bookings",
-)
-def sort_bookings(
-    order: str,
-    order_by: str,
-    db: Session = Depends(get_db),
-    user: UserAuth = Depends(get_current_user),
-):
-    """
-    Sort bookings.
-
-        Args:
-            order : str
-                Specified order -> asc or desc.
-            order_by : str
-                Value to order by.
-            db: Session
-                Current database
-
-        Returns:
-            List[BookingFull]
-                list of sorted bookings
-    """
-    return booking_utils.sort_bookings(db=db, order=order, order_by=order_by)
@@ -1,12 +1,12 @@
 """Endpoints for Client."""
 
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.orm import Session
 
-from crud import client_utils, misc_crud
-from db import get_db
+from crud import client_utils, misc_crud, pagination_utils, response_utils
+from db import get_db, get_read_db
 from schemas.client_schemas import ClientCreate, ClientFull, ClientUpdate
 from schemas.booking_schemas import BookingBaseInfo
 from schemas.user_schemas import ResultSchema
@@ -23,9 +23,12 @@ router = APIRouter()
     response_model=List[ClientFull],
 )
 def get_clients(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -36,14 +39,28 @@ def get_clients(
                 Specifies the number of qualifying rows to exclude.
             limit : int
                 If given, no more than that many rows will be returned.
+            after : str, optional
+                Cursor from the X-Next-Cursor header of the previous page,
+                the page then starts after it and skip is ignored
+            fields : str, optional
+                Comma separated fields to select and send instead of all
+                of them
             db : Session
                 Current database
 
         Returns:
             List[ClientFull]
                 a list of all clients that are present in the db
+                ordered by ID, with the cursor of the next page in the
+                X-Next-Cursor header
     """
-    clients = client_utils.get_clients(db=db, skip=skip, limit=limit)
+    schema = response_utils.fast_json_schema(ClientFull, fields)
+    clients = client_utils.get_clients(
+        db=db, skip=skip, limit=limit, after=after, schema=schema
+    )
+    pagination_utils.set_next_cursor(response, clients, limit)
+    if schema:
+        return response_utils.rows_response(clients, response, schema)
     return clients
 
 
@@ -55,7 +72,7 @@ def get_clients(
 )
 def get_client(
     client_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -174,7 +191,7 @@ def delete_client(
 )
 def get_bookings_of_client(
     client_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -190,4 +207,16 @@ def get_bookings_of_client(
             client_bookings : List[BookingFull]
                 all bookings from a client
     """
+    schema = response_utils.database_json_schema(BookingBaseInfo)
+    if schema:
+        # BookingBaseInfo has no id to order by, like the relationship
+        return response_utils.json_array_response(
+            response_utils.json_array(
+                misc_crud.get_bookings_of_client_query(
+                    db=db, client_id=client_id
+                ),
+                schema,
+                key=None,
+            )
+        )
     return misc_crud.get_bookings_of_client(client_id=client_id, db=db)
@@ -0,0 +1,107 @@
+"""Internal endpoints for operating the API."""
+
+from typing import List
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from auth.deps import get_current_user
+from auth.hashing import hashing
+from crud import occupancy_utils
+from crud.reference_utils import reference_cache
+from db import get_db, get_pool_status
+from schemas.internal_schemas import (
+    HashingStats,
+    OccupancyCheck,
+    PoolStats,
+    ReferenceCacheStats,
+)
+from schemas.user_schemas import UserAuth
+
+router = APIRouter(prefix="/internal")
+
+
+@router.get(
+    "/occupancy",
+    summary="Check the occupancy snapshot against the database",
+    response_model=OccupancyCheck,
+    tags=["internal"],
+)
+def check_occupancy_snapshot(
+    repair: bool = False,
+    db: Session = Depends(get_db),
+    user: UserAuth = Depends(get_current_user),
+):
+    """
+    Compare this worker's occupancy snapshot with the bookings table.
+
+        Args:
+            repair : bool
+                Rebuild the snapshot if it has drifted from the database
+            db : Session
+                Current database
+
+        Returns:
+            OccupancyCheck
+                whether the snapshot is enabled and consistent,
+                and the IDs of rooms whose rows differ
+    """
+    return occupancy_utils.check_snapshot(db=db, repair=repair)
+
+
+@router.get(
+    "/pool",
+    summary="Get the database connection pool statistics",
+    response_model=List[PoolStats],
+    tags=["internal"],
+)
+def get_pool_stats(user: UserAuth = Depends(get_current_user)):
+    """
+    Get the live statistics of this worker's database connection pools.
+
+        Returns:
+            List[PoolStats]
+                for every pool its size, connections checked in and out,
+                overflow in use, and the number of checkouts, timeouts
+                and the total and longest time spent waiting (seconds)
+    """
+    return get_pool_status()
+
+
+@router.get(
+    "/hashing",
+    summary="Get the password hashing pool statistics",
+    response_model=HashingStats,
+    tags=["internal"],
+)
+def get_hashing_stats(user: UserAuth = Depends(get_current_user)):
+    """
+    Get the load of this worker's bcrypt pool used by login and signup.
+
+        Returns:
+            HashingStats
+                the number of workers, hashes running and queued, hashes
+                completed, failed with an error and rejected because the
+                queue was full, and the total and longest queue wait and
+                total hashing time (seconds)
+    """
+    return hashing.stats()
+
+
+@router.get(
+    "/reference_cache",
+    summary="Get the reference data cache statistics",
+    response_model=ReferenceCacheStats,
+    tags=["internal"],
+)
+def get_reference_cache_stats(user: UserAuth = Depends(get_current_user)):
+    """
+    Get the state of this worker's room type, facility and feature cache.
+
+        Returns:
+            ReferenceCacheStats
+                whether the cache is enabled and listening for
+                invalidations, the number of hits and misses, and per
+                table its version and the number of rows cached
+    """
+    return reference_cache.stats()
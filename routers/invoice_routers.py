@@ -1,12 +1,17 @@
 """Endpoints for Invoice."""
 
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.orm import Session
 
-from crud import invoice_utils
-from db import get_db
+from crud import (
+    include_utils,
+    invoice_utils,
+    pagination_utils,
+    response_utils,
+)
+from db import get_db, get_read_db
 from schemas.invoice_schemas import InvoiceCreate, InvoiceFull, InvoiceUpdate
 from schemas.user_schemas import ResultSchema, UserAuth
 from auth.deps import get_current_user
@@ -21,9 +26,13 @@ router = APIRouter()
     response_model=List[InvoiceFull],
 )
 def get_invoices(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -34,14 +43,46 @@ def get_invoices(
                 Specifies the number of qualifying rows to exclude.
             limit : int
                 If given, no more than that many rows will be returned.
+            after : str, optional
+                Cursor from the X-Next-Cursor header of the previous page,
+                the page then starts after it and skip is ignored
+            fields : str, optional
+                Comma separated fields to select and send instead of all
+                of them
+            include : str, optional
+                Comma separated relations to embed in every invoice, any
+                of: booking, booking.room,
+                booking.room.room_type, booking.room.room_type.features,
+                booking.room.facility, booking.client, client
             db : Session
                 Current database
 
         Returns:
             List[InvoiceFull]
                 a list of all invoices issued that are present in the db
+                ordered by ID, with the cursor of the next page in the
+                X-Next-Cursor header
     """
-    invoices = invoice_utils.get_invoices(db=db, skip=skip, limit=limit)
+    paths = include_utils.INVOICE_INCLUDES.parse(include, fields)
+    if paths:
+        invoices = invoice_utils.get_invoices(
+            db=db,
+            skip=skip,
+            limit=limit,
+            after=after,
+            options=include_utils.INVOICE_INCLUDES.options(paths),
+        )
+        pagination_utils.set_next_cursor(response, invoices, limit)
+        return include_utils.INVOICE_INCLUDES.response(
+            invoices, InvoiceFull, paths, response
+        )
+    schema = response_utils.fast_json_schema(InvoiceFull, fields)
+    invoices = invoice_utils.get_invoices(
+        db=db, skip=skip, limit=limit, after=after, schema=schema
+    )
+    pagination_utils.set_next_cursor(response, invoices, limit)
+    if schema:
+        return response_utils.rows_response(invoices, response, schema)
     return invoices
 
 
@@ -53,7 +94,7 @@ def get_invoices(
 )
 def get_invoice(
     invoice_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -1,13 +1,25 @@
 """Endpoints for Room, Facility, Feature and RoomType."""
 import datetime
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from crud import misc_crud, room_utils
+from crud import (
+    async_room_utils,
+    catalog_utils,
+    conditional_utils,
+    include_utils,
+    inventory_utils,
+    misc_crud,
+    pagination_utils,
+    response_utils,
+    room_utils,
+)
+from crud.response_utils import ResponseFormat
 from auth.deps import get_current_user
-from db import get_db
+from db import get_async_db, get_async_read_db, get_db, get_read_db
 from schemas.booking_schemas import BookingFull
 from schemas.client_schemas import ClientFull
 from schemas.room_schemas import (
@@ -17,12 +29,14 @@ from schemas.room_schemas import (
     FeatureCreate,
     FeatureFull,
     FeatureUpdate,
+    RoomCatalogEntry,
     RoomCreate,
     RoomFilter,
     RoomFull,
     RoomTypeList,
     RoomTypeCreate,
     RoomTypeFull,
+    RoomTypeInventoryDay,
     RoomTypeUpdate,
     RoomUpdate,
 )
@@ -39,10 +53,15 @@ router = APIRouter()
     response_model=List[RoomFull],
     tags=["room"],
 )
-def get_rooms(
+async def get_rooms(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -53,33 +72,225 @@ def get_rooms(
                 Specifies the number of qualifying rows to exclude.
             limit : int
                 If given, no more than that many rows will be returned.
-            db : Session
+            after : str, optional
+                Cursor from the X-Next-Cursor header of the previous page,
+                the page then starts after it and skip is ignored
+            fields : str, optional
+                Comma separated fields to select and send instead of all
+                of them, id is always sent
+            include : str, optional
+                Comma separated relations to embed in every room, any
+                of: room_type, room_type.features, facility
+            db : AsyncSession
                 Current database
 
         Returns:
             rooms : List[RoomList]
                 a list of all rooms present in db
-    """
-    rooms = room_utils.get_rooms(db=db, skip=skip, limit=limit)
+                ordered by ID, with the cursor of the next page in the
+                X-Next-Cursor header, and the ETag and Last-Modified
+                headers; an empty 304 if the copy in If-None-Match or
+                If-Modified-Since is still current. With include the
+                rooms are sent without validators, the included rows
+                come from other tables.
+    """
+    paths = include_utils.ROOM_INCLUDES.parse(include, fields)
+    if paths:
+        rooms = await async_room_utils.get_rooms(
+            db=db,
+            skip=skip,
+            limit=limit,
+            after=after,
+            options=include_utils.ROOM_INCLUDES.options(paths),
+        )
+        pagination_utils.set_next_cursor(response, rooms, limit)
+        return include_utils.ROOM_INCLUDES.response(
+            rooms, RoomFull, paths, response
+        )
+    not_modified = await async_room_utils.check_not_modified(
+        db=db, table="rooms", request=request, response=response
+    )
+    if not_modified:
+        return not_modified
+    schema = response_utils.fast_json_schema(RoomFull, fields)
+    rooms = await async_room_utils.get_rooms(
+        db=db, skip=skip, limit=limit, after=after, schema=schema
+    )
+    pagination_utils.set_next_cursor(response, rooms, limit)
+    if schema:
+        return response_utils.rows_response(rooms, response)
     return rooms
 
 
+@router.get(
+    "/rooms/available",
+    summary="Get all rooms vacant for a date range",
+    response_model=List[RoomFull],
+    tags=["room"],
+)
+async def get_vacant_rooms(
+    start_date: datetime.date,
+    end_date: datetime.date,
+    room_type_id: Optional[int] = None,
+    facility_id: Optional[int] = None,
+    floor: Optional[int] = None,
+    capacity: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_async_read_db),
+    user: UserAuth = Depends(get_current_user),
+):
+    """
+    Get all rooms which are not booked for the given dates.
+
+        Args:
+            start_date : datetime.date
+                First night of the stay
+            end_date : datetime.date
+                Check-out date of the stay
+            room_type_id : int, optional
+                Only return rooms of this room type
+            facility_id : int, optional
+                Only return rooms in this facility
+            floor : int, optional
+                Only return rooms on this floor
+            capacity : int, optional
+                Only return rooms whose type fits at least that many guests
+            skip : int
+                Specifies the number of qualifying rows to exclude.
+            limit : int
+                If given, no more than that many rows will be returned.
+            db : AsyncSession
+                Current database
+
+        Returns:
+            List[RoomFull]
+                a list of vacant rooms ordered by ID
+    """
+    return await async_room_utils.get_vacant_rooms(
+        db=db,
+        start_date=start_date,
+        end_date=end_date,
+        room_type_id=room_type_id,
+        facility_id=facility_id,
+        floor=floor,
+        capacity=capacity,
+        skip=skip,
+        limit=limit,
+    )
+
+
+@router.get(
+    "/rooms/sort",
+    response_model=List[RoomFull],
+    tags=["room"],
+    summary="Sort rooms",
+)
+def sort_rooms(
+    order: str,
+    order_by: str,
+    response_format: ResponseFormat = Query(
+        ResponseFormat.json, alias="format"
+    ),
+    db: Session = Depends(get_read_db),
+    user: UserAuth = Depends(get_current_user),
+):
+    """
+    Sort rooms.
+
+        Args:
+            order : str
+                Specified order -> asc or desc.
+            order_by : str
+                Value to order by.
+            format : ResponseFormat
+                json (default) returns a list, ndjson and csv stream
+                the rows one per line without loading them all at once
+            db: Session
+                Current database
+
+        Returns:
+            List[RoomTypeFull]
+                list of sorted rooms
+    """
+    if response_format != ResponseFormat.json:
+        return response_utils.stream_query(
+            room_utils.sort_rooms_query(db=db, order=order, order_by=order_by),
+            RoomFull,
+            response_format,
+        )
+    return room_utils.sort_rooms(db=db, order=order, order_by=order_by)
+
+
+@router.get(
+    "/rooms/catalog",
+    summary="Get the room catalog",
+    response_model=List[RoomCatalogEntry],
+    tags=["room"],
+)
+def get_room_catalog(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    user: UserAuth = Depends(get_current_user),
+):
+    """
+    Get every room with its type, facility and features.
+
+        Args
+            skip : int
+                Specifies the number of qualifying rows to exclude.
+            limit : int
+                If given, no more than that many rows will be returned.
+            after : str, optional
+                Cursor from the X-Next-Cursor header of the previous page,
+                the page then starts after it and skip is ignored
+            fields : str, optional
+                Comma separated fields to select and send instead of all
+                of them, room_id is always sent
+            db : Session
+                Current database
+
+        Returns:
+            List[RoomCatalogEntry]
+                the rooms with the name, capacity and price of their
+                type, the name of their facility and their features,
+                ordered by room ID, with the cursor of the next page in
+                the X-Next-Cursor header
+    """
+    schema = response_utils.fast_json_schema(
+        RoomCatalogEntry, fields, key="room_id"
+    )
+    entries = catalog_utils.get_catalog(
+        db=db, skip=skip, limit=limit, after=after, schema=schema
+    )
+    pagination_utils.set_next_cursor(response, entries, limit, key="room_id")
+    if schema:
+        return response_utils.rows_response(entries, response)
+    return entries
+
+
 @router.get(
     "/rooms/{room_id}",
     summary="Get room by ID",
     response_model=RoomFull,
     tags=["room"],
 )
-def get_room(
+async def get_room(
     room_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
     Get an existing room by ID.
 
         Args:
-            db : Session
+            db : AsyncSession
                 Current database
             room_id : int
                 ID of the room to retrieve
@@ -87,8 +298,18 @@ def get_room(
         Returns:
             room : RoomFull
                 RoomFull object with all info about the room
-    """
-    return room_utils.get_room(db=db, room_id=room_id)
+                with the ETag and Last-Modified headers; an empty 304
+                if the copy in If-None-Match or If-Modified-Since is
+                still current
+    """
+    # a missing room is a 404 whatever the validators say
+    room = await async_room_utils.get_room(db=db, room_id=room_id)
+    not_modified = await async_room_utils.check_not_modified(
+        db=db, table="rooms", request=request, response=response
+    )
+    if not_modified:
+        return not_modified
+    return room
 
 
 @router.post(
@@ -97,16 +318,16 @@ def get_room(
     response_model=RoomFull,
     tags=["room"],
 )
-def create_room(
+async def create_room(
     room: RoomCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
     Create a new room.
 
         Args:
-            db : Session
+            db : AsyncSession
                 Current database
             room : RoomCreate
                 RoomCreate object with all the
@@ -116,7 +337,7 @@ def create_room(
             room : RoomFull
                 RoomFull object with all info of the newly created room
     """
-    return room_utils.create_room(db=db, room=room)
+    return await async_room_utils.create_room(db=db, room=room)
 
 
 @router.put(
@@ -125,17 +346,17 @@ def create_room(
     response_model=RoomFull,
     tags=["room"],
 )
-def update_room(
+async def update_room(
     room_id: int,
     room: RoomUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
     Update an existing room.
 
         Args:
-            db : Session
+            db : AsyncSession
                 Current database
             room : RoomUpdate
                 RoomUpdate object with all
@@ -147,7 +368,9 @@ def update_room(
             str : RoomFull
                 RoomFull object with all info of the newly updated room
     """
-    return room_utils.update_room(db=db, room_id=room_id, room=room)
+    return await async_room_utils.update_room(
+        db=db, room_id=room_id, room=room
+    )
 
 
 @router.delete(
@@ -156,16 +379,16 @@ def update_room(
     response_model=ResultSchema,
     tags=["room"],
 )
-def delete_room(
+async def delete_room(
     room_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
     Delete an existing room.
 
         Args:
-            db: Session
+            db: AsyncSession
                 Current database
             room_id: int
                 ID of the room to delete
@@ -174,7 +397,7 @@ def delete_room(
             result : str
                 string with info about successful deletion
     """
-    return room_utils.delete_room(room_id=room_id, db=db)
+    return await async_room_utils.delete_room(room_id=room_id, db=db)
 
 
 @router.get(
@@ -185,7 +408,7 @@ def delete_room(
 )
 def get_room_booking_status(
     room_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -213,7 +436,7 @@ def get_room_booking_status(
 )
 def get_room_cleanliness_status(
     room_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -240,7 +463,7 @@ def get_room_cleanliness_status(
 )
 def get_room_guest_now(
     room_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -273,9 +496,13 @@ def get_room_guest_now(
     tags=["room_type"],
 )
 def get_room_types(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -286,14 +513,35 @@ def get_room_types(
                 Specifies the number of qualifying rows to exclude.
             limit : int
                 If given, no more than that many rows will be returned.
+            after : str, optional
+                Cursor from the X-Next-Cursor header of the previous page,
+                the page then starts after it and skip is ignored
+            fields : str, optional
+                Comma separated fields to select and send instead of all
+                of them, id is always sent
             db: Session
                 Current database
 
         Returns:
             List[RoomTypeList]
                 a list of all room types present in db
+                ordered by ID, with the cursor of the next page in the
+                X-Next-Cursor header, and the ETag and Last-Modified
+                headers; an empty 304 if the copy in If-None-Match or
+                If-Modified-Since is still current
     """
-    room_types = room_utils.get_room_types(db=db, skip=skip, limit=limit)
+    not_modified = conditional_utils.check(
+        db=db, table="room_types", request=request, response=response
+    )
+    if not_modified:
+        return not_modified
+    schema = response_utils.fast_json_schema(RoomTypeList, fields)
+    room_types = room_utils.get_room_types(
+        db=db, skip=skip, limit=limit, after=after, schema=schema
+    )
+    pagination_utils.set_next_cursor(response, room_types, limit)
+    if schema:
+        return response_utils.rows_response(room_types, response)
     return room_types
 
 
@@ -305,7 +553,9 @@ def get_room_types(
 )
 def get_room_type(
     room_type_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -321,11 +571,58 @@ def get_room_type(
         Returns:
             RoomTypeFull
                 RoomTypeFull object with all info about the room type
+                with the ETag and Last-Modified headers; an empty 304
+                if the copy in If-None-Match or If-Modified-Since is
+                still current
     """
     room_type = room_utils.get_room_type(db=db, room_type_id=room_type_id)
+    not_modified = conditional_utils.check(
+        db=db, table="room_types", request=request, response=response
+    )
+    if not_modified:
+        return not_modified
     return room_type
 
 
+@router.get(
+    "/room_types/{room_type_id}/inventory",
+    summary="Get daily inventory of a room type",
+    response_model=List[RoomTypeInventoryDay],
+    tags=["room_type"],
+)
+def get_room_type_inventory(
+    room_type_id: int,
+    start_date: Optional[datetime.date] = None,
+    days: int = Query(365, ge=1, le=366),
+    db: Session = Depends(get_read_db),
+    user: UserAuth = Depends(get_current_user),
+):
+    """
+    Get the number of rooms, sold rooms and available rooms
+    of a room type for every night in a date range.
+
+        Args:
+            room_type_id : int
+                ID of the room type
+            start_date : datetime.date
+                First night of the grid, today by default
+            days : int
+                Number of nights in the grid, 365 by default
+            db : Session
+                Current database
+
+        Returns:
+            List[RoomTypeInventoryDay]
+                one entry per night, ordered by date
+    """
+    return inventory_utils.get_inventory(
+        db=db,
+        room_type_id=room_type_id,
+        start_date=start_date or datetime.date.today(),
+        days=days,
+    )
+
+
 @router.post(
     "/room_types",
     summary="Create a new room type",
@@ -427,7 +724,7 @@ def get_features_for_roomtype(
     room_type_id: int,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -526,25 +823,52 @@ def delete_feature_from_roomtype(
     tags=["feature"],
 )
 def get_features(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
     Get all existing features.
 
         Args:
+            skip : int
+                Specifies the number of qualifying rows to exclude.
+            limit : int
+                If given, no more than that many rows will be returned.
+            after : str, optional
+                Cursor from the X-Next-Cursor header of the previous page,
+                the page then starts after it and skip is ignored
+            fields : str, optional
+                Comma separated fields to select and send instead of all
+                of them, id is always sent
             db : Session
                 Current database
-            feature_id : int
-                ID of the feature to retrieve
 
         Returns:
-            FeatureFull
-                FeatureFull object with all info about the room type
-    """
-    features = room_utils.get_features(db=db, skip=skip, limit=limit)
+            List[FeatureFull]
+                a list of all features present in db
+                ordered by ID, with the cursor of the next page in the
+                X-Next-Cursor header, and the ETag and Last-Modified
+                headers; an empty 304 if the copy in If-None-Match or
+                If-Modified-Since is still current
+    """
+    not_modified = conditional_utils.check(
+        db=db, table="features", request=request, response=response
+    )
+    if not_modified:
+        return not_modified
+    schema = response_utils.fast_json_schema(FeatureFull, fields)
+    features = room_utils.get_features(
+        db=db, skip=skip, limit=limit, after=after, schema=schema
+    )
+    pagination_utils.set_next_cursor(response, features, limit)
+    if schema:
+        return response_utils.rows_response(features, response)
     return features
 
 
@@ -556,7 +880,9 @@ def get_features(
 )
 def get_feature(
     feature_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -571,8 +897,16 @@ def get_feature(
         Returns:
             FeatureFull
                 FeatureFull object with all info about the room type
+                with the ETag and Last-Modified headers; an empty 304
+                if the copy in If-None-Match or If-Modified-Since is
+                still current
     """
     feature = room_utils.get_feature(db=db, feature_id=feature_id)
+    not_modified = conditional_utils.check(
+        db=db, table="features", request=request, response=response
+    )
+    if not_modified:
+        return not_modified
     return feature
 
 
@@ -674,9 +1008,13 @@ def delete_feature(
     tags=["facility"],
 )
 def get_facilities(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -687,14 +1025,35 @@ def get_facilities(
                 Specifies the number of qualifying rows to exclude.
             limit : int, optional
                 If given, no more than that many rows will be returned.
+            after : str, optional
+                Cursor from the X-Next-Cursor header of the previous page,
+                the page then starts after it and skip is ignored
+            fields : str, optional
+                Comma separated fields to select and send instead of all
+                of them, id is always sent
             db: Session
                 Current database
 
         Returns:
             List[FacilityFull]
                 a list of all facilities of hotel facilities present in db
+                ordered by ID, with the cursor of the next page in the
+                X-Next-Cursor header, and the ETag and Last-Modified
+                headers; an empty 304 if the copy in If-None-Match or
+                If-Modified-Since is still current
     """
-    facilities = room_utils.get_facilities(db=db, skip=skip, limit=limit)
+    not_modified = conditional_utils.check(
+        db=db, table="facilities", request=request, response=response
+    )
+    if not_modified:
+        return not_modified
+    schema = response_utils.fast_json_schema(FacilityFull, fields)
+    facilities = room_utils.get_facilities(
+        db=db, skip=skip, limit=limit, after=after, schema=schema
+    )
+    pagination_utils.set_next_cursor(response, facilities, limit)
+    if schema:
+        return response_utils.rows_response(facilities, response)
     return facilities
 
 
@@ -706,7 +1065,9 @@ def get_facilities(
 )
 def get_facility(
     facility_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -722,8 +1083,16 @@ def get_facility(
         Returns:
             FacilityFull
                 FacilityFull object with all info about the hotel facility
+                with the ETag and Last-Modified headers; an empty 304
+                if the copy in If-None-Match or If-Modified-Since is
+                still current
     """
     facility = room_utils.get_facility(db=db, facility_id=facility_id)
+    not_modified = conditional_utils.check(
+        db=db, table="facilities", request=request, response=response
+    )
+    if not_modified:
+        return not_modified
     return facility
 
 
@@ -826,7 +1195,7 @@ def get_bookings_for_room(
     room_id: int,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -862,7 +1231,7 @@ def get_features_for_room(
     room_id: int,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -897,7 +1266,9 @@ def get_features_for_room(
 )
 def get_room_types_with_feature(
     feature_id: int,
-    db: Session = Depends(get_db),
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -906,14 +1277,20 @@ def get_room_types_with_feature(
         Args:
             feature_id: int
                 ID of the feature
+            skip : int
+                Specifies the number of qualifying rows to exclude.
+            limit : int
+                If given, no more than that many rows will be returned.
             db: Session
                 Current database
 
         Returns:
-            List[RoomTypeFull]
-                list of sorted rooms
+            List[RoomTypeList]
+                list of the room types with the feature ordered by ID
     """
-    return misc_crud.get_room_types_with_feature(db=db, feature_id=feature_id)
+    return misc_crud.get_room_types_with_feature(
+        db=db, feature_id=feature_id, skip=skip, limit=limit
+    )
 
 
 @router.post(
@@ -924,7 +1301,10 @@ def get_room_types_with_feature(
 )
 def filter_rooms(
     room: RoomFilter,
-    db: Session = Depends(get_db),
+    response_format: ResponseFormat = Query(
+        ResponseFormat.json, alias="format"
+    ),
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -932,7 +1312,11 @@ def filter_rooms(
 
         Args:
             room: RoomFilter
-                RoomFilter with optional parameters of filtering
+                RoomFilter with optional parameters of filtering,
+                feature_ids keeps the rooms whose type has all of them
+            format : ResponseFormat
+                json (default) returns a list, ndjson and csv stream
+                the rows one per line without loading them all at once
             db: Session
                 Current database
 
@@ -940,39 +1324,22 @@ def filter_rooms(
             List[RoomFull]
                 list of sorted rooms
     """
+    if response_format != ResponseFormat.json:
+        return response_utils.stream_query(
+            room_utils.filter_rooms_query(db=db, room=room),
+            RoomFull,
+            response_format,
+        )
+    schema = response_utils.database_json_schema(RoomFull)
+    if schema:
+        return response_utils.json_array_response(
+            response_utils.json_array(
+                room_utils.filter_rooms_query(db=db, room=room), schema
+            )
+        )
     return room_utils.filter_rooms(db=db, room=room)
 
 
-@router.get(
-    "/rooms/sort",
-    response_model=List[RoomFull],
-    tags=["room"],
-    summary="Sort rooms",
-)
-def sort_rooms(
-    order: str,
-    order_by: str,
-    db: Session = Depends(get_db),
-    user: UserAuth = Depends(get_current_user),
-):
-    """
-    Sort rooms.
-
-        Args:
-            order : str
-                Specified order -> asc or desc.
-            order_by : str
-                Value to order by.
-            db: Session
-                Current database
-
-        Returns:
-            List[RoomTypeFull]
-                list of sorted rooms
-    """
-    return room_utils.sort_rooms(db=db, order=order, order_by=order_by)
-
-
 @router.post(
     "/room_types/filter/by_price",
     response_model=List[RoomTypeFull],
@@ -982,7 +1349,7 @@ def sort_rooms(
 def filter_room_types_by_price(
     operator: str,
     value: float,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -1014,7 +1381,10 @@ def filter_room_types_by_price(
 def sort_room_types(
     order: str,
     order_by: str,
-    db: Session = Depends(get_db),
+    response_format: ResponseFormat = Query(
+        ResponseFormat.json, alias="format"
+    ),
+    db: Session = Depends(get_read_db),
     user: UserAuth = Depends(get_current_user),
 ):
     """
@@ -1025,6 +1395,9 @@ def sort_room_types(
                 Specified order -> asc or desc.
             order_by : str
                 Value to order by.
+            format : ResponseFormat
+                json (default) returns a list, ndjson and csv stream
+                the rows one per line without loading them all at once
             db: Session
                 Current database
 
@@ -1032,6 +1405,14 @@ def sort_room_types(
             List[RoomTypeFull]
                 list of sorted room types
     """
+    if response_format != ResponseFormat.json:
+        return response_utils.stream_query(
+            room_utils.sort_room_types_query(
+                db=db, order=order, order_by=order_by
+            ),
+            RoomTypeFull,
+            response_format,
+        )
     return room_utils.sort_room_types(db=db, order=order, order_by=order_by)
 
 
@@ -1041,12 +1422,12 @@ def sort_room_types(
     tags=["room"],
     summary="Check room availability by date",
 )
-def check_room_availability_by_date(
+async def check_room_availability_by_date(
     start_date: datetime.date,
     end_date: datetime.date,
     room_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
-    return room_utils.check_room_availability_by_date(
+    return await async_room_utils.check_room_availability_by_date(
         start_date=start_date, end_date=end_date, room_id=room_id, db=db
     )
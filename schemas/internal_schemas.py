@@ -0,0 +1,46 @@
+"""Schemas for internal endpoints."""
+
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class OccupancyCheck(BaseModel):
+    enabled: bool
+    consistent: Optional[bool]
+    room_ids: List[int]
+
+
+class PoolStats(BaseModel):
+    name: str
+    pool: str
+    size: Optional[int]
+    checked_in: Optional[int]
+    checked_out: Optional[int]
+    overflow: Optional[int]
+    checkouts: int
+    timeouts: int
+    wait_time: float
+    max_wait: float
+
+
+class HashingStats(BaseModel):
+    workers: int
+    queue_size: int
+    running: int
+    queued: int
+    completed: int
+    failed: int
+    rejected: int
+    wait_time: float
+    max_wait: float
+    hash_time: float
+
+
+class ReferenceCacheStats(BaseModel):
+    enabled: bool
+    listening: bool
+    hits: int
+    misses: int
+    versions: Dict[str, int]
+    rows: Dict[str, int]
@@ -1,5 +1,6 @@
 """Schemas for models associated with Room."""
 
+import datetime
 from typing import List, Optional
 from pydantic import BaseModel
 from models.room import RoomAvailabilityStatus, RoomCleanlinessStatus
@@ -43,6 +44,8 @@ class RoomFilter(BaseModel):
     facility_id: Optional[int]
     booking_status: Optional[RoomAvailabilityStatus]
     cleanliness_status: Optional[RoomCleanlinessStatus]
+    # rooms whose type has every one of these features
+    feature_ids: Optional[List[int]]
 
     class Config:
         orm_mode = True
@@ -99,6 +102,13 @@ class RoomTypeUpdate(BaseModel):
     price: Optional[float]
 
 
+class RoomTypeInventoryDay(BaseModel):
+    date: datetime.date
+    total: int
+    sold: int
+    available: int
+
+
 # Feature schemas
 
 
@@ -155,3 +165,24 @@ class FacilityFilter(BaseModel):
 
 class FacilityUpdate(BaseModel):
     name: Optional[str]
+
+
+# Room catalog schemas
+
+
+class RoomCatalogEntry(BaseModel):
+    room_id: int
+    description: Optional[str]
+    floor: int
+    booking_status: Optional[RoomAvailabilityStatus]
+    cleanliness_status: Optional[RoomCleanlinessStatus]
+    room_type_id: Optional[int]
+    room_type_name: Optional[str]
+    capacity: Optional[str]
+    price: Optional[float]
+    facility_id: Optional[int]
+    facility_name: Optional[str]
+    features: List[FeatureFull]
+
+    class Config:
+        orm_mode = True
@@ -10,6 +10,10 @@ class TokenSchema(BaseModel):
     refresh_token: str
 
 
+class RefreshTokenSchema(BaseModel):
+    refresh_token: str
+
+
 class TokenPayload(BaseModel):
     sub: str = None
     exp: int = None
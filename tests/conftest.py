@@ -10,19 +10,25 @@ from sqlalchemy.orm import sessionmaker
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from auth.deps import get_current_user
+from auth.user_cache import user_cache
+from crud.reference_utils import reference_cache
 from db import (
     POSTGRES_PASSWORD,
     POSTGRES_SERVER,
     POSTGRES_TEST_DATABASE,
     POSTGRES_USER,
     Base,
+    get_async_db,
+    get_async_read_db,
     get_db,
+    get_read_db,
 )
 from main import app
 from routers import (
     auth_routers,
     booking_routers,
     client_routers,
+    internal_routers,
     invoice_routers,
     room_routers,
 )
@@ -35,6 +41,7 @@ def start_application():
     app.include_router(client_routers.router)
     app.include_router(booking_routers.router)
     app.include_router(invoice_routers.router)
+    app.include_router(internal_routers.router)
     return app
 
 
@@ -47,12 +54,27 @@ engine = create_engine(SQLALCHEMY_DATABASE_URL)
 SessionTesting = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+class AsyncSessionTesting:
+    """
+    Stand in for AsyncSession so async routes run on the test transaction.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.sync_session = session
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return fn(self.session, *args, **kwargs)
+
+
 @pytest.fixture(scope="function")
 def app() -> Generator[FastAPI, Any, None]:
     """
     Create a fresh database on each test case.
     """
     Base.metadata.create_all(engine)
+    user_cache.clear()
+    reference_cache.clear()
     _app = start_application()
     yield _app
     Base.metadata.drop_all(engine)
@@ -84,8 +106,14 @@ def client_not_auth(
         finally:
             pass
 
+    async def _get_test_async_db():
+        yield AsyncSessionTesting(db_session)
+
     app.dependency_overrides = {}
     app.dependency_overrides[get_db] = _get_test_db
+    app.dependency_overrides[get_read_db] = _get_test_db
+    app.dependency_overrides[get_async_db] = _get_test_async_db
+    app.dependency_overrides[get_async_read_db] = _get_test_async_db
     with TestClient(app) as client:
         yield client
 
@@ -105,10 +133,16 @@ def client_auth(
         finally:
             pass
 
+    async def _get_test_async_db():
+        yield AsyncSessionTesting(db_session)
+
     def user_auth():
         pass
 
     app.dependency_overrides[get_db] = _get_test_db
+    app.dependency_overrides[get_read_db] = _get_test_db
+    app.dependency_overrides[get_async_db] = _get_test_async_db
+    app.dependency_overrides[get_async_read_db] = _get_test_async_db
     app.dependency_overrides[get_current_user] = user_auth
     with TestClient(app) as client:
         yield client
@@ -77,3 +77,90 @@ def test_auth(client_not_auth: TestClient):
     id = response.json()["id"]
     assert isinstance(id, str)
     assert response.json()["username"] == user["username"]
+
+
+def test_user_cache(client_not_auth: TestClient, db_session):
+    from auth.user_cache import user_cache
+    from models.user import User
+
+    user = {"username": "frontdesk", "password": "password123"}
+    response = client_not_auth.post("/signup", json=user)
+    assert response.status_code == 200
+    response = client_not_auth.post("/login", data=user)
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = client_not_auth.get("/me", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["username"] == "frontdesk"
+    response = client_not_auth.get("/me", headers=headers)
+    assert response.status_code == 200
+    assert (user_cache.misses, user_cache.hits) == (1, 1)
+
+    _user = db_session.query(User).filter_by(username="frontdesk").one()
+    _user.is_active = False
+    db_session.commit()
+    assert user_cache.get("frontdesk") is None
+
+    response = client_not_auth.get("/me", headers=headers)
+    assert response.status_code == 403
+    assert response.json() == {"detail": "Inactive user"}
+
+
+def test_hashing_queue_is_bounded():
+    import asyncio
+    import threading
+
+    import pytest
+    from fastapi import HTTPException
+
+    from auth.hashing import HashingService
+
+    service = HashingService(workers=1, queue_size=1)
+    release = threading.Event()
+
+    async def storm():
+        first = asyncio.ensure_future(service.run(release.wait))
+        second = asyncio.ensure_future(service.run(release.wait))
+        await asyncio.sleep(0.05)
+        assert service.stats()["running"] == 1
+        assert service.stats()["queued"] == 1
+        with pytest.raises(HTTPException) as error:
+            await service.run(release.wait)
+        assert error.value.status_code == 503
+        release.set()
+        await asyncio.gather(first, second)
+
+    asyncio.run(storm())
+    assert service.stats()["completed"] == 2
+    assert service.stats()["rejected"] == 1
+
+    with pytest.raises(ValueError):
+        asyncio.run(service.verify_password("password123", "not-a-hash"))
+    assert service.stats()["completed"] == 2
+    assert service.stats()["failed"] == 1
+    service.shutdown()
+
+
+def test_refresh(client_not_auth: TestClient):
+    user = {"username": "concierge", "password": "password123"}
+    client_not_auth.post("/signup", json=user)
+    response = client_not_auth.post("/login", data=user)
+    refresh_token = {"refresh_token": response.json()["refresh_token"]}
+
+    response = client_not_auth.post("/refresh", json=refresh_token)
+    assert response.status_code == 200
+    assert response.json()["refresh_token"] == refresh_token["refresh_token"]
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    response = client_not_auth.get("/me", headers=headers)
+    assert response.json()["username"] == "concierge"
+
+    response = client_not_auth.post(
+        "/refresh", json={"refresh_token": headers["Authorization"][7:]}
+    )
+    assert response.status_code == 403
+
+    response = client_not_auth.post("/logout", json=refresh_token)
+    assert response.status_code == 200
+    response = client_not_auth.post("/refresh", json=refresh_token)
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Token revoked"}
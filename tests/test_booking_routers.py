@@ -0,0 +1,667 @@
+import datetime
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from crud import occupancy_utils, response_utils
+
+today = datetime.date.today()
+
+client = {
+    "first_name": "Danylo",
+    "last_name": "Halytskyi",
+    "email": "danylo@halytskyi.com",
+    "phone": "+380143256789",
+    "address": "Danyla Halytskoho, 12",
+}
+
+
+def day(offset: int) -> str:
+    return (today + datetime.timedelta(days=offset)).isoformat()
+
+
+def create_hotel(client_auth: TestClient):
+    response = client_auth.post("/facilities", json={"name": "facility"})
+    assert response.status_code == 200
+    request_data = {"name": "single", "capacity": "1", "price": 50}
+    response = client_auth.post("/room_types", json=request_data)
+    assert response.status_code == 200
+    request_data = {"name": "family", "capacity": "4", "price": 120}
+    response = client_auth.post("/room_types", json=request_data)
+    assert response.status_code == 200
+    for room_id, room_type_id, floor in [
+        (101, 1, 1),
+        (102, 1, 1),
+        (201, 2, 2),
+    ]:
+        request_data = {
+            "id": room_id,
+            "room_type_id": room_type_id,
+            "facility_id": 1,
+            "floor": floor,
+            "booking_status": "vacant",
+            "cleanliness_status": "clean",
+        }
+        response = client_auth.post("/rooms", json=request_data)
+        assert response.status_code == 200
+    response = client_auth.post("/clients", json=client)
+    assert response.status_code == 200
+
+
+def test_vacant_rooms(client_auth: TestClient):
+    create_hotel(client_auth)
+
+    request_data = {
+        "client_id": 1,
+        "room_id": 101,
+        "start_date": day(1),
+        "end_date": day(4),
+    }
+    response = client_auth.post("/bookings", json=request_data)
+    assert response.status_code == 200
+
+    # a stay is at least one night
+    no_nights = {**request_data, "room_id": 102, "end_date": day(1)}
+    response = client_auth.post("/bookings", json=no_nights)
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Incorrect date"}
+    response = client_auth.put(
+        "/bookings/1", json={**request_data, "end_date": day(1)}
+    )
+    assert response.status_code == 400
+
+    response = client_auth.get(
+        f"/rooms/available?start_date={day(2)}&end_date={day(3)}"
+    )
+    assert response.status_code == 200
+    assert [room["id"] for room in response.json()] == [102, 201]
+
+    # The check-out day is free for the next guest
+    response = client_auth.get(
+        f"/rooms/available?start_date={day(4)}&end_date={day(6)}"
+    )
+    assert response.status_code == 200
+    assert [room["id"] for room in response.json()] == [101, 102, 201]
+
+    response = client_auth.get(
+        f"/rooms/available?start_date={day(2)}&end_date={day(3)}&capacity=2"
+    )
+    assert response.status_code == 200
+    assert [room["id"] for room in response.json()] == [201]
+
+    response = client_auth.get(
+        f"/rooms/available?start_date={day(2)}&end_date={day(3)}"
+        "&room_type_id=1&floor=1&facility_id=1"
+    )
+    assert response.status_code == 200
+    assert [room["id"] for room in response.json()] == [102]
+
+    response = client_auth.get(
+        f"/rooms/available?start_date={day(1)}&end_date={day(4)}&limit=1"
+    )
+    assert response.status_code == 200
+    assert [room["id"] for room in response.json()] == [102]
+
+    response = client_auth.get(
+        f"/rooms/available?start_date={day(3)}&end_date={day(2)}"
+    )
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Incorrect date"}
+
+
+def test_cursor_pagination(client_auth: TestClient):
+    create_hotel(client_auth)
+
+    response = client_auth.get("/rooms?limit=2")
+    assert [room["id"] for room in response.json()] == [101, 102]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client_auth.get(f"/rooms?limit=2&after={cursor}")
+    assert [room["id"] for room in response.json()] == [201]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client_auth.get("/rooms?limit=2&skip=1")
+    assert [room["id"] for room in response.json()] == [102, 201]
+
+    response = client_auth.get("/rooms?after=not-a-cursor")
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+def test_streamed_responses(client_auth: TestClient):
+    create_hotel(client_auth)
+    for room_id in (101, 201):
+        request_data = {
+            "client_id": 1,
+            "room_id": room_id,
+            "start_date": day(1),
+            "end_date": day(3),
+        }
+        response = client_auth.post("/bookings", json=request_data)
+        assert response.status_code == 200
+
+    response = client_auth.get(
+        "/bookings/sort?order=desc&order_by=room_id&format=ndjson"
+    )
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [booking["room_id"] for booking in lines] == [201, 101]
+    response = client_auth.get("/bookings/sort?order=desc&order_by=room_id")
+    assert lines == response.json()
+
+    response = client_auth.post("/rooms/filter?format=csv", json={"floor": 1})
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines() == [
+        "id,room_type_id,floor,facility_id,booking_status,cleanliness_status",
+        "101,1,1,1,vacant,clean",
+        "102,1,1,1,vacant,clean",
+    ]
+
+    response = client_auth.post("/room_types/sort?order=desc&order_by=price")
+    assert [room_type["name"] for room_type in response.json()] == [
+        "family",
+        "single",
+    ]
+
+
+def test_room_availability(client_auth: TestClient):
+    create_hotel(client_auth)
+
+    request_data = {
+        "client_id": 1,
+        "room_id": 101,
+        "start_date": day(1),
+        "end_date": day(4),
+    }
+    response = client_auth.post("/bookings", json=request_data)
+    assert response.status_code == 200
+
+    response = client_auth.get(
+        f"/rooms/101/availability?start_date={day(3)}&end_date={day(5)}"
+    )
+    assert response.status_code == 200
+    assert response.json() == {"result": "booked"}
+
+    response = client_auth.get(
+        f"/rooms/101/availability?start_date={day(4)}&end_date={day(5)}"
+    )
+    assert response.status_code == 200
+    assert response.json() == {"result": "vacant"}
+
+
+def test_overlapping_booking(client_auth: TestClient):
+    create_hotel(client_auth)
+
+    request_data = {
+        "client_id": 1,
+        "room_id": 101,
+        "start_date": day(1),
+        "end_date": day(4),
+    }
+    response = client_auth.post("/bookings", json=request_data)
+    assert response.status_code == 200
+    assert response.json()["total_price"] == 150
+
+    # Back-to-back stays share the check-out day
+    request_data = {
+        "client_id": 1,
+        "room_id": 101,
+        "start_date": day(4),
+        "end_date": day(6),
+    }
+    response = client_auth.post("/bookings", json=request_data)
+    assert response.status_code == 200
+
+    # A rejected insert aborts the test transaction, so this runs last
+    request_data = {
+        "client_id": 1,
+        "room_id": 101,
+        "start_date": day(2),
+        "end_date": day(5),
+    }
+    response = client_auth.post("/bookings", json=request_data)
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Room is booked"}
+
+
+def test_room_type_inventory(client_auth: TestClient):
+    create_hotel(client_auth)
+
+    request_data = {
+        "client_id": 1,
+        "room_id": 101,
+        "start_date": day(1),
+        "end_date": day(3),
+    }
+    response = client_auth.post("/bookings", json=request_data)
+    assert response.status_code == 200
+
+    response = client_auth.get(
+        f"/room_types/1/inventory?start_date={day(0)}&days=4"
+    )
+    assert response.status_code == 200
+    assert [
+        (d["total"], d["sold"], d["available"]) for d in response.json()
+    ] == [
+        (2, 0, 2),
+        (2, 1, 1),
+        (2, 1, 1),
+        (2, 0, 2),
+    ]
+    assert response.json()[1]["date"] == day(1)
+
+    request_data = {"start_date": day(2), "end_date": day(4)}
+    response = client_auth.put(
+        "/bookings/1", json={**request_data, "client_id": 1, "room_id": 101}
+    )
+    assert response.status_code == 200
+
+    response = client_auth.get(
+        f"/room_types/1/inventory?start_date={day(0)}&days=4"
+    )
+    assert [d["sold"] for d in response.json()] == [0, 0, 1, 1]
+
+    request_data = {
+        "id": 103,
+        "room_type_id": 1,
+        "facility_id": 1,
+        "floor": 1,
+        "booking_status": "vacant",
+        "cleanliness_status": "clean",
+    }
+    response = client_auth.post("/rooms", json=request_data)
+    assert response.status_code == 200
+
+    response = client_auth.get(
+        f"/room_types/1/inventory?start_date={day(0)}&days=4"
+    )
+    assert [d["total"] for d in response.json()] == [3, 3, 3, 3]
+    assert [d["sold"] for d in response.json()] == [0, 0, 1, 1]
+
+    response = client_auth.delete("/bookings/1")
+    assert response.status_code == 200
+
+    response = client_auth.get(
+        f"/room_types/1/inventory?start_date={day(0)}&days=4"
+    )
+    assert [d["sold"] for d in response.json()] == [0, 0, 0, 0]
+
+    response = client_auth.get("/room_types/3/inventory")
+    assert response.status_code == 404
+
+    response = client_auth.get("/room_types/1/inventory?days=400")
+    assert response.status_code == 422
+
+
+@pytest.fixture
+def snapshot(db_session):
+    yield occupancy_utils.snapshot
+    occupancy_utils.snapshot.reset()
+
+
+def test_occupancy_snapshot(client_auth: TestClient, db_session, snapshot):
+    create_hotel(client_auth)
+    snapshot.build(db=db_session)
+    assert snapshot.matrix.shape == (3, snapshot.horizon_days)
+
+    request_data = {
+        "client_id": 1,
+        "room_id": 101,
+        "start_date": day(1),
+        "end_date": day(4),
+    }
+    response = client_auth.post("/bookings", json=request_data)
+    assert response.status_code == 200
+    start, end = today + datetime.timedelta(1), today + datetime.timedelta(4)
+    assert snapshot.is_vacant(101, start, end) is False
+    assert snapshot.vacant_room_ids(start, end) == [102, 201]
+
+    response = client_auth.get(
+        f"/rooms/available?start_date={day(2)}&end_date={day(3)}"
+    )
+    assert [room["id"] for room in response.json()] == [102, 201]
+
+    response = client_auth.get(
+        f"/rooms/101/availability?start_date={day(3)}&end_date={day(5)}"
+    )
+    assert response.json() == {"result": "booked"}
+
+    request_data = {
+        "id": 301,
+        "room_type_id": 2,
+        "facility_id": 1,
+        "floor": 3,
+        "booking_status": "vacant",
+        "cleanliness_status": "clean",
+    }
+    response = client_auth.post("/rooms", json=request_data)
+    assert response.status_code == 200
+    assert snapshot.vacant_room_ids(start, end) == [102, 201, 301]
+
+    request_data = {
+        "client_id": 1,
+        "room_id": 101,
+        "start_date": day(5),
+        "end_date": day(6),
+    }
+    response = client_auth.put("/bookings/1", json=request_data)
+    assert response.status_code == 200
+    assert snapshot.is_vacant(101, start, end) is True
+
+    response = client_auth.get("/internal/occupancy")
+    assert response.status_code == 200
+    assert response.json() == {
+        "enabled": True,
+        "consistent": True,
+        "room_ids": [],
+    }
+
+    snapshot.set_stay(102, start, end, booked=True)
+    response = client_auth.get("/internal/occupancy?repair=true")
+    assert response.json()["consistent"] is False
+    assert response.json()["room_ids"] == [102]
+    assert snapshot.is_vacant(102, start, end) is True
+
+    response = client_auth.delete("/bookings/1")
+    assert response.status_code == 200
+    assert snapshot.verify(db=db_session) == []
+
+
+def test_occupancy_snapshot_unknown_rooms(
+    client_auth: TestClient, db_session, snapshot, monkeypatch
+):
+    create_hotel(client_auth)
+    snapshot.build(db=db_session)
+    # writes made by another worker never reach this snapshot
+    monkeypatch.setattr(snapshot, "add_room", lambda room_id: None)
+    monkeypatch.setattr(snapshot, "set_stay", lambda *args, **kwargs: None)
+
+    request_data = {
+        "id": 301,
+        "room_type_id": 2,
+        "facility_id": 1,
+        "floor": 3,
+        "booking_status": "vacant",
+        "cleanliness_status": "clean",
+    }
+    response = client_auth.post("/rooms", json=request_data)
+    assert response.status_code == 200
+    url = f"/rooms/available?start_date={day(2)}&end_date={day(3)}"
+    response = client_auth.get(url)
+    assert [room["id"] for room in response.json()] == [101, 102, 201, 301]
+
+    request_data = {
+        "client_id": 1,
+        "room_id": 301,
+        "start_date": day(1),
+        "end_date": day(4),
+    }
+    response = client_auth.post("/bookings", json=request_data)
+    assert response.status_code == 200
+    response = client_auth.get(url)
+    assert [room["id"] for room in response.json()] == [101, 102, 201]
+
+
+def test_shared_occupancy_snapshot(
+    client_auth: TestClient, db_session, tmp_path, monkeypatch
+):
+    create_hotel(client_auth)
+    path = str(tmp_path / "occupancy.bin")
+    writer = occupancy_utils.SharedOccupancySnapshot(path=path)
+    reader = occupancy_utils.SharedOccupancySnapshot(path=path)
+    writer.start(db=db_session)
+    reader.start(db=db_session)
+    assert reader.matrix.shape == (3, reader.horizon_days)
+    monkeypatch.setattr(occupancy_utils, "snapshot", writer)
+
+    request_data = {
+        "client_id": 1,
+        "room_id": 101,
+        "start_date": day(1),
+        "end_date": day(4),
+    }
+    response = client_auth.post("/bookings", json=request_data)
+    assert response.status_code == 200
+    start, end = today + datetime.timedelta(1), today + datetime.timedelta(4)
+    assert int(reader._header["generation"][0]) == 2
+    assert reader.is_vacant(101, start, end) is False
+    assert reader.vacant_room_ids(start, end) == [102, 201]
+
+    request_data = {
+        "id": 301,
+        "room_type_id": 2,
+        "facility_id": 1,
+        "floor": 3,
+        "booking_status": "vacant",
+        "cleanliness_status": "clean",
+    }
+    response = client_auth.post("/rooms", json=request_data)
+    assert response.status_code == 200
+    assert reader.vacant_room_ids(start, end) == [102, 201, 301]
+    assert reader.matrix.shape == (4, reader.horizon_days)
+
+    monkeypatch.setattr(occupancy_utils, "snapshot", reader)
+    response = client_auth.get(
+        f"/rooms/101/availability?start_date={day(3)}&end_date={day(5)}"
+    )
+    assert response.json() == {"result": "booked"}
+
+    response = client_auth.delete("/bookings/1")
+    assert response.status_code == 200
+    assert writer.is_vacant(101, start, end) is True
+    assert writer.verify(db=db_session) == []
+
+
+def test_shared_occupancy_snapshot_torn(
+    client_auth: TestClient, db_session, tmp_path
+):
+    create_hotel(client_auth)
+    path = str(tmp_path / "occupancy.bin")
+    snapshot = occupancy_utils.SharedOccupancySnapshot(path=path)
+    snapshot.start(db=db_session)
+    start, end = today + datetime.timedelta(1), today + datetime.timedelta(4)
+    # a writer died halfway through a change
+    snapshot._header["generation"] += 1
+    assert snapshot.is_vacant(101, start, end) is None
+    snapshot.set_stay(101, start, end, True)
+    assert int(snapshot._header["generation"][0]) == 1
+
+    snapshot.roll(db=db_session)
+    assert int(snapshot._header["generation"][0]) % 2 == 0
+    assert snapshot.is_vacant(101, start, end) is True
+
+
+def test_fast_json_responses(client_auth: TestClient, monkeypatch):
+    create_hotel(client_auth)
+    request_data = {
+        "client_id": 1,
+        "room_id": 101,
+        "start_date": day(1),
+        "end_date": day(3),
+    }
+    assert client_auth.post("/bookings", json=request_data).status_code == 200
+    request_data = {
+        "booking_id": 1,
+        "client_id": 1,
+        "payment_method": "cash",
+        "invoice_amount": 100,
+    }
+    assert client_auth.post("/invoices", json=request_data).status_code == 200
+
+    urls = [
+        "/rooms?limit=2",
+        "/rooms/catalog",
+        "/room_types",
+        "/features",
+        "/facilities",
+        "/bookings",
+        "/clients",
+        "/clients?limit=1",
+        "/invoices",
+        "/invoices?limit=1",
+    ]
+    orm = [client_auth.get(url) for url in urls]
+    monkeypatch.setattr(response_utils, "JSON_RESPONSE_MODE", "fast")
+    fast = [client_auth.get(url) for url in urls]
+    for orm_response, fast_response in zip(orm, fast):
+        assert fast_response.status_code == 200
+        assert fast_response.content == orm_response.content
+        assert fast_response.headers == orm_response.headers
+    assert "X-Next-Cursor" in fast[0].headers
+    assert "ETag" in fast[0].headers
+
+
+def test_database_json_responses(client_auth: TestClient, monkeypatch):
+    create_hotel(client_auth)
+    for room_id in (101, 201):
+        request_data = {
+            "client_id": 1,
+            "room_id": room_id,
+            "start_date": day(1),
+            "end_date": day(3),
+        }
+        response = client_auth.post("/bookings", json=request_data)
+        assert response.status_code == 200
+
+    requests = [
+        ("get", "/bookings", None),
+        ("get", "/bookings?limit=1", None),
+        ("post", "/rooms/filter", {"floor": 1}),
+        ("get", "/clients/1/bookings", None),
+        ("get", "/clients/2/bookings", None),
+    ]
+    orm = [client_auth.request(*args[:2], json=args[2]) for args in requests]
+    monkeypatch.setattr(response_utils, "JSON_RESPONSE_MODE", "database")
+    database = [
+        client_auth.request(*args[:2], json=args[2]) for args in requests
+    ]
+    for orm_response, database_response in zip(orm, database):
+        assert database_response.status_code == orm_response.status_code
+        assert database_response.json() == orm_response.json()
+        assert database_response.headers.get(
+            "X-Next-Cursor"
+        ) == orm_response.headers.get("X-Next-Cursor")
+    assert "X-Next-Cursor" in database[1].headers
+    assert database[4].status_code == 404
+
+    after = database[1].headers["X-Next-Cursor"]
+    response = client_auth.get(f"/bookings?limit=1&after={after}")
+    assert [booking["room_id"] for booking in response.json()] == [201]
+
+
+def test_include(client_auth: TestClient):
+    create_hotel(client_auth)
+    response = client_auth.post("/features", json={"name": "balcony"})
+    assert response.status_code == 200
+    response = client_auth.post("/room_types/1/features?feature_id=1")
+    assert response.status_code == 200
+    request_data = {
+        "client_id": 1,
+        "room_id": 101,
+        "start_date": day(1),
+        "end_date": day(3),
+    }
+    booking = client_auth.post("/bookings", json=request_data).json()
+    request_data = {
+        "booking_id": 1,
+        "client_id": 1,
+        "payment_method": "cash",
+        "invoice_amount": 100,
+    }
+    assert client_auth.post("/invoices", json=request_data).status_code == 200
+
+    response = client_auth.get(
+        "/bookings/1?include=room.room_type.features,client"
+    )
+    assert response.status_code == 200
+    included = response.json()
+    room = included.pop("room")
+    assert included.pop("client") == client
+    assert included == booking
+    assert room.pop("room_type") == {
+        "id": 1,
+        "name": "single",
+        "capacity": "1",
+        "price": 50,
+        "features": [{"id": 1, "name": "balcony"}],
+    }
+    assert room == client_auth.get("/rooms/101").json()
+
+    response = client_auth.get("/bookings?include=room.facility")
+    assert response.status_code == 200
+    assert response.json()[0]["room"]["facility"] == {
+        "id": 1,
+        "name": "facility",
+    }
+    assert "client" not in response.json()[0]
+
+    response = client_auth.get("/rooms?limit=2&include=room_type")
+    assert response.status_code == 200
+    assert "X-Next-Cursor" in response.headers
+    assert "ETag" not in response.headers
+    assert [room["room_type"]["id"] for room in response.json()] == [1, 1]
+
+    response = client_auth.get("/invoices?include=booking.room,client")
+    assert response.status_code == 200
+    invoice = response.json()[0]
+    assert invoice["client"] == client
+    assert invoice["booking"]["room"]["id"] == 101
+
+    for url in ["/bookings?include=invoices", "/rooms?include=bookings"]:
+        response = client_auth.get(url)
+        assert response.status_code == 400
+        assert response.json()["detail"].startswith("Cannot include")
+
+
+def test_sparse_fields(client_auth: TestClient, monkeypatch):
+    create_hotel(client_auth)
+    request_data = {
+        "client_id": 1,
+        "room_id": 101,
+        "start_date": day(1),
+        "end_date": day(3),
+    }
+    assert client_auth.post("/bookings", json=request_data).status_code == 200
+    request_data = {
+        "booking_id": 1,
+        "client_id": 1,
+        "payment_method": "cash",
+        "invoice_amount": 100,
+    }
+    assert client_auth.post("/invoices", json=request_data).status_code == 200
+
+    response = client_auth.get(
+        "/rooms?limit=2&fields=cleanliness_status,floor"
+    )
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": 101, "floor": 1, "cleanliness_status": "clean"},
+        {"id": 102, "floor": 1, "cleanliness_status": "clean"},
+    ]
+    assert "X-Next-Cursor" in response.headers
+    assert "ETag" in response.headers
+
+    response = client_auth.get("/rooms/catalog?fields=room_type_name")
+    assert response.json()[-1] == {"room_id": 201, "room_type_name": "family"}
+
+    response = client_auth.get("/clients?limit=1&fields=email")
+    assert response.json() == [{"email": client["email"]}]
+    assert "X-Next-Cursor" in response.headers
+
+    response = client_auth.get("/invoices?limit=1&fields=payment_method")
+    assert response.json() == [{"payment_method": "cash"}]
+    assert "X-Next-Cursor" in response.headers
+
+    for mode in ("orm", "fast", "database"):
+        monkeypatch.setattr(response_utils, "JSON_RESPONSE_MODE", mode)
+        response = client_auth.get("/bookings?fields=room_id")
+        assert response.status_code == 200
+        assert response.json() == [{"id": 1, "room_id": 101}]
+
+    response = client_auth.get("/rooms?fields=floor,price")
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Unknown fields price")
+
+    response = client_auth.get("/invoices?fields=client_id&include=client")
+    assert response.status_code == 400
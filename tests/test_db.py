@@ -0,0 +1,144 @@
+import asyncio
+import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from starlette.requests import Request
+from starlette.responses import Response
+
+import db
+from auth.deps import get_current_user
+from crud import occupancy_utils
+
+
+def make_request(method: str, cookie: str = None) -> Request:
+    headers = []
+    if cookie:
+        headers.append((b"cookie", cookie.encode()))
+    return Request({"type": "http", "method": method, "headers": headers})
+
+
+def test_read_your_writes(monkeypatch):
+    request = make_request("GET")
+    assert db.read_from_primary(request) is True
+
+    monkeypatch.setattr(db, "replica_engines", [db.engine, db.engine])
+    monkeypatch.setattr(db, "DB_READ_YOUR_WRITES_SECONDS", 5)
+    assert db.read_from_primary(request) is False
+    assert {db.next_replica(), db.next_replica()} == {0, 1}
+
+    response = Response()
+    db.mark_write(make_request("GET"), response)
+    assert "set-cookie" not in response.headers
+    db.mark_write(make_request("POST"), response)
+    cookie = response.headers["set-cookie"].split(";")[0]
+    assert cookie.startswith(db.READ_YOUR_WRITES_COOKIE)
+    assert db.read_from_primary(make_request("GET", cookie)) is True
+
+    expired = f"{db.READ_YOUR_WRITES_COOKIE}=1000"
+    assert db.read_from_primary(make_request("GET", expired)) is False
+
+
+@pytest.fixture
+def async_client(app, monkeypatch):
+    """
+    Client whose routes open real sessions on the test database, asyncpg
+    ones for the async routes, with reads sent to it as a replica.
+    """
+    url = (
+        f"{db.POSTGRES_USER}:{db.POSTGRES_PASSWORD}"
+        f"@{db.POSTGRES_SERVER}/{db.POSTGRES_TEST_DATABASE}"
+    )
+    # nothing stays open, the app fixture drops the tables afterwards
+    engine = create_engine(f"postgresql://{url}", poolclass=NullPool)
+    async_engine = create_async_engine(
+        f"postgresql+asyncpg://{url}", poolclass=NullPool
+    )
+    monkeypatch.setattr(db, "replica_engines", [engine])
+    monkeypatch.setattr(db, "async_replica_engines", [async_engine])
+    db.SessionLocal.configure(bind=engine)
+    db.AsyncSessionLocal.configure(bind=async_engine)
+    app.dependency_overrides[get_current_user] = lambda: None
+    try:
+        with TestClient(app) as client:
+            yield client, engine
+    finally:
+        occupancy_utils.snapshot.reset()
+        db.SessionLocal.configure(bind=db.engine)
+        db.AsyncSessionLocal.configure(bind=db.async_engine)
+
+
+def test_async_session(async_client, monkeypatch):
+    client, engine = async_client
+    assert client.post("/facilities", json={"name": "f"}).status_code == 200
+    request_data = {"name": "single", "capacity": "1", "price": 50}
+    assert client.post("/room_types", json=request_data).status_code == 200
+    for room_id in (101, 102):
+        request_data = {
+            "id": room_id,
+            "room_type_id": 1,
+            "facility_id": 1,
+            "floor": 1,
+            "booking_status": "vacant",
+            "cleanliness_status": "clean",
+        }
+        response = client.post("/rooms", json=request_data)
+        assert response.status_code == 200
+    request_data = {
+        "first_name": "Danylo",
+        "last_name": "Halytskyi",
+        "email": "danylo@halytskyi.com",
+        "phone": "+380143256789",
+        "address": "Danyla Halytskoho, 12",
+    }
+    assert client.post("/clients", json=request_data).status_code == 200
+    response = client.get("/rooms/102")
+    assert response.status_code == 200
+    assert response.json()["id"] == 102
+
+    with Session(engine) as session:
+        occupancy_utils.snapshot.build(db=session)
+    on_event_loop = []
+    set_stay = occupancy_utils.snapshot.set_stay
+
+    def recording_set_stay(*args, **kwargs):
+        try:
+            asyncio.get_running_loop()
+            on_event_loop.append(True)
+        except RuntimeError:
+            on_event_loop.append(False)
+        return set_stay(*args, **kwargs)
+
+    monkeypatch.setattr(
+        occupancy_utils.snapshot, "set_stay", recording_set_stay
+    )
+
+    start = datetime.date.today() + datetime.timedelta(1)
+    end = start + datetime.timedelta(2)
+    request_data = {
+        "client_id": 1,
+        "room_id": 101,
+        "start_date": str(start),
+        "end_date": str(end),
+    }
+    response = client.post("/bookings", json=request_data)
+    assert response.status_code == 200
+    booking_id = response.json()["id"]
+    assert on_event_loop == [False]
+    assert occupancy_utils.snapshot.is_vacant(101, start, end) is False
+
+    url = f"start_date={start}&end_date={end}"
+    response = client.get(f"/rooms/101/availability?{url}")
+    assert response.json() == {"result": "booked"}
+    response = client.get(f"/rooms/available?{url}")
+    assert [room["id"] for room in response.json()] == [102]
+
+    response = client.delete(f"/bookings/{booking_id}")
+    assert response.status_code == 200
+    assert on_event_loop == [False, False]
+    response = client.get(f"/rooms/101/availability?{url}")
+    assert response.json() == {"result": "vacant"}
@@ -0,0 +1,45 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc
+
+from db import TimedQueuePool
+
+
+def test_pool_stats(client_auth: TestClient):
+    response = client_auth.get("/internal/pool")
+    assert response.status_code == 200
+    stats = {pool["name"]: pool for pool in response.json()}
+    assert stats["primary"]["pool"] == "TimedQueuePool"
+    assert stats["primary_async"]["pool"] == "TimedAsyncQueuePool"
+    assert stats["primary"]["size"] == 5
+
+
+def test_timed_pool_counts_waits(db_session):
+    engine = create_engine(
+        db_session.bind.engine.url,
+        poolclass=TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+    connection = engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    connection.close()
+    engine.connect().close()
+    assert engine.pool.checkouts == 3
+    assert engine.pool.timeouts == 1
+    assert engine.pool.max_wait >= 0.1
+    assert engine.pool.checkedout() == 0
+    engine.dispose()
+
+
+def test_hashing_stats(client_auth: TestClient):
+    response = client_auth.post(
+        "/signup", json={"username": "nightshift", "password": "password123"}
+    )
+    assert response.status_code == 200
+    response = client_auth.get("/internal/hashing")
+    assert response.status_code == 200
+    assert response.json()["completed"] >= 1
+    assert response.json()["queued"] == 0
@@ -0,0 +1,191 @@
+"""Number of statements each endpoint sends to the database."""
+import contextlib
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from tests.test_booking_routers import create_hotel, day
+
+
+@pytest.fixture
+def count_queries(db_session):
+    """
+    Count the statements sent during a block, starting from an empty
+    identity map as a request on a fresh session would.
+    """
+
+    @contextlib.contextmanager
+    def counter():
+        statements = []
+
+        def _count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        db_session.expunge_all()
+        connection = db_session.connection()
+        event.listen(connection, "before_cursor_execute", _count)
+        try:
+            yield statements
+        finally:
+            event.remove(connection, "before_cursor_execute", _count)
+
+    return counter
+
+
+def post_booking(client_auth: TestClient) -> dict:
+    request_data = {
+        "client_id": 1,
+        "room_id": 101,
+        "start_date": day(1),
+        "end_date": day(3),
+    }
+    response = client_auth.post("/bookings", json=request_data)
+    assert response.status_code == 200
+    return request_data
+
+
+def test_booking_query_counts(client_auth: TestClient, count_queries):
+    create_hotel(client_auth)
+
+    with count_queries() as statements:
+        request_data = post_booking(client_auth)
+    # client, room, room type, inventory, insert and refresh
+    assert len(statements) <= 6
+
+    request_data["end_date"] = day(4)
+    with count_queries() as statements:
+        response = client_auth.put("/bookings/1", json=request_data)
+        assert response.status_code == 200
+    assert len(statements) <= 7
+
+
+def test_invoice_query_counts(client_auth: TestClient, count_queries):
+    create_hotel(client_auth)
+    post_booking(client_auth)
+
+    request_data = {
+        "booking_id": 1,
+        "client_id": 1,
+        "payment_method": "cash",
+        "invoice_amount": 100,
+    }
+    with count_queries() as statements:
+        response = client_auth.post("/invoices", json=request_data)
+        assert response.status_code == 200
+    # booking, client, insert and refresh
+    assert len(statements) <= 4
+
+    request_data = {"booking_id": 1, "client_id": 1, "invoice_amount": 90}
+    with count_queries() as statements:
+        response = client_auth.put("/invoices/1", json=request_data)
+        assert response.status_code == 200
+    assert len(statements) <= 5
+
+
+def test_feature_link_query_counts(client_auth: TestClient, count_queries):
+    create_hotel(client_auth)
+    response = client_auth.post("/features", json={"name": "balcony"})
+    assert response.status_code == 200
+
+    with count_queries() as statements:
+        response = client_auth.post("/room_types/1/features?feature_id=1")
+        assert response.status_code == 200
+    # feature, room type, its features and the link, then the catalog
+    # lock and refresh
+    assert len(statements) <= 5
+
+    with count_queries() as statements:
+        response = client_auth.delete("/room_types/1/features?feature_id=1")
+        assert response.status_code == 200
+    assert len(statements) <= 5
+
+
+def test_feature_listing_query_counts(client_auth: TestClient, count_queries):
+    create_hotel(client_auth)
+    for name in ("balcony", "minibar", "safe"):
+        response = client_auth.post("/features", json={"name": name})
+        assert response.status_code == 200
+    for feature_id in (1, 2, 3):
+        response = client_auth.post(
+            f"/room_types/1/features?feature_id={feature_id}"
+        )
+        assert response.status_code == 200
+
+    urls = [
+        "/room_types/1/features?skip=1&limit=1",
+        "/rooms/101/features?skip=1&limit=1",
+        "/features/1/room_types",
+    ]
+    for url in urls:
+        with count_queries() as statements:
+            response = client_auth.get(url)
+            assert response.status_code == 200
+            assert len(response.json()) == 1
+        # one join, with the page cut by the database
+        assert len(statements) == 1
+        assert "LIMIT" in statements[0]
+
+    # an empty page needs one more lookup to tell it from a missing row
+    for url in ["/room_types/2/features", "/room_types/9/features"]:
+        with count_queries() as statements:
+            response = client_auth.get(url)
+        assert len(statements) <= 2
+
+
+def test_feature_search_query_count(client_auth: TestClient, count_queries):
+    create_hotel(client_auth)
+    for name in ("balcony", "bathtub"):
+        response = client_auth.post("/features", json={"name": name})
+        assert response.status_code == 200
+        response = client_auth.post(
+            f"/room_types/2/features?feature_id={response.json()['id']}"
+        )
+        assert response.status_code == 200
+
+    with count_queries() as statements:
+        response = client_auth.post(
+            "/rooms/filter", json={"feature_ids": [1, 2], "floor": 2}
+        )
+        assert response.status_code == 200
+        assert [room["id"] for room in response.json()] == [201]
+    # rooms with the division over features_to_room_types as a subquery
+    assert len(statements) == 1
+
+
+def test_include_query_counts(client_auth: TestClient, count_queries):
+    create_hotel(client_auth)
+    request_data = post_booking(client_auth)
+    request_data["room_id"] = 102
+    response = client_auth.post("/bookings", json=request_data)
+    assert response.status_code == 200
+
+    for url in [
+        "/bookings?include=room.room_type,room.facility,client",
+        "/bookings/1?include=room.room_type,client",
+        "/rooms?include=room_type,facility",
+    ]:
+        with count_queries() as statements:
+            response = client_auth.get(url)
+            assert response.status_code == 200
+        # the relations are joined into the one SELECT
+        assert len(statements) == 1
+
+    with count_queries() as statements:
+        response = client_auth.get("/rooms?include=room_type.features")
+        assert response.status_code == 200
+    # plus one for the features of every room type of the page
+    assert len(statements) == 2
+
+
+def test_sparse_fields_projection(client_auth: TestClient, count_queries):
+    create_hotel(client_auth)
+
+    with count_queries() as statements:
+        response = client_auth.get("/rooms?fields=floor,cleanliness_status")
+        assert response.status_code == 200
+    # the validators of the rooms table and the page
+    select = statements[-1]
+    assert select.startswith("SELECT rooms.id AS rooms_id, rooms.floor")
+    for column in ("description", "room_type_id", "booking_status"):
+        assert column not in select
@@ -1,6 +1,17 @@
 import re
+import threading
+import time
 from urllib import request
 from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+import db
+from crud import catalog_utils
+from crud.reference_utils import ReferenceListener, reference_cache
+from models.room import Facility, Room, RoomType
+from models.room_catalog import RoomCatalog
+from tests.conftest import engine
+from tests.test_booking_routers import create_hotel
 
 
 def test_feature(client_auth: TestClient):
@@ -166,17 +177,172 @@ def test_room_type(client_auth: TestClient):
     assert response.json()[0]["id"] == 1
     assert response.json()[0]["name"] == "feature1"
 
+    response = client_auth.post("/features", json={"name": "feature2"})
+    assert response.status_code == 200
+    response = client_auth.post("/room_types/1/features?feature_id=2")
+    assert response.status_code == 200
+
+    response = client_auth.get("/room_types/1/features?skip=1&limit=1")
+    assert response.status_code == 200
+    assert response.json() == [{"id": 2, "name": "feature2"}]
+
+    response = client_auth.get("/features/1/room_types")
+    assert response.status_code == 200
+    assert response.json() == [{"id": 1, "name": "single"}]
+
+    response = client_auth.get("/features/3/room_types")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "No feature found with id 3"}
+
+    response = client_auth.get("/room_types/2/features")
+    assert response.status_code == 404
+
+    response = client_auth.get("/rooms/1/features")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "No room found with id 1"}
+
     response = client_auth.delete("/room_types/1/features?feature_id=1")
     assert response.status_code == 200
     assert response.json() == {
         "result": "Successfully deleted feature (id=1) from room_type (id=1)"
     }
 
+    response = client_auth.get("/features/1/room_types")
+    assert response.status_code == 200
+    assert response.json() == []
+
     request_data = {}
     response = client_auth.post("/room_types", json=request_data)
     assert response.status_code == 422
 
 
+def test_reference_cache(client_auth: TestClient, db_session):
+    request_data = {"name": "single", "capacity": "1", "price": 50}
+    response = client_auth.post("/room_types", json=request_data)
+    assert response.status_code == 200
+
+    # every request starts from an empty session
+    for price in (50, 50):
+        db_session.expunge_all()
+        response = client_auth.get("/room_types/1")
+        assert response.json()["price"] == price
+    stats = reference_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+    version = reference_cache.version("room_types")
+    db_session.expunge_all()
+    response = client_auth.put("/room_types/1", json={"price": 60})
+    assert response.status_code == 200
+    assert reference_cache.version("room_types") > version
+    assert reference_cache.stats()["rows"]["room_types"] == 0
+
+    db_session.expunge_all()
+    response = client_auth.get("/room_types/1")
+    assert response.json()["price"] == 60
+
+    db_session.expunge_all()
+    response = client_auth.get("/room_types/2")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "No room type found with id 2"}
+
+
+def test_reference_cache_skips_replicas(
+    client_auth: TestClient, db_session, monkeypatch
+):
+    request_data = {"name": "single", "capacity": "1", "price": 50}
+    response = client_auth.post("/room_types", json=request_data)
+    assert response.status_code == 200
+
+    reference_cache.clear()
+    replica = db_session.get_bind().engine
+    monkeypatch.setattr(db, "replica_engines", [replica])
+    db_session.expunge_all()
+    assert reference_cache.load(db_session, RoomType, 1).price == 50
+    assert reference_cache.stats()["rows"]["room_types"] == 0
+
+    monkeypatch.setattr(db, "replica_engines", [])
+    db_session.expunge_all()
+    assert reference_cache.load(db_session, RoomType, 1).price == 50
+    assert reference_cache.stats()["rows"]["room_types"] == 1
+
+
+def test_reference_listener():
+    listener = ReferenceListener(engine, poll_interval=0.05)
+    listener.start()
+    try:
+        deadline = time.monotonic() + 5
+        while not reference_cache.listening and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert reference_cache.listening
+
+        version = reference_cache.version("features")
+        with engine.connect() as connection:
+            connection.execution_options(isolation_level="AUTOCOMMIT")
+            connection.execute(
+                "SELECT pg_notify('reference_cache', 'features')"
+            )
+        while (
+            reference_cache.version("features") == version
+            and time.monotonic() < deadline
+        ):
+            time.sleep(0.01)
+        assert reference_cache.version("features") == version + 1
+    finally:
+        listener.stop()
+    assert not reference_cache.listening
+
+
+def test_conditional_get(client_auth: TestClient):
+    request_data = {"name": "single", "capacity": "1", "price": 50}
+    response = client_auth.post("/room_types", json=request_data)
+    assert response.status_code == 200
+
+    response = client_auth.get("/room_types")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+    for headers in (
+        {"If-None-Match": etag},
+        {"If-None-Match": f'W/{etag}, "other"'},
+        {"If-Modified-Since": last_modified},
+    ):
+        response = client_auth.get("/room_types", headers=headers)
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+    response = client_auth.get(
+        "/room_types/1", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    response = client_auth.get(
+        "/room_types/2", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 404
+    response = client_auth.get("/rooms/1", headers={"If-None-Match": "*"})
+    assert response.status_code == 404
+
+    response = client_auth.put("/room_types/1", json={"price": 60})
+    assert response.status_code == 200
+    response = client_auth.get("/room_types", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[0]["name"] == "single"
+    assert response.headers["ETag"] != etag
+
+    # other tables keep their versions
+    response = client_auth.get("/facilities")
+    response = client_auth.get(
+        "/facilities", headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert response.status_code == 304
+    response = client_auth.get("/rooms")
+    response = client_auth.get(
+        "/rooms", headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert response.status_code == 304
+
+
 def test_room(client_auth: TestClient):
     request_data = {"name": "facility"}
     response = client_auth.post("/facilities", json=request_data)
@@ -218,3 +384,156 @@ def test_room(client_auth: TestClient):
     response = client_auth.post("/rooms", json=request_data)
     assert response.status_code == 422
 
+
+def test_filter_rooms_by_features(client_auth: TestClient):
+    create_hotel(client_auth)
+    for name in ("balcony", "bathtub", "sea view"):
+        response = client_auth.post("/features", json={"name": name})
+        assert response.status_code == 200
+    # single (rooms 101, 102): balcony, bathtub; family (201): all three
+    for room_type_id, feature_id in [(1, 1), (1, 2), (2, 1), (2, 2), (2, 3)]:
+        response = client_auth.post(
+            f"/room_types/{room_type_id}/features?feature_id={feature_id}"
+        )
+        assert response.status_code == 200
+
+    def room_ids(**room_filter):
+        response = client_auth.post("/rooms/filter", json=room_filter)
+        assert response.status_code == 200
+        return sorted(room["id"] for room in response.json())
+
+    assert room_ids(feature_ids=[1, 2]) == [101, 102, 201]
+    assert room_ids(feature_ids=[2, 3, 2]) == [201]
+    assert room_ids(feature_ids=[1, 2], floor=1) == [101, 102]
+    assert room_ids(feature_ids=[3], floor=1) == []
+    assert room_ids(feature_ids=[1, 4]) == []
+    assert room_ids(feature_ids=[]) == [101, 102, 201]
+
+    response = client_auth.post(
+        "/rooms/filter?format=ndjson", json={"feature_ids": [3]}
+    )
+    assert response.status_code == 200
+    assert response.text.splitlines() == [
+        '{"id": 201, "room_type_id": 2, "floor": 2, "facility_id": 1, '
+        '"booking_status": "vacant", "cleanliness_status": "clean"}'
+    ]
+
+
+def test_room_catalog(client_auth: TestClient, db_session):
+    create_hotel(client_auth)
+    for name in ("balcony", "bathtub"):
+        response = client_auth.post("/features", json={"name": name})
+        assert response.status_code == 200
+    for feature_id in (1, 2):
+        response = client_auth.post(
+            f"/room_types/1/features?feature_id={feature_id}"
+        )
+        assert response.status_code == 200
+
+    response = client_auth.get("/rooms/catalog?limit=2")
+    assert response.status_code == 200
+    assert response.json()[0] == {
+        "room_id": 101,
+        "description": "",
+        "floor": 1,
+        "booking_status": "vacant",
+        "cleanliness_status": "clean",
+        "room_type_id": 1,
+        "room_type_name": "single",
+        "capacity": "1",
+        "price": 50,
+        "facility_id": 1,
+        "facility_name": "facility",
+        "features": [
+            {"id": 1, "name": "balcony"},
+            {"id": 2, "name": "bathtub"},
+        ],
+    }
+    after = response.headers["X-Next-Cursor"]
+    response = client_auth.get(f"/rooms/catalog?after={after}")
+    assert [entry["room_id"] for entry in response.json()] == [201]
+    assert response.json()[0]["features"] == []
+
+    # every write refreshes the rows it affects
+    writes = [
+        ("put", "/room_types/1", {"price": 55}),
+        ("put", "/features/2", {"name": "hot tub"}),
+        ("put", "/facilities/1", {"name": "spa"}),
+        ("put", "/rooms/102", {"room_type_id": 2, "floor": 3}),
+        ("delete", "/room_types/1/features?feature_id=1", None),
+        ("post", "/room_types/2/features?feature_id=2", None),
+        ("delete", "/features/2", None),
+        ("delete", "/room_types/2", None),
+        ("delete", "/rooms/101", None),
+    ]
+    for method, url, data in writes:
+        response = client_auth.request(method, url, json=data)
+        assert response.status_code == 200
+        db_session.expunge_all()
+        catalog = client_auth.get("/rooms/catalog").json()
+        # the same as rebuilding the whole catalog
+        catalog_utils.rebuild_catalog(db=db_session)
+        db_session.expunge_all()
+        assert client_auth.get("/rooms/catalog").json() == catalog
+
+    assert catalog == [
+        {
+            "room_id": 102,
+            "description": "",
+            "floor": 3,
+            "booking_status": "vacant",
+            "cleanliness_status": "clean",
+            "room_type_id": None,
+            "room_type_name": None,
+            "capacity": None,
+            "price": None,
+            "facility_id": 1,
+            "facility_name": "spa",
+            "features": [],
+        },
+        {
+            "room_id": 201,
+            "description": "",
+            "floor": 2,
+            "booking_status": "vacant",
+            "cleanliness_status": "clean",
+            "room_type_id": None,
+            "room_type_name": None,
+            "capacity": None,
+            "price": None,
+            "facility_id": 1,
+            "facility_name": "spa",
+            "features": [],
+        },
+    ]
+
+
+def test_room_catalog_concurrent_writes(app):
+    with Session(engine) as session:
+        session.add(Facility(id=1, name="spa"))
+        session.add(RoomType(id=1, name="single", capacity="1", price=50))
+        session.flush()
+        session.add(Room(id=101, room_type_id=1, facility_id=1, floor=1))
+        catalog_utils.rebuild_catalog(db=session)
+        session.commit()
+
+    def update_room():
+        with Session(engine) as session:
+            session.get(Room, 101).description = "sea view"
+            catalog_utils.refresh_rooms(db=session, room_ids=[101])
+            session.commit()
+
+    with Session(engine) as session:
+        session.get(RoomType, 1).price = 60
+        catalog_utils.refresh_room_types(db=session, room_type_ids=[1])
+        # the room is refreshed while the new price is not committed yet
+        thread = threading.Thread(target=update_room)
+        thread.start()
+        thread.join(0.5)
+        assert thread.is_alive()
+        session.commit()
+    thread.join()
+
+    with Session(engine) as session:
+        _row = session.get(RoomCatalog, 101)
+        assert (_row.description, _row.price) == ("sea view", 60)